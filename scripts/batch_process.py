@@ -0,0 +1,576 @@
+import argparse
+import glob
+import os
+import shutil
+import sys
+import time
+from multiprocessing import Pool
+
+import cv2
+
+from filters import FILTERS, apply_filter, output_suffixes, profiling
+from filters.backends import worker_threads
+from filters.encoding import PRESETS, encode, encoding_settings, imencode_flags
+from filters.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache, input_digest, result_key
+from filters.frames import DEFAULT_FRAME_DIR, DEFAULT_MAX_BYTES as DEFAULT_FRAME_BYTES, FrameStore
+from filters.loader import atomic_write, decode_image, header_size, load_image, wants_grayscale
+from filters.shm import DEFAULT_FRAME_BYTES as DEFAULT_SHM_FRAME_BYTES, SharedFramePool
+from filters.stages import bottleneck, run_stages
+
+# Image file extensions picked up when walking an input directory
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def find_images(source):
+    """
+    Collect the image files to process from a directory (walked recursively) or a glob pattern.
+    :param source: Directory path or glob pattern (e.g. 'photos/**/*.jpg')
+    :return: Tuple of (sorted list of image paths, base directory used for relative output paths)
+    """
+    if os.path.isdir(source):
+        paths = []
+        for root, _, files in os.walk(source):
+            for file_name in files:
+                if file_name.lower().endswith(IMAGE_EXTENSIONS):
+                    paths.append(os.path.join(root, file_name))
+        return sorted(paths), source
+
+    paths = [path for path in glob.glob(source, recursive=True) if os.path.isfile(path)]
+    base_dir = os.path.commonpath([os.path.dirname(path) for path in paths]) if paths else ''
+    return sorted(paths), base_dir
+
+
+def output_paths(image_path, base_dir, output_folder, filter_name, extension='.jpg'):
+    """
+    Build the output paths for one filter applied to one image, mirroring the input layout
+    under 'filtered/<filter folder>/' the same way the showcase scripts name their files.
+    :param image_path: Path of the source image
+    :param base_dir: Directory the relative output layout is computed from
+    :param output_folder: Root output folder (e.g. 'filtered')
+    :param filter_name: Filter name (a key of FILTERS)
+    :param extension: Output file extension (default is '.jpg')
+    :return: List of output paths, one per image the filter returns
+    """
+    relative_dir = os.path.relpath(os.path.dirname(image_path), base_dir) if base_dir else ''
+    if relative_dir == os.curdir:
+        relative_dir = ''
+    stem = os.path.splitext(os.path.basename(image_path))[0]
+    folder = os.path.join(output_folder, FILTERS[filter_name]['folder'], relative_dir)
+    return [os.path.join(folder, f'{stem}_{suffix}{extension}') for suffix in output_suffixes(filter_name)]
+
+
+def filter_encodings(filter_names, preset='default', filter_presets=None):
+    """
+    Resolve the output settings of every filter of a run.
+    :param filter_names: Filters of the run
+    :param preset: Preset name (a key of filters.encoding.PRESETS) used for all filters
+    :param filter_presets: Dictionary mapping filter name to a preset name used for that filter instead
+    :return: Dictionary mapping filter name to its settings dictionary
+    """
+    filter_presets = filter_presets or {}
+    return {name: encoding_settings(filter_presets.get(name, preset), name) for name in filter_names}
+
+
+def init_worker(threads=1):
+    """
+    Worker process initializer. Each worker handles whole images, so OpenCV's own thread pool only
+    gets the cores left over by the other workers (see filters.backends.worker_threads()): one busy
+    thread per core instead of oversubscribing the machine.
+    :param threads: OpenCV threads of this worker (default is 1)
+    """
+    cv2.setNumThreads(threads)
+
+
+def process_image(task):
+    """
+    Run _process_image() in a worker process, tracing it if the task's options ask for it ('trace'
+    set to 'time' or 'memory'). The recorded events are returned in the stats under 'events'.
+    :param task: See _process_image()
+    :return: See _process_image()
+    """
+    trace = task[4].get('trace')
+    if not trace:
+        return _process_image(task)
+    tracer = profiling.enable(memory=trace == 'memory')
+    try:
+        image_path, failures, stats = _process_image(task)
+    finally:
+        profiling.disable()
+    stats['events'] = tracer.drain()
+    return image_path, failures, stats
+
+
+def _process_image(task):
+    """
+    Load one image, apply every requested filter and save the results. Runs inside a worker process.
+    Only the path and the error message travel between processes; the pixels never leave the worker.
+
+    With a result cache, outputs already computed for the same input bytes, filter, parameters
+    and library version are copied from the cache, and the image is only decoded if at least
+    one filter has to run. With 'max_size', JPEGs are decoded directly at a reduced size where
+    possible, and with 'fast_decode' in grayscale when every filter only needs the luma. With a
+    frame store, the decoded image is mapped from the store instead, and decoded and stored on
+    the first run only; the file is then only read if the result cache needs its digest.
+    :param task: Tuple of (image path, base directory, output folder, filter names, options),
+                 options being a dictionary with 'tile_above' (pixels), 'cache_dir', and optionally
+                 'frame_dir', 'max_size' (longest output side in pixels), 'fast_decode' and 'encodings'
+                 (see filter_encodings(); filters missing from it are saved with OpenCV's JPEG defaults)
+    :return: Tuple of (image path, list of (filter name, error message) failures, stats), stats being a
+             dictionary with the cache 'hits' and 'misses', the frame store's 'frame_hits' and the seconds
+             spent to 'decode' (or map), 'filter' and 'encode'
+    """
+    image_path, base_dir, output_folder, filter_names, options = task
+    cache = ResultCache(options['cache_dir']) if options.get('cache_dir') else None
+    frames = FrameStore(options['frame_dir']) if options.get('frame_dir') else None
+    stats = {'hits': 0, 'misses': 0, 'frame_hits': 0, 'decode': 0.0, 'filter': 0.0, 'encode': 0.0}
+
+    data = None
+    if cache or not frames:
+        try:
+            with profiling.span('read', 'io'), open(image_path, 'rb') as image_file:
+                data = image_file.read()
+        except OSError:
+            return image_path, [(None, 'image could not be loaded')], stats
+    digest = input_digest(data) if cache else None
+    img = None
+
+    # Results decoded at another size or in grayscale are cached apart from full-size color ones
+    max_size = options.get('max_size')
+    grayscale = wants_grayscale(filter_names) if options.get('fast_decode') else False
+    decode_key = {'max_size': max_size, 'grayscale': grayscale} if max_size or grayscale else None
+
+    failures = []
+    for filter_name in filter_names:
+        try:
+            settings = (options.get('encodings') or {}).get(filter_name) or PRESETS['default']
+            extension, _ = imencode_flags(settings)
+            paths = output_paths(image_path, base_dir, output_folder, filter_name, extension)
+            for path in paths:
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+
+            key_params = dict(FILTERS[filter_name]['params'])
+            if decode_key:
+                key_params['_decode'] = decode_key
+            if settings != PRESETS['default']:
+                key_params['_encoding'] = settings
+            keys = [result_key(digest, filter_name, key_params, index, extension)
+                    for index in range(len(paths))] if cache else []
+            cached = [cache.get(key, extension) for key in keys]
+            if cache and all(cached):
+                for cached_path, path in zip(cached, paths):
+                    shutil.copyfile(cached_path, path)
+                continue
+
+            if img is None:
+                if frames:
+                    img, info = frames.load(image_path, grayscale, max_size)
+                    stats['frame_hits'] += info['hit']
+                else:
+                    img, info = decode_image(data, filter_names, max_size, grayscale)
+                stats['decode'] += info['seconds']
+                if img is None:
+                    return image_path, [(None, 'image could not be loaded')], _stats(stats, cache)
+
+            # Very large images run strip by strip in this worker's single thread to bound their memory
+            tile_above = options.get('tile_above')
+            tile_options = {'threads': 1} if tile_above is not None and img.shape[0] * img.shape[1] > tile_above \
+                else None
+
+            start = time.perf_counter()
+            results = apply_filter(filter_name, img, tile_options=tile_options)
+            stats['filter'] += time.perf_counter() - start
+            if not isinstance(results, tuple):
+                results = (results,)
+            for index, (result, path) in enumerate(zip(results, paths)):
+                start = time.perf_counter()
+                _, encoded = encode(result, settings)
+                stats['encode'] += time.perf_counter() - start
+                atomic_write(path, encoded)
+                if cache:
+                    cache.put(keys[index], encoded.tobytes(), extension)
+        except Exception as error:  # Keep going with the next filter and report the failure at the end
+            failures.append((filter_name, f'{type(error).__name__}: {error}'))
+
+    return image_path, failures, _stats(stats, cache)
+
+
+def _stats(stats, cache):
+    if cache:
+        stats.update(hits=cache.hits, misses=cache.misses)
+    return stats
+
+
+def map_images(tasks, workers=None, chunksize=None):
+    """
+    Run process_image() over a list of tasks in a process pool, yielding results as they complete.
+    :param tasks: List of process_image() tasks
+    :param workers: Number of worker processes (default is the number of CPU cores)
+    :param chunksize: Images handed to a worker at a time (default scales with the number of tasks)
+    :return: Generator of process_image() results, in completion order
+    """
+    workers = workers or os.cpu_count() or 1
+    if chunksize is None:
+        # Small chunks keep the load balanced at the end of the run, large ones keep IPC low
+        chunksize = max(1, min(16, len(tasks) // (workers * 8)))
+
+    with Pool(processes=workers, initializer=init_worker, initargs=(worker_threads(workers),)) as pool:
+        yield from pool.imap_unordered(process_image, tasks, chunksize)
+
+
+def run_batch(source, filter_names, output_folder='filtered', workers=None, chunksize=None, tile_above=None,
+              cache_dir=None, cache_size=DEFAULT_MAX_BYTES, max_size=None, fast_decode=False, encodings=None,
+              trace=None, trace_memory=False, frame_dir=None, frame_size=DEFAULT_FRAME_BYTES):
+    """
+    Apply a set of filters to every image found in a directory or glob using a process pool.
+    Failures are collected per image and never stop the run.
+    :param source: Directory path or glob pattern
+    :param filter_names: Names of the filters to apply (keys of FILTERS)
+    :param output_folder: Root output folder (default is 'filtered')
+    :param workers: Number of worker processes (default is the number of CPU cores)
+    :param chunksize: Images handed to a worker at a time (default scales with the catalog size)
+    :param tile_above: Megapixels above which filters run strip by strip with bounded memory (default is never)
+    :param cache_dir: Result cache directory; results found there are reused instead of recomputed (default is none)
+    :param cache_size: Size in bytes the result cache is evicted down to after the run
+    :param max_size: Longest side of the outputs in pixels; larger images are shrunk, JPEGs already while
+                     decoding (default is full size)
+    :param fast_decode: Decode in grayscale when every filter only needs the luma (bw, edges, bw sketch)
+    :param encodings: Output settings per filter (see filter_encodings()); default is OpenCV's JPEG defaults
+    :param trace: Path to save a Chrome trace of every filter, filter step, decode, encode and write to,
+                  with a summary per span and resolution next to it (default is no tracing)
+    :param trace_memory: Also trace the memory every span allocates (slower)
+    :param frame_dir: Frame store directory; decoded images are mapped from it instead of decoded again
+                      (see filters.frames.FrameStore), and stored there on the first run (default is none)
+    :param frame_size: Size in bytes the frame store is evicted down to after the run
+    :return: Dictionary mapping each failed image path to its list of (filter name, error message)
+    """
+    for filter_name in filter_names:
+        if filter_name not in FILTERS:
+            raise ValueError(f"Unknown filter '{filter_name}'. Available filters: {', '.join(FILTERS)}")
+
+    image_paths, base_dir = find_images(source)
+    if not image_paths:
+        print(f"No images found in: {source}")
+        return {}
+
+    workers = workers or os.cpu_count() or 1
+    options = {'tile_above': tile_above * 1e6 if tile_above is not None else None, 'cache_dir': cache_dir,
+               'frame_dir': frame_dir, 'max_size': max_size, 'fast_decode': fast_decode, 'encodings': encodings,
+               'trace': ('memory' if trace_memory else 'time') if trace else None}
+    tasks = [(path, base_dir, output_folder, tuple(filter_names), options) for path in image_paths]
+    failed = {}
+    totals = {'hits': 0, 'misses': 0, 'frame_hits': 0, 'decode': 0.0, 'filter': 0.0, 'encode': 0.0}
+    events = []
+    start = time.perf_counter()
+
+    for done, (image_path, failures, stats) in enumerate(map_images(tasks, workers, chunksize), 1):
+        events.extend(stats.pop('events', ()))
+        for name, value in stats.items():
+            totals[name] += value
+        if failures:
+            failed[image_path] = failures
+            for filter_name, message in failures:
+                print(f"Failed: {image_path} [{filter_name or 'load'}] {message}")
+        if done % 100 == 0 or done == len(tasks):
+            print(f"Processed {done}/{len(tasks)} images")
+
+    elapsed = time.perf_counter() - start
+    print(f"Finished {len(tasks)} images with {workers} workers in {elapsed:.1f}s "
+          f"({len(tasks) / elapsed:.1f} images/s), {len(failed)} with failures")
+    print(f"Worker time: decode {totals['decode']:.1f}s, filter {totals['filter']:.1f}s, "
+          f"encode {totals['encode']:.1f}s")
+    if trace:
+        save_trace(trace, events)
+
+    if frame_dir:
+        # Once per run rather than in every worker; frames evicted while mapped stay readable until unmapped
+        removed, freed = FrameStore(frame_dir, frame_size).evict()
+        print(f"Frame store: {totals['frame_hits']} frames mapped, evicted {removed} frames ({freed / 2**20:.1f} MB)")
+    if cache_dir:
+        cache = ResultCache(cache_dir, cache_size)
+        cache.record(totals['hits'], totals['misses'])
+        removed, freed = cache.evict()
+        print(f"Result cache: {totals['hits']} hits, {totals['misses']} misses, evicted {removed} entries ({freed / 2**20:.1f} MB)")
+    return failed
+
+
+def save_trace(path, events):
+    """
+    Save traced events as a Chrome trace, with a JSON summary per span and resolution next to it
+    ('<path stem>.summary.json'), and print the slowest spans.
+    :param path: Chrome trace path
+    :param events: Events recorded by filters.profiling
+    """
+    summary = profiling.summarize(events)
+    summary_path = os.path.splitext(path)[0] + '.summary.json'
+    profiling.write_json(path, profiling.chrome_trace(events))
+    profiling.write_json(summary_path, summary)
+    print(profiling.format_summary(summary))
+    print(f"Trace saved to {path} (open in chrome://tracing or ui.perfetto.dev), summary to {summary_path}")
+
+
+def shared_memory_sizes(image_paths, max_size=None):
+    """
+    Size the shared-memory slots of a run from its images: the largest file, and the largest
+    frame as BGR, read from the JPEG and PNG headers and capped by max_size. Frames of other
+    formats are taken to fit in filters.shm.DEFAULT_FRAME_BYTES.
+    :param image_paths: Image paths of the run
+    :param max_size: Longest side the images are decoded at (default is full size)
+    :return: Tuple of (largest file in bytes, largest frame in bytes)
+    """
+    slot_bytes = frame_bytes = 1
+    for image_path in image_paths:
+        try:
+            slot_bytes = max(slot_bytes, os.path.getsize(image_path))
+        except OSError:
+            continue  # Reported when the image is read
+        size = header_size(image_path)
+        if size is None:
+            pixels = DEFAULT_SHM_FRAME_BYTES // 3 if max_size is None else max_size ** 2
+        else:
+            scale = 1 if max_size is None else min(1, max_size / max(size))
+            pixels = round(size[0] * scale) * round(size[1] * scale)
+        frame_bytes = max(frame_bytes, pixels * 3)
+    return slot_bytes, frame_bytes
+
+
+def run_pipelined(source, filter_names, output_folder='filtered', readers=2, computers=None, writers=2,
+                  queue_size=8, tile_above=None, max_size=None, fast_decode=False, encodings=None, processes=None,
+                  trace=None, trace_memory=False, frame_dir=None, frame_size=DEFAULT_FRAME_BYTES):
+    """
+    Apply a set of filters to every image with reading and decoding, filtering, and encoding and
+    writing overlapped in three thread pools (see filters.stages.run_stages), and report how busy
+    each stage was. Outputs are written atomically, so an interrupted run leaves no partial files.
+
+    With 'processes', the images are decoded and filtered in that many worker processes instead of
+    the filter threads, for filters that hold the GIL. Readers then only read the files into
+    shared memory, results stay there too (see filters.shm.SharedFramePool), and only slot
+    numbers are passed to the workers.
+    :param source: Directory path or glob pattern
+    :param filter_names: Names of the filters to apply (keys of FILTERS)
+    :param output_folder: Root output folder (default is 'filtered')
+    :param readers: Reader threads
+    :param computers: Filter threads (default is the number of CPU cores)
+    :param writers: Writer threads
+    :param queue_size: Images each queue between two stages holds at most
+    :param tile_above: Megapixels above which filters run strip by strip with bounded memory (default is never)
+    :param max_size: Longest side of the outputs in pixels (default is full size)
+    :param fast_decode: Decode in grayscale when every filter only needs the luma (bw, edges, bw sketch)
+    :param encodings: Output settings per filter (see filter_encodings()); default is OpenCV's JPEG defaults
+    :param processes: Worker processes to filter in, exchanging frames through shared memory (default is
+                      to filter in the threads)
+    :param trace: Path to save a Chrome trace to (see run_batch()); the filters are only traced when
+                  they run in the threads, not in worker processes
+    :param trace_memory: Also trace the memory every span allocates (slower)
+    :param frame_dir: Frame store directory the readers map decoded images from (see run_batch())
+    :param frame_size: Size in bytes the frame store is evicted down to after the run
+    :return: Dictionary mapping each failed image path to its list of (filter name, error message)
+    """
+    for filter_name in filter_names:
+        if filter_name not in FILTERS:
+            raise ValueError(f"Unknown filter '{filter_name}'. Available filters: {', '.join(FILTERS)}")
+
+    image_paths, base_dir = find_images(source)
+    if not image_paths:
+        print(f"No images found in: {source}")
+        return {}
+    pool = None
+    if processes:
+        slot_bytes, frame_bytes = shared_memory_sizes(image_paths, max_size)
+        # Every frame in the pipeline holds a slot: those being read, queued, filtered and written
+        pool = SharedFramePool(processes, slots=readers + processes + writers + 2 * queue_size, slot_bytes=slot_bytes,
+                               frame_bytes=frame_bytes,
+                               outputs_per_frame=sum(len(output_suffixes(name)) for name in filter_names))
+    computers = processes or computers or os.cpu_count() or 1
+    encodings = encodings or {}
+    grayscale = None if fast_decode else False
+    tile_above = tile_above * 1e6 if tile_above is not None else None
+    frames = FrameStore(frame_dir, frame_size) if frame_dir else None
+
+    def load(image_path):
+        if frames:
+            img, _ = frames.load(image_path, wants_grayscale(filter_names) if fast_decode else False, max_size)
+        else:
+            img, _ = load_image(image_path, filter_names, max_size, grayscale)
+        if img is None:
+            raise IOError('image could not be loaded')
+        return img
+
+    def read(image_path):
+        if pool is None:
+            return load(image_path)
+        # The worker maps the stored frame, or decodes the file read into the slot itself
+        slot = pool.acquire()
+        try:
+            if frames:
+                return slot, {'frame_path': load(image_path).filename}
+            size = pool.read(slot, image_path)
+        except BaseException:
+            pool.release(slot)
+            raise
+        if size is not None:
+            return slot, {'size': size}
+        pool.release(slot)  # The file grew too large for the slots since the run started
+        return load(image_path)
+
+    def compute(image_path, img):
+        if isinstance(img, tuple):
+            slot, source = img
+            try:
+                results = pool.run(slot, filter_names, max_size=max_size, grayscale=grayscale, tile_above=tile_above,
+                                   **source)
+            except BaseException:
+                pool.release(slot)
+                raise
+            return slot, {name: RuntimeError(result) if isinstance(result, str) else result
+                          for name, result in results.items()}
+
+        tile_options = {'threads': 1} if tile_above is not None and img.shape[0] * img.shape[1] > tile_above \
+            else None
+        results = {}
+        for filter_name in filter_names:
+            try:
+                results[filter_name] = apply_filter(filter_name, img, tile_options=tile_options)
+            except Exception as error:
+                results[filter_name] = error
+        return None, results
+
+    def write(image_path, computed):
+        slot, results = computed
+        try:
+            return save(image_path, results)
+        finally:
+            if slot is not None:
+                pool.release(slot)
+
+    def save(image_path, results):
+        failures = []
+        for filter_name, images in results.items():
+            try:
+                if isinstance(images, Exception):
+                    raise images
+                settings = encodings.get(filter_name) or PRESETS['default']
+                extension, _ = imencode_flags(settings)
+                paths = output_paths(image_path, base_dir, output_folder, filter_name, extension)
+                for image, path in zip(images if isinstance(images, tuple) else (images,), paths):
+                    _, encoded = encode(image, settings)
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    atomic_write(path, encoded)
+            except Exception as error:
+                failures.append((filter_name, f'{type(error).__name__}: {error}'))
+        return failures
+
+    # The filter threads share the CPU cores, so OpenCV's own thread pool only gets the spare ones
+    opencv_threads = cv2.getNumThreads()
+    cv2.setNumThreads(worker_threads(computers))
+    tracer = profiling.enable(trace_memory) if trace else None
+    try:
+        outcomes, report = run_stages(image_paths, read, compute, write, readers, computers, writers, queue_size)
+    finally:
+        cv2.setNumThreads(opencv_threads)
+        if tracer is not None:
+            profiling.disable()
+        if pool is not None:
+            pool.close()
+
+    failed = {}
+    for image_path, failures, error in outcomes:
+        failures = [(None, error)] if error else failures
+        if failures:
+            failed[image_path] = failures
+            for filter_name, message in failures:
+                print(f"Failed: {image_path} [{filter_name or 'load'}] {message}")
+
+    elapsed = report['seconds']
+    print(f"Finished {len(image_paths)} images in {elapsed:.1f}s ({len(image_paths) / elapsed:.1f} images/s), "
+          f"{len(failed)} with failures")
+    for name in ('read', 'compute', 'write'):
+        stage = report[name]
+        print(f"  {name:<8} {stage['threads']:2d} threads  {stage['utilization']:6.1%} busy  "
+              f"queue mean {stage['queue_mean']:4.1f} max {stage['queue_max']:3d}")
+    print(f"Bottleneck: {bottleneck(report)}")
+    if tracer is not None:
+        save_trace(trace, tracer.drain())
+    if frames:
+        removed, freed = frames.evict()
+        print(f"Frame store: {frames.hits} frames mapped, evicted {removed} frames ({freed / 2**20:.1f} MB)")
+    return failed
+
+
+def parse_filter_preset(value):
+    """
+    Parse a 'FILTER=PRESET' command line value.
+    :param value: Command line value
+    :return: Tuple of (filter name, preset name)
+    """
+    filter_name, _, preset = value.partition('=')
+    if filter_name not in FILTERS or preset not in PRESETS:
+        raise argparse.ArgumentTypeError(f"expected FILTER=PRESET with a preset among {', '.join(PRESETS)}, "
+                                         f"got '{value}'")
+    return filter_name, preset
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply the showcase filters to a directory or glob of images.')
+    parser.add_argument('source', help="Input directory (walked recursively) or glob pattern, e.g. 'photos/**/*.jpg'")
+    parser.add_argument('-f', '--filters', nargs='+', default=list(FILTERS), choices=list(FILTERS),
+                        metavar='FILTER', help=f"Filters to apply (default: all). Choices: {', '.join(FILTERS)}")
+    parser.add_argument('-o', '--output', default='filtered', help="Output folder (default: 'filtered')")
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunksize', type=int, default=None, help='Images handed to a worker at a time')
+    parser.add_argument('--tile-above', type=float, default=None, metavar='MEGAPIXELS',
+                        help='Process images larger than this strip by strip to bound memory')
+    parser.add_argument('--cache', nargs='?', const=DEFAULT_CACHE_DIR, default=None, metavar='DIR',
+                        help=f'Reuse results from a result cache (default directory: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_BYTES / 2**20, metavar='MB',
+                        help=f'Result cache size limit in MB (default: {DEFAULT_MAX_BYTES // 2**20})')
+    parser.add_argument('--frames', nargs='?', const=DEFAULT_FRAME_DIR, default=None, metavar='DIR',
+                        help=f'Map decoded images from a frame store, decoding and storing them on the first run '
+                             f'(default directory: {DEFAULT_FRAME_DIR})')
+    parser.add_argument('--frames-size', type=float, default=DEFAULT_FRAME_BYTES / 2**20, metavar='MB',
+                        help=f'Frame store size limit in MB (default: {DEFAULT_FRAME_BYTES // 2**20})')
+    parser.add_argument('--max-size', type=int, default=None, metavar='PIXELS',
+                        help='Shrink outputs to this longest side, decoding JPEGs at reduced size where possible')
+    parser.add_argument('--fast-decode', action='store_true',
+                        help='Decode in grayscale when all filters only need the luma (bw, edges, bw sketch)')
+    parser.add_argument('--pipelined', action='store_true',
+                        help='Overlap reading, filtering and writing in thread pools and report stage utilization')
+    parser.add_argument('--readers', type=int, default=2, help='Reader threads with --pipelined (default: 2)')
+    parser.add_argument('--writers', type=int, default=2, help='Writer threads with --pipelined (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=8,
+                        help='Images queued between two stages with --pipelined (default: 8)')
+    parser.add_argument('--processes', type=int, default=None,
+                        help='With --pipelined, filter in this many processes, passing frames through shared memory')
+    parser.add_argument('--trace', default=None, metavar='PATH',
+                        help='Time every filter, filter step, decode, encode and write, and save a Chrome trace '
+                             'with a summary per span and resolution')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='With --trace, also record the memory every span allocates (slower)')
+    parser.add_argument('--preset', default='default', choices=list(PRESETS),
+                        help="Output encoding: 'default' (OpenCV's JPEG quality 95), 'fast', 'small' or 'archive' "
+                             "(lossless PNG)")
+    parser.add_argument('--filter-preset', type=parse_filter_preset, action='append', default=[],
+                        metavar='FILTER=PRESET', help='Output encoding for one filter, overriding --preset')
+    args = parser.parse_args(argv)
+    encodings = filter_encodings(args.filters, args.preset, dict(args.filter_preset))
+
+    if args.pipelined:
+        if args.cache:
+            parser.error('--cache is not supported with --pipelined')
+        try:
+            failed = run_pipelined(args.source, args.filters, args.output, args.readers, args.workers, args.writers,
+                                   args.queue_size, args.tile_above, args.max_size, args.fast_decode, encodings,
+                                   args.processes, args.trace, args.trace_memory, args.frames,
+                                   int(args.frames_size * 2**20))
+        except ValueError as error:  # The shared memory the processes need isn't available
+            print(f"Error: {error}")
+            return 1
+        return 1 if failed else 0
+
+    failed = run_batch(args.source, args.filters, args.output, args.workers, args.chunksize, args.tile_above,
+                       args.cache, int(args.cache_size * 2**20), args.max_size, args.fast_decode, encodings,
+                       args.trace, args.trace_memory, args.frames, int(args.frames_size * 2**20))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,411 @@
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import cv2
+import numpy as np
+
+from filters import FILTERS, __version__, apply_filter
+from filters.batched import BATCH_FILTERS, apply_batch
+from filters.encoding import PRESETS, encode, encoding_settings
+
+# Synthetic image sizes benchmarked, as (width, height)
+RESOLUTIONS = {
+    'vga': (640, 480),
+    '720p': (1280, 720),
+    '1080p': (1920, 1080),
+    '4k': (3840, 2160),
+    '8k': (7680, 4320),
+}
+
+# Channel counts benchmarked by default; filters that don't support one are reported as such
+CHANNELS = (1, 3, 4)
+
+# In the repository's results folder whatever the working directory; git ignores the JSON files there
+DEFAULT_OUTPUT = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'results',
+                                               'benchmark.json'))
+
+# Rows of the synthetic image computed at a time, so building an 8K image doesn't take gigabytes of float planes
+_SYNTHETIC_STRIP_ROWS = 256
+
+# Slowdown of the median latency, as a fraction of the baseline, reported as a regression
+DEFAULT_THRESHOLD = 0.10
+
+
+def synthetic_image(width, height, channels, seed=0):
+    """
+    Build a reproducible test image: smooth gradients (like skies and skin) with noise and a few
+    sharp-edged shapes on top, so edge and texture filters have realistic amounts of work to do.
+    :param width: Image width
+    :param height: Image height
+    :param channels: Number of channels (1, 3 or 4)
+    :param seed: Random seed
+    :return: uint8 image
+    """
+    rng = np.random.default_rng(seed)
+    img = np.empty((height, width, channels) if channels > 1 else (height, width), np.uint8)
+    x = np.arange(width, dtype=np.float32)
+    # Strip by strip straight into the uint8 image; the noise is drawn in the same order as for the whole image
+    for top in range(0, height, _SYNTHETIC_STRIP_ROWS):
+        y = np.arange(top, min(top + _SYNTHETIC_STRIP_ROWS, height), dtype=np.float32)[:, None]
+        planes = [(x / width * 255 * (c + 1) / channels + y / height * 128) % 256 for c in range(channels)]
+        strip = np.dstack(planes) if channels > 1 else planes[0]
+        strip = strip + rng.normal(0, 12, strip.shape).astype(np.float32)
+        img[top:top + len(y)] = np.clip(strip, 0, 255)
+    for _ in range(20):
+        center = (int(rng.integers(width)), int(rng.integers(height)))
+        color = tuple(int(value) for value in rng.integers(0, 256, channels))
+        cv2.circle(img, center, int(rng.integers(height // 20, height // 4)), color, -1)
+    return img
+
+
+def _proc_status_mb(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 2**10  # Reported in kB
+    raise OSError(f'{field} missing from /proc/self/status')
+
+
+def _reset_peak_rss():
+    """
+    Reset the process's peak RSS to its current RSS, so the peak measured next belongs to the code
+    run after the reset (Linux only).
+    :return: RSS in MB at the reset, or None where the peak can't be reset
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as clear_refs:
+            clear_refs.write('5')
+        return _proc_status_mb('VmRSS')
+    except OSError:
+        return None
+
+
+def _peak_alloc_mb(func):
+    """
+    Peak memory allocated by one call on top of what was held before, as tracemalloc sees it:
+    NumPy arrays, including those OpenCV returns, but not OpenCV's internal scratch buffers.
+    :param func: Function to call
+    :return: Peak in MB
+    """
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def run_case(case):
+    """
+    Benchmark one filter on one synthetic image. Runs in a fresh worker process. Memory is the
+    filter's own: the image is built before the peak RSS is reset, and the growth of the peak
+    over the filter calls is reported along with the tracemalloc peak of one more, untimed call
+    (tracing would slow the timed ones down).
+    :param case: Tuple of (filter name, resolution name, channels, repeats, warmup runs, max seconds)
+    :return: Result dictionary
+    """
+    filter_name, resolution, channels, repeats, warmup, max_seconds = case
+    width, height = RESOLUTIONS[resolution]
+    result = {'filter': filter_name, 'resolution': resolution, 'width': width, 'height': height,
+              'channels': channels}
+    img = synthetic_image(width, height, channels)
+    base_rss = _reset_peak_rss()
+
+    try:
+        for _ in range(warmup):
+            apply_filter(filter_name, img)
+        timings = []
+        budget_start = time.perf_counter()
+        while len(timings) < repeats:
+            start = time.perf_counter()
+            apply_filter(filter_name, img)
+            timings.append(time.perf_counter() - start)
+            # Slow cases (stylization at 8K) stop early rather than holding up the whole suite
+            if time.perf_counter() - budget_start > max_seconds:
+                break
+        peak_rss = None if base_rss is None else _proc_status_mb('VmHWM') - base_rss
+        peak_alloc = _peak_alloc_mb(lambda: apply_filter(filter_name, img))
+    except cv2.error as error:
+        result['error'] = f"unsupported: {error.err.strip().splitlines()[0].strip('>: ')}"
+        return result
+    except Exception as error:  # A failing case is recorded like a crash and doesn't end the suite
+        result['error'] = f'crashed: {type(error).__name__}: {error}'
+        return result
+
+    median = float(np.median(timings))
+    result.update({
+        'repeats': len(timings),
+        'median_ms': median * 1000,
+        'p95_ms': float(np.percentile(timings, 95)) * 1000,
+        'mp_per_s': width * height / 1e6 / median,
+        'peak_rss_mb': peak_rss,
+        'peak_alloc_mb': peak_alloc,
+    })
+    return result
+
+
+def init_worker(threads):
+    """
+    Worker process initializer.
+    :param threads: OpenCV threads per filter call (None keeps OpenCV's default)
+    """
+    if threads is not None:
+        cv2.setNumThreads(threads)
+
+
+def machine_info():
+    """
+    Describe the machine and library versions, so results from different machines aren't mixed up.
+    :return: Dictionary
+    """
+    return {'platform': platform.platform(), 'processor': platform.processor() or platform.machine(),
+            'cpu_count': os.cpu_count(), 'python': platform.python_version(), 'opencv': cv2.__version__,
+            'numpy': np.__version__, 'filters': __version__}
+
+
+def run_benchmarks(filter_names, resolutions, channels, repeats=5, warmup=1, max_seconds=10.0, threads=None):
+    """
+    Benchmark every combination of filter, resolution and channel count, each in its own process
+    so that peak memory is measured per case and a case crashing OpenCV doesn't end the run.
+    :param filter_names: Filters to benchmark (keys of FILTERS)
+    :param resolutions: Resolution names (keys of RESOLUTIONS)
+    :param channels: Channel counts
+    :param repeats: Timed runs per case
+    :param warmup: Untimed runs per case before timing
+    :param max_seconds: Time after which a case stops repeating
+    :param threads: OpenCV threads per filter call (default is OpenCV's own)
+    :return: List of result dictionaries
+    """
+    cases = [(filter_name, resolution, count, repeats, warmup, max_seconds)
+             for resolution in resolutions for count in channels for filter_name in filter_names]
+    results = []
+    for case in cases:
+        with ProcessPoolExecutor(max_workers=1, initializer=init_worker, initargs=(threads,)) as executor:
+            try:
+                result = executor.submit(run_case, case).result()
+            except BrokenProcessPool:
+                filter_name, resolution, count = case[:3]
+                width, height = RESOLUTIONS[resolution]
+                result = {'filter': filter_name, 'resolution': resolution, 'width': width, 'height': height,
+                          'channels': count, 'error': 'crashed'}
+        print(format_result(result))
+        results.append(result)
+    return results
+
+
+def run_encoding_benchmarks(filter_names, resolutions, presets, repeats=5, image_path=None):
+    """
+    Benchmark the output encoding presets: encode every filter's result with every preset and
+    measure the time and size per image. Synthetic images compress differently from photos, so
+    a real photo can be given instead; it is resized to each resolution.
+    :param filter_names: Filters whose results are encoded (keys of FILTERS)
+    :param resolutions: Resolution names (keys of RESOLUTIONS)
+    :param presets: Preset names (keys of filters.encoding.PRESETS)
+    :param repeats: Timed encodes per case
+    :param image_path: Photo to filter instead of the synthetic image (default is none)
+    :return: List of result dictionaries
+    """
+    photo = None
+    if image_path is not None:
+        photo = cv2.imread(image_path)
+        if photo is None:
+            raise IOError(f"Image could not be loaded: {image_path}")
+    results = []
+    for resolution in resolutions:
+        width, height = RESOLUTIONS[resolution]
+        img = synthetic_image(width, height, 3) if photo is None else \
+            cv2.resize(photo, (width, height), interpolation=cv2.INTER_AREA)
+        for filter_name in filter_names:
+            output = apply_filter(filter_name, img)
+            output = output[0] if isinstance(output, tuple) else output
+            for preset in presets:
+                settings = encoding_settings(preset, filter_name)
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    _, encoded = encode(output, settings)
+                    timings.append(time.perf_counter() - start)
+                result = {'filter': filter_name, 'resolution': resolution, 'preset': preset,
+                          'format': settings['format'], 'median_ms': float(np.median(timings)) * 1000,
+                          'bytes': int(encoded.size), 'bits_per_pixel': encoded.size * 8 / (width * height)}
+                print(format_encoding_result(result))
+                results.append(result)
+    return results
+
+
+def run_batch_benchmarks(sizes, count=64, repeats=5):
+    """
+    Benchmark the batch variants against filtering one image per call, on stacks of small square
+    images where the per-call overhead matters most.
+    :param sizes: Image sides in pixels (e.g. 256 and 512)
+    :param count: Images per stack
+    :param repeats: Timed runs per case
+    :return: List of result dictionaries
+    """
+    results = []
+    for size in sizes:
+        stack = np.stack([synthetic_image(size, size, 3, seed) for seed in range(count)])
+        for filter_name in BATCH_FILTERS:
+            rates = {}
+            for mode, run in (('per_image', lambda: [apply_filter(filter_name, img) for img in stack]),
+                              ('batch', lambda: apply_batch(filter_name, stack))):
+                run()
+                timings = []
+                for _ in range(repeats):
+                    start = time.perf_counter()
+                    run()
+                    timings.append(time.perf_counter() - start)
+                rates[mode] = count / float(np.median(timings))
+            result = {'filter': filter_name, 'size': size, 'count': count,
+                      'per_image_per_s': rates['per_image'], 'batch_per_s': rates['batch'],
+                      'speedup': rates['batch'] / rates['per_image']}
+            print(format_batch_result(result))
+            results.append(result)
+    return results
+
+
+def format_batch_result(result):
+    """
+    Format one batch result as a table row.
+    :param result: Result dictionary
+    :return: String
+    """
+    return (f"{result['filter']:<24} {result['size']:>4}x{result['size']:<4} per image "
+            f"{result['per_image_per_s']:8.0f} images/s  batch {result['batch_per_s']:8.0f} images/s  "
+            f"x{result['speedup']:.2f}")
+
+
+def format_encoding_result(result):
+    """
+    Format one encoding result as a table row.
+    :param result: Result dictionary
+    :return: String
+    """
+    return (f"{result['filter']:<24} {result['resolution']:>6} {result['preset']:<8} {result['format']:<4}  "
+            f"encode {result['median_ms']:8.1f} ms  {result['bytes'] / 2**10:9.0f} KB  "
+            f"{result['bits_per_pixel']:5.2f} bits/pixel")
+
+
+def format_result(result):
+    """
+    Format one result as a table row.
+    :param result: Result dictionary
+    :return: String
+    """
+    label = f"{result['filter']:<24} {result['resolution']:>6} {result['channels']}ch"
+    if 'error' in result:
+        return f"{label}  {result['error']}"
+    rss = f"{result['peak_rss_mb']:6.0f} MB" if result.get('peak_rss_mb') is not None else '     n/a'
+    alloc = f"{result['peak_alloc_mb']:6.0f} MB" if result.get('peak_alloc_mb') is not None else '     n/a'
+    return (f"{label}  median {result['median_ms']:9.1f} ms  p95 {result['p95_ms']:9.1f} ms  "
+            f"{result['mp_per_s']:8.1f} MP/s  peak RSS +{rss}  arrays {alloc}")
+
+
+def _case_key(result):
+    return result['filter'], result['resolution'], result['channels']
+
+
+def compare(results, baseline, threshold=DEFAULT_THRESHOLD):
+    """
+    Compare results with a baseline run.
+    :param results: Result dictionaries of this run
+    :param baseline: Result dictionaries of the baseline run
+    :param threshold: Slowdown of the median latency, as a fraction, counted as a regression
+    :return: List of (result, baseline result, relative change) for the cases that regressed,
+             the change being None for cases that used to work and now fail
+    """
+    reference = {_case_key(result): result for result in baseline if 'error' not in result}
+    regressions = []
+    for result in results:
+        previous = reference.get(_case_key(result))
+        if previous is None:
+            continue
+        if 'error' in result:
+            regressions.append((result, previous, None))
+            continue
+        change = result['median_ms'] / previous['median_ms'] - 1
+        if change > threshold:
+            regressions.append((result, previous, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the filters on synthetic images and catch regressions.')
+    parser.add_argument('-f', '--filters', nargs='+', default=list(FILTERS), choices=list(FILTERS),
+                        metavar='FILTER', help=f"Filters to benchmark (default: all). Choices: {', '.join(FILTERS)}")
+    parser.add_argument('-r', '--resolutions', nargs='+', default=list(RESOLUTIONS), choices=list(RESOLUTIONS),
+                        help='Image sizes (default: all)')
+    parser.add_argument('-c', '--channels', nargs='+', type=int, default=list(CHANNELS), choices=CHANNELS,
+                        help='Channel counts (default: 1 3 4)')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per case (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed runs per case (default: 1)')
+    parser.add_argument('--max-seconds', type=float, default=10.0,
+                        help='Stop repeating a case after this long (default: 10)')
+    parser.add_argument('--threads', type=int, default=None, help="OpenCV threads (default: OpenCV's choice)")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help="Results file (default: results/benchmark.json in the repository)")
+    parser.add_argument('--baseline', default=None, help='Results file to compare with')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD * 100, metavar='PERCENT',
+                        help=f'Median slowdown counted as a regression (default: {DEFAULT_THRESHOLD * 100:.0f}%%)')
+    parser.add_argument('--update-baseline', action='store_true',
+                        help='Write the results to the baseline file instead of comparing')
+    parser.add_argument('--presets', nargs='+', default=None, choices=list(PRESETS),
+                        help='Also measure encode time and bytes per image of these output presets')
+    parser.add_argument('--image', default=None,
+                        help='Photo whose filtered results are encoded with --presets (default: synthetic images)')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=None, metavar='PIXELS',
+                        help='Also compare the batch variants with per-image calls on square images of these sides '
+                             '(e.g. 256 512)')
+    parser.add_argument('--batch-count', type=int, default=64, help='Images per batch (default: 64)')
+    args = parser.parse_args(argv)
+
+    baseline = None
+    if args.baseline and not args.update_baseline:
+        with open(args.baseline) as baseline_file:
+            baseline = json.load(baseline_file)
+
+    machine = machine_info()
+    print(f"{machine['platform']}, {machine['cpu_count']} CPUs, OpenCV {machine['opencv']}, "
+          f"NumPy {machine['numpy']}, filters {machine['filters']}")
+    results = run_benchmarks(args.filters, args.resolutions, args.channels, args.repeats, args.warmup,
+                             args.max_seconds, args.threads)
+
+    report = {'machine': machine, 'created': time.time(), 'results': results}
+    if args.presets:
+        print('Encoding:')
+        report['encoding'] = run_encoding_benchmarks(args.filters, args.resolutions, args.presets, args.repeats,
+                                                     args.image)
+    if args.batch_sizes:
+        print('Batch:')
+        report['batch'] = run_batch_benchmarks(args.batch_sizes, args.batch_count, args.repeats)
+    outputs = [args.output] + ([args.baseline] if args.update_baseline and args.baseline else [])
+    for path in outputs:
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        with open(path, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    print(f"Results written to {', '.join(outputs)}")
+
+    if baseline is None:
+        return 0
+    if any(baseline['machine'].get(key) != value for key, value in machine.items() if key != 'filters'):
+        print("Warning: the baseline was recorded on a different machine or library versions")
+    regressions = compare(results, baseline['results'], args.threshold / 100)
+    for result, previous, change in regressions:
+        if change is None:
+            print(f"Regression: {result['filter']} {result['resolution']} {result['channels']}ch "
+                  f"now fails ({result['error']})")
+            continue
+        print(f"Regression: {result['filter']} {result['resolution']} {result['channels']}ch "
+              f"{previous['median_ms']:.1f} -> {result['median_ms']:.1f} ms (+{change:.0%})")
+    print(f"{len(regressions)} regressions above {args.threshold:.0f}% against {args.baseline}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from benchmark_sepia import DEFAULT_IMAGE, time_call
+from filters import FILTERS, apply_filter
+from filters.backends import BACKEND_FILTERS, BACKENDS, resolve_backend
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the execution backends of the filters and check them '
+                                                 'against each other.')
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE, help='Image to benchmark on')
+    parser.add_argument('-f', '--filters', nargs='+', default=[name for name in FILTERS if name in
+                                                                BACKEND_FILTERS['umat'] or name in BACKEND_FILTERS['numpy']],
+                        choices=list(FILTERS), metavar='FILTER',
+                        help='Filters to compare (default: those with an implementation besides OpenCV)')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per backend (default: 5)')
+    parser.add_argument('--threads', type=int, default=None,
+                        help="OpenCV threads (default: OpenCV's own, usually one per core)")
+    parser.add_argument('--max-diff', type=int, default=1,
+                        help='Largest allowed per-pixel difference from the OpenCV backend (default: 1)')
+    args = parser.parse_args(argv)
+
+    img = cv2.imread(args.image)
+    if img is None:
+        print(f"Error: Image could not be loaded: {args.image}")
+        return 1
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+
+    megapixels = img.shape[0] * img.shape[1] / 1e6
+    print(f"{os.path.basename(args.image)}: {img.shape[1]}x{img.shape[0]} ({megapixels:.1f} MP), "
+          f"{cv2.getNumThreads()} OpenCV threads, OpenCL {'available' if cv2.ocl.haveOpenCL() else 'unavailable'}")
+    if resolve_backend('umat') != 'umat':
+        print("  'umat' falls back to 'opencv' in apply_filter(); its timings below are the UMat calls on the CPU")
+    print(f"  {'filter':<20} {'backend':<7} {'time':>9}  {'max diff':>8} {'differing':>9}")
+
+    failed = []
+    for filter_name in args.filters:
+        params = FILTERS[filter_name]['params']
+        reference = apply_filter(filter_name, img)
+        for backend in BACKENDS:
+            func = FILTERS[filter_name]['func'] if backend == 'opencv' else BACKEND_FILTERS[backend].get(filter_name)
+            if func is None:
+                continue
+            seconds = time_call(lambda: func(img, **params), args.runs)
+            diff = np.abs(func(img, **params).astype(np.int16) - reference.astype(np.int16))
+            print(f"  {filter_name:<20} {backend:<7} {seconds * 1000:6.1f} ms  {diff.max():8d} {(diff > 0).mean():9.3%}")
+            if diff.max() > args.max_diff:
+                failed.append(f'{filter_name} ({backend})')
+
+    if failed:
+        print(f"Error: results differ from the OpenCV backend by more than {args.max_diff}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from benchmark_sepia import DEFAULT_IMAGE, time_call
+from filters.blur import BOX_RADIUS_THRESHOLD, blur_method, gaussian_blur
+
+# Largest mean difference from cv2.GaussianBlur the box cascade may have, on the default image
+MAX_MEAN_ERROR = 0.5
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the exact Gaussian pre-blur with the box cascade '
+                                                 'across radii.')
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE, help='Image to benchmark on')
+    parser.add_argument('--radii', type=int, nargs='+', default=[2, 4, 8, 16, 32, 64],
+                        help='Blur radii to compare (default: 2 4 8 16 32 64)')
+    parser.add_argument('--runs', type=int, default=5, help='Timed runs per variant (default: 5)')
+    parser.add_argument('--max-mean-error', type=float, default=MAX_MEAN_ERROR,
+                        help='Largest allowed mean difference from cv2.GaussianBlur for radii the box '
+                             f'cascade is used at, above {BOX_RADIUS_THRESHOLD} (default: {MAX_MEAN_ERROR:g})')
+    args = parser.parse_args(argv)
+
+    img = cv2.imread(args.image)
+    if img is None:
+        print(f"Error: Image could not be loaded: {args.image}")
+        return 1
+
+    megapixels = img.shape[0] * img.shape[1] / 1e6
+    out = np.empty_like(img)
+    print(f"{os.path.basename(args.image)}: {img.shape[1]}x{img.shape[0]} ({megapixels:.1f} MP)")
+    print(f"  {'radius':>6} {'gaussian':>11} {'box':>11} {'auto':>9}  {'mean err':>8} {'max err':>7}")
+
+    failed = []
+    for radius in args.radii:
+        gaussian_time = time_call(lambda: gaussian_blur(img, radius, 'gaussian', out=out), args.runs)
+        box_time = time_call(lambda: gaussian_blur(img, radius, 'box', out=out), args.runs)
+        diff = np.abs(gaussian_blur(img, radius, 'box').astype(np.int16)
+                      - gaussian_blur(img, radius, 'gaussian').astype(np.int16))
+        print(f"  {radius:6d} {gaussian_time * 1000:8.1f} ms {box_time * 1000:8.1f} ms {blur_method(radius):>9}  "
+              f"{diff.mean():8.3f} {diff.max():7d}")
+        if blur_method(radius) == 'box' and diff.mean() > args.max_mean_error:
+            failed.append(radius)
+
+    if failed:
+        print(f"Error: the box cascade differs from cv2.GaussianBlur by more than {args.max_mean_error} on average "
+              f"at radius {', '.join(map(str, failed))}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from benchmark_sepia import DEFAULT_IMAGE
+from filters.npr import stylization
+
+# Longest side the image is compared at. PSNR and SSIM of the approximations depend on the size
+# (the exact filters behave differently on large images), so the gate is only meaningful at a
+# fixed one; the exact filters take seconds per megapixel at full size anyway.
+BENCHMARK_SIZE = 2048
+
+# Least PSNR and SSIM every fast result must keep against the exact filter, on the default image
+MIN_PSNR = 29.0
+MIN_SSIM = 0.9
+
+# Outputs compared: name -> function(image, quality). The pencil sketch has no fast path to compare.
+ENGINES = {
+    'stylization': lambda img, quality: stylization(img, quality=quality),
+}
+
+
+def psnr(result, reference):
+    """
+    Peak signal-to-noise ratio of a result against a reference.
+    :param result: uint8 image
+    :param reference: uint8 image of the same shape
+    :return: PSNR in dB (inf for identical images)
+    """
+    mse = np.mean((result.astype(np.float64) - reference) ** 2)
+    return float('inf') if mse == 0 else float(10 * np.log10(255 ** 2 / mse))
+
+
+def ssim(result, reference):
+    """
+    Structural similarity of a result against a reference, with the usual 11x11 Gaussian window
+    (sigma 1.5), averaged over the image and its channels.
+    :param result: uint8 image
+    :param reference: uint8 image of the same shape
+    :return: SSIM, 1 for identical images
+    """
+    x, y = result.astype(np.float64), reference.astype(np.float64)
+    c1, c2 = (0.01 * 255) ** 2, (0.03 * 255) ** 2
+
+    def window(img):
+        return cv2.GaussianBlur(img, (11, 11), 1.5)
+
+    mean_x, mean_y = window(x), window(y)
+    var_x = window(x * x) - mean_x ** 2
+    var_y = window(y * y) - mean_y ** 2
+    cov = window(x * y) - mean_x * mean_y
+    ssim_map = ((2 * mean_x * mean_y + c1) * (2 * cov + c2)) / ((mean_x ** 2 + mean_y ** 2 + c1) * (var_x + var_y + c2))
+    return float(ssim_map.mean())
+
+
+def prepare_image(path, size=BENCHMARK_SIZE):
+    """
+    Load an image, shrink it to the benchmark size and pre-blur it as the filters do.
+    :param path: Image path
+    :param size: Longest side in pixels
+    :return: BGR image, or None if it can't be loaded
+    """
+    img = cv2.imread(path)
+    if img is None:
+        return None
+    scale = size / max(img.shape[:2])
+    if scale < 1:
+        img = cv2.resize(img, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(img, (5, 5), 0)  # What the filters hand to OpenCV
+
+
+def timed(func):
+    """
+    Time one call.
+    :param func: Function without arguments
+    :return: Tuple of (its result, seconds)
+    """
+    start = time.perf_counter()
+    result = func()
+    return result, time.perf_counter() - start
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare the fast stylization with the exact '
+                                                 f'OpenCV filter at {BENCHMARK_SIZE} pixels: speed, PSNR and SSIM.')
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE, help='Image to benchmark on')
+    parser.add_argument('--qualities', type=float, nargs='+', default=[0.75, 0.5, 0.25],
+                        help='Quality settings to compare (default: 0.75 0.5 0.25)')
+    parser.add_argument('--min-psnr', type=float, default=MIN_PSNR,
+                        help=f'Fail if any fast result falls below this PSNR (default: {MIN_PSNR:g} dB)')
+    parser.add_argument('--min-ssim', type=float, default=MIN_SSIM,
+                        help=f'Fail if any fast result falls below this SSIM (default: {MIN_SSIM:g})')
+    args = parser.parse_args(argv)
+
+    img = prepare_image(args.image)
+    if img is None:
+        print(f"Error: Image could not be loaded: {args.image}")
+        return 1
+
+    megapixels = img.shape[0] * img.shape[1] / 1e6
+    print(f"{os.path.basename(args.image)}: {img.shape[1]}x{img.shape[0]} ({megapixels:.1f} MP)")
+
+    failed = []
+    for name, run in ENGINES.items():
+        reference, exact_seconds = timed(lambda: run(img, 1.0))
+        print(f"  {name:<14} exact   {exact_seconds * 1000:8.0f} ms")
+        for quality in args.qualities:
+            result, seconds = timed(lambda: run(img, quality))
+            quality_psnr, quality_ssim = psnr(result, reference), ssim(result, reference)
+            print(f"  {name:<14} q={quality:<4} {seconds * 1000:8.0f} ms  x{exact_seconds / seconds:4.1f}  "
+                  f"PSNR {quality_psnr:5.1f} dB  SSIM {quality_ssim:.3f}")
+            if quality_psnr < args.min_psnr or quality_ssim < args.min_ssim:
+                failed.append(f'{name} at {quality:g}')
+
+    if failed:
+        print(f"Error: below {args.min_psnr:g} dB PSNR or {args.min_ssim:g} SSIM: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
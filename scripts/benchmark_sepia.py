@@ -0,0 +1,71 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from filters import sepia, sepia_fast
+
+# The 4000px sample the sepia showcase script filters
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'filtered', 'originals',
+                             'flower_original.jpg')
+
+
+def time_call(func, runs):
+    """
+    Time a function over several runs after one warm-up call.
+    :param func: Function without arguments
+    :param runs: Number of timed runs
+    :return: Median time per call in seconds
+    """
+    func()
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return float(np.median(timings))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Compare sepia() with the single-pass sepia_fast().')
+    parser.add_argument('image', nargs='?', default=DEFAULT_IMAGE, help='Image to benchmark on')
+    parser.add_argument('--runs', type=int, default=10, help='Timed runs per variant (default: 10)')
+    parser.add_argument('--max-diff', type=int, default=1,
+                        help='Largest allowed per-pixel difference from sepia() (default: 1)')
+    args = parser.parse_args(argv)
+
+    img = cv2.imread(args.image)
+    if img is None:
+        print(f"Error: Image could not be loaded: {args.image}")
+        return 1
+
+    megapixels = img.shape[0] * img.shape[1] / 1e6
+    out = np.empty_like(img)
+    variants = [
+        ('sepia', lambda: sepia(img)),
+        ('sepia_fast', lambda: sepia_fast(img)),
+        ('sepia_fast(out=)', lambda: sepia_fast(img, out=out)),
+    ]
+
+    print(f"{os.path.basename(args.image)}: {img.shape[1]}x{img.shape[0]} ({megapixels:.1f} MP)")
+    reference_time = None
+    for name, func in variants:
+        seconds = time_call(func, args.runs)
+        reference_time = reference_time or seconds
+        print(f"  {name:<18} {seconds * 1000:8.1f} ms  {megapixels / seconds:8.1f} MP/s  "
+              f"x{reference_time / seconds:.1f}")
+
+    diff = np.abs(sepia_fast(img).astype(np.int16) - sepia(img).astype(np.int16))
+    print(f"  max abs diff {diff.max()}, {np.count_nonzero(diff) / diff.size:.2%} of values differ")
+
+    if diff.max() > args.max_diff:
+        print(f"Error: sepia_fast differs from sepia by more than {args.max_diff}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
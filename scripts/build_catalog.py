@@ -0,0 +1,140 @@
+import argparse
+import os
+import sys
+import time
+
+from batch_process import find_images, map_images, output_paths
+from filters import FILTERS, output_suffixes
+from filters.manifest import Manifest, file_digest, is_current
+
+# Name of the manifest file kept in the output folder
+MANIFEST_NAME = 'manifest.sqlite'
+
+
+def plan_build(image_paths, base_dir, output_folder, filter_names, artifacts):
+    """
+    Work out what an incremental build has to do by comparing the catalog with the manifest.
+    Sources whose mtime or size changed are hashed, so a touched but unchanged file costs a read, not a rebuild.
+    :param image_paths: Source images of the catalog
+    :param base_dir: Directory the relative output layout is computed from
+    :param output_folder: Root output folder
+    :param filter_names: Filters every source should have an output of
+    :param artifacts: Manifest.artifacts() of the output folder
+    :return: Tuple of (dictionary mapping source path to the filters to rebuild, sources to re-stat, orphan outputs)
+    """
+    expected = set()
+    stale = {}
+    touched = set()
+
+    for image_path in image_paths:
+        source_stat = os.stat(image_path)
+        digest = None
+        for filter_name in filter_names:
+            params = FILTERS[filter_name]['params']
+            for path in map(os.path.abspath, output_paths(image_path, base_dir, output_folder, filter_name)):
+                expected.add(path)
+                row = artifacts.get(path)
+                if row is None or row['source_path'] != image_path or not os.path.exists(path):
+                    current = False
+                else:
+                    current = is_current(row, source_stat, params)
+                    if current is None:
+                        digest = digest or file_digest(image_path)
+                        current = row['source_hash'] == digest
+                        if current:
+                            touched.add(image_path)
+                if not current and filter_name not in stale.get(image_path, []):
+                    stale.setdefault(image_path, []).append(filter_name)
+
+    orphans = sorted(path for path in artifacts if path not in expected)
+    return stale, touched, orphans
+
+
+def build_catalog(source, filter_names, output_folder='filtered', workers=None, keep_orphans=False, dry_run=False):
+    """
+    Incrementally rebuild a filtered catalog: only missing or stale outputs are recomputed, and
+    outputs whose source or filter left the catalog are deleted. Everything built is recorded in
+    the manifest in the output folder.
+    :param source: Source directory or glob pattern
+    :param filter_names: Filters every source should have an output of
+    :param output_folder: Root output folder (default is 'filtered')
+    :param workers: Number of worker processes (default is the number of CPU cores)
+    :param keep_orphans: Leave orphan outputs on disk and in the manifest
+    :param dry_run: Only report what would be done
+    :return: Dictionary mapping each failed image path to its list of (filter name, error message)
+    """
+    start = time.perf_counter()
+    image_paths, base_dir = find_images(source)
+    image_paths = [os.path.abspath(path) for path in image_paths]
+    base_dir = os.path.abspath(base_dir) if base_dir else base_dir
+    failed = {}
+
+    with Manifest(os.path.join(output_folder, MANIFEST_NAME)) as manifest:
+        artifacts = manifest.artifacts()
+        stale, touched, orphans = plan_build(image_paths, base_dir, output_folder, filter_names, artifacts)
+        outputs = sum(len(output_suffixes(name)) for name in filter_names) * len(image_paths)
+        rebuilds = sum(len(names) for names in stale.values())
+        print(f"{len(image_paths)} sources, {outputs} outputs: {rebuilds} filter runs over {len(stale)} sources "
+              f"to redo, {len(orphans)} orphans")
+        if dry_run:
+            for image_path, names in sorted(stale.items()):
+                print(f"  rebuild {image_path}: {', '.join(names)}")
+            for path in orphans:
+                print(f"  orphan {path}")
+            return failed
+
+        for image_path in touched:
+            manifest.touch_source(image_path, os.stat(image_path))
+
+        if stale:
+            options = {'tile_above': None, 'cache_dir': None}
+            tasks = [(path, base_dir, output_folder, tuple(names), options) for path, names in stale.items()]
+            for image_path, failures, _ in map_images(tasks, workers):
+                failed_filters = {name for name, _ in failures}
+                if failures:
+                    failed[image_path] = failures
+                    for filter_name, message in failures:
+                        print(f"Failed: {image_path} [{filter_name or 'load'}] {message}")
+                if None in failed_filters:
+                    continue
+                source_stat = os.stat(image_path)
+                digest = file_digest(image_path)
+                for filter_name in stale[image_path]:
+                    if filter_name in failed_filters:
+                        continue
+                    for path in output_paths(image_path, base_dir, output_folder, filter_name):
+                        manifest.record(os.path.abspath(path), image_path, source_stat, digest, filter_name,
+                                        FILTERS[filter_name]['params'])
+                manifest.commit()
+
+        if not keep_orphans:
+            for path in orphans:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                manifest.remove(path)
+
+    print(f"Rebuilt {rebuilds} filter runs, removed {0 if keep_orphans else len(orphans)} orphans "
+          f"in {time.perf_counter() - start:.1f}s, {len(failed)} images with failures")
+    return failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Incrementally rebuild a filtered catalog from its manifest.')
+    parser.add_argument('source', help="Source directory (walked recursively) or glob pattern")
+    parser.add_argument('-f', '--filters', nargs='+', default=list(FILTERS), choices=list(FILTERS),
+                        metavar='FILTER', help=f"Filters of the catalog (default: all). Choices: {', '.join(FILTERS)}")
+    parser.add_argument('-o', '--output', default='filtered', help="Output folder (default: 'filtered')")
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--keep-orphans', action='store_true',
+                        help='Keep outputs whose source or filter is no longer part of the catalog')
+    parser.add_argument('-n', '--dry-run', action='store_true', help='Only show what would be rebuilt or removed')
+    args = parser.parse_args(argv)
+
+    failed = build_catalog(args.source, args.filters, args.output, args.workers, args.keep_orphans, args.dry_run)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,60 @@
+import argparse
+import os
+import subprocess
+import sys
+
+# Budget for importing the filters package on top of cv2 and numpy, in milliseconds
+DEFAULT_BUDGET_MS = 50.0
+
+# Runs in a fresh interpreter: cv2 and numpy are imported first so only the package's own cost is timed.
+# Any module from this list showing up after the import means something is loaded eagerly again.
+PROBE = """
+import sys, time
+import cv2, numpy
+start = time.perf_counter()
+import filters
+elapsed_ms = (time.perf_counter() - start) * 1000
+eager = [name for name in ('matplotlib', 'matplotlib.pyplot', 'filters.preview', 'filters.config') if name in sys.modules]
+print(elapsed_ms)
+print(','.join(eager))
+"""
+
+
+def measure_import_time(runs=5):
+    """
+    Measure how long importing the filters package takes in fresh interpreters.
+    :param runs: Number of interpreters to start (the fastest run is reported)
+    :return: Tuple of (best import time in milliseconds, list of modules that were loaded eagerly)
+    """
+    scripts_folder = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    eager = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, '-c', PROBE], cwd=scripts_folder, check=True,
+                                capture_output=True, text=True).stdout.splitlines()
+        timings.append(float(output[0]))
+        eager = [name for name in output[1].split(',') if name] if len(output) > 1 else []
+    return min(timings), eager
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Check that importing the filters package stays cheap.')
+    parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'Import time budget in milliseconds (default: {DEFAULT_BUDGET_MS:g})')
+    parser.add_argument('--runs', type=int, default=5, help='Fresh interpreters to measure (default: 5)')
+    args = parser.parse_args(argv)
+
+    elapsed_ms, eager = measure_import_time(args.runs)
+    print(f"import filters: {elapsed_ms:.1f} ms (budget {args.budget_ms:g} ms)")
+
+    if eager:
+        print(f"Error: importing filters also loaded {', '.join(eager)}")
+        return 1
+    if elapsed_ms > args.budget_ms:
+        print("Error: import time budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
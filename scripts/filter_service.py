@@ -0,0 +1,352 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import parse_qsl, urlsplit
+
+import cv2
+import numpy as np
+
+from filters import FILTERS, apply_filter, output_suffixes, parse_param
+from filters.backends import worker_threads
+from filters.encoding import PRESETS, encode, encoding_settings
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+LATENCY_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000, float('inf'))
+
+# Largest request body accepted, in bytes
+DEFAULT_MAX_BODY = 64 * 2**20
+
+# Output formats a request can ask for with '?format=', with their content types
+FORMATS = {'jpg': 'image/jpeg', 'png': 'image/png', 'webp': 'image/webp'}
+
+_REASONS = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 411: 'Length Required',
+            413: 'Payload Too Large', 429: 'Too Many Requests', 500: 'Internal Server Error'}
+
+
+def init_worker(threads=1):
+    """
+    Worker process initializer. Each worker handles one request at a time, so OpenCV's thread pool
+    only gets the cores left over by the other workers, and every filter runs once on a small image
+    so the first real request doesn't pay for loading OpenCV's code paths.
+    :param threads: OpenCV threads of this worker (default is 1)
+    """
+    cv2.setNumThreads(threads)
+    img = np.zeros((32, 32, 3), dtype=np.uint8)
+    for filter_name in FILTERS:
+        apply_filter(filter_name, img)
+
+
+def run_filter(filter_name, data, params, output_index=0, settings=None):
+    """
+    Decode an image, apply a filter and encode the result. Runs inside a worker process.
+    :param filter_name: Filter name (a key of FILTERS)
+    :param data: Encoded input image
+    :param params: Parameters overriding the filter's defaults
+    :param output_index: Which image to return for filters with several outputs
+    :param settings: Output settings (see filters.encoding.encoding_settings()), default is OpenCV's JPEG defaults
+    :return: Encoded result
+    """
+    img = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if img is None:
+        raise ValueError('the request body is not a supported image')
+    result = apply_filter(filter_name, img, **params)
+    if isinstance(result, tuple):
+        result = result[output_index]
+    try:
+        _, encoded = encode(result, settings)
+    except IOError as error:
+        raise ValueError(str(error)) from None
+    return encoded.tobytes()
+
+
+def parse_params(filter_name, query):
+    """
+    Convert the query parameters of a request to the types declared in the registry and check
+    their ranges (see filters.registry.parse_param()).
+    :param filter_name: Filter name (a key of FILTERS)
+    :param query: Dictionary of query parameters, without 'output', 'preset' and 'format'
+    :return: Parameter dictionary
+    """
+    return {name: parse_param(filter_name, name, value) for name, value in query.items()}
+
+
+class LatencyHistogram:
+    """
+    Cumulative request latency histogram, kept per filter.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        """
+        :param buckets: Upper bounds of the buckets in milliseconds, ending with infinity
+        """
+        self.buckets = buckets
+        self._series = {}
+
+    def observe(self, name, milliseconds):
+        """
+        Count one request.
+        :param name: Series name (the filter)
+        :param milliseconds: Request latency
+        """
+        series = self._series.setdefault(name, {'counts': [0] * len(self.buckets), 'count': 0, 'sum_ms': 0.0,
+                                                'max_ms': 0.0})
+        for index, bound in enumerate(self.buckets):
+            if milliseconds <= bound:
+                series['counts'][index] += 1
+                break
+        series['count'] += 1
+        series['sum_ms'] += milliseconds
+        series['max_ms'] = max(series['max_ms'], milliseconds)
+
+    def quantile(self, name, q):
+        """
+        Estimate a latency quantile from the buckets: the upper bound of the bucket it falls in,
+        capped at the slowest request seen.
+        :param name: Series name
+        :param q: Quantile between 0 and 1
+        :return: Latency in milliseconds, or None without observations
+        """
+        series = self._series.get(name)
+        if not series or not series['count']:
+            return None
+        seen = 0
+        for bound, count in zip(self.buckets, series['counts']):
+            seen += count
+            if seen >= q * series['count']:
+                return min(bound, series['max_ms'])
+        return series['max_ms']
+
+    def snapshot(self):
+        """
+        Summarize every series.
+        :return: Dictionary mapping series name to count, mean, p50, p95, p99 and cumulative bucket counts
+        """
+        snapshot = {}
+        for name, series in sorted(self._series.items()):
+            cumulative = np.cumsum(series['counts']).tolist()
+            snapshot[name] = {
+                'count': series['count'],
+                'mean_ms': series['sum_ms'] / series['count'],
+                'max_ms': series['max_ms'],
+                'p50_ms': self.quantile(name, 0.5),
+                'p95_ms': self.quantile(name, 0.95),
+                'p99_ms': self.quantile(name, 0.99),
+                'buckets': {('+Inf' if bound == float('inf') else str(bound)): count
+                            for bound, count in zip(self.buckets, cumulative)},
+            }
+        return snapshot
+
+
+class FilterService:
+    """
+    An HTTP/1.1 server exposing every filter in FILTERS.
+
+        POST /filters/<name>?<param>=<value>&output=<index>&preset=<preset>&format=jpg|png|webp   body: image bytes
+        GET  /filters         filters with their default parameters
+        GET  /metrics         latency histogram per filter and queue state
+        GET  /health
+
+    Filtering runs in a pool of warm worker processes. At most 'workers + queue_size' requests
+    are admitted at once; further requests are answered with 429 right away instead of piling up.
+    """
+
+    def __init__(self, workers=None, queue_size=16, max_body=DEFAULT_MAX_BODY):
+        """
+        :param workers: Number of worker processes (default is the number of CPU cores)
+        :param queue_size: Requests allowed to wait for a worker
+        :param max_body: Largest request body accepted, in bytes
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.queue_size = queue_size
+        self.max_body = max_body
+        self.in_flight = 0
+        self.rejected = 0
+        self.histogram = LatencyHistogram()
+        self._executor = None
+
+    async def start(self, host='127.0.0.1', port=8080):
+        """
+        Start the worker pool, wait until every worker is warm and start listening.
+        :param host: Address to listen on
+        :param port: Port to listen on
+        :return: asyncio Server
+        """
+        self._executor = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                             initargs=(worker_threads(self.workers),))
+        loop = asyncio.get_running_loop()
+        # One task per worker makes the pool start all of them now instead of on the first requests
+        await asyncio.gather(*(loop.run_in_executor(self._executor, time.sleep, 0.05) for _ in range(self.workers)))
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    def close(self):
+        """
+        Shut the worker pool down.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                keep_alive = await self._handle_request(reader, writer)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _handle_request(self, reader, writer):
+        request_line = await reader.readline()
+        if not request_line:
+            return False
+        try:
+            method, target, version = request_line.decode('latin-1').split()
+        except ValueError:
+            await self._respond(writer, 400, {'error': 'malformed request line'}, keep_alive=False)
+            return False
+
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+        keep_alive = headers.get('connection', '').lower() != 'close' and version == 'HTTP/1.1'
+
+        try:
+            length = int(headers.get('content-length', 0) or 0)
+        except ValueError:
+            await self._respond(writer, 400, {'error': 'invalid Content-Length'}, keep_alive=False)
+            return False
+        if length > self.max_body:
+            await self._respond(writer, 413, {'error': f'body larger than {self.max_body} bytes'}, keep_alive=False)
+            return False
+        body = await reader.readexactly(length) if length else b''
+
+        url = urlsplit(target)
+        query = dict(parse_qsl(url.query))
+        status, payload, content_type = await self._route(method, url.path.rstrip('/') or '/', query, body, headers)
+        await self._respond(writer, status, payload, content_type, keep_alive)
+        return keep_alive
+
+    async def _route(self, method, path, query, body, headers):
+        if path == '/health':
+            return 200, {'status': 'ok', 'workers': self.workers}, None
+        if path == '/metrics':
+            return 200, {'in_flight': self.in_flight, 'capacity': self.workers + self.queue_size,
+                         'rejected': self.rejected, 'latency': self.histogram.snapshot()}, None
+        if path == '/filters':
+            return 200, {name: {'params': spec['params'], 'outputs': list(output_suffixes(name)),
+                                'ranges': {param: {'type': kind.__name__, 'min': minimum, 'max': maximum}
+                                           for param, (kind, minimum, maximum) in spec['ranges'].items()}}
+                         for name, spec in FILTERS.items()}, None
+        if not path.startswith('/filters/'):
+            return 404, {'error': f'no such endpoint: {path}'}, None
+
+        filter_name = path[len('/filters/'):]
+        if filter_name not in FILTERS:
+            return 404, {'error': f"unknown filter '{filter_name}'", 'filters': list(FILTERS)}, None
+        if method != 'POST':
+            return 405, {'error': 'filters take the image as a POST body'}, None
+        if 'content-length' not in headers:
+            return 411, {'error': 'Content-Length is required'}, None
+        return await self._filter(filter_name, query, body)
+
+    async def _filter(self, filter_name, query, body):
+        start = time.perf_counter()
+        try:
+            output_index = int(query.pop('output', 0))
+            if not 0 <= output_index < len(output_suffixes(filter_name)):
+                raise ValueError(f"{filter_name} has {len(output_suffixes(filter_name))} output(s)")
+            preset = query.pop('preset', 'default')
+            if preset not in PRESETS:
+                raise ValueError(f"unknown preset '{preset}'; accepted: {', '.join(PRESETS)}")
+            # An explicit format wins over the preset's, keeping the preset's quality
+            image_format = query.pop('format', None)
+            settings = encoding_settings(preset, filter_name, {'format': image_format.lower()} if image_format else None)
+            if settings['format'] not in FORMATS:
+                raise ValueError(f"unsupported format '{settings['format']}'; accepted: {', '.join(FORMATS)}")
+            params = parse_params(filter_name, query)
+        except ValueError as error:
+            return 400, {'error': str(error)}, None
+        if not body:
+            return 400, {'error': 'the request body must be an image'}, None
+
+        # Admission control: everything beyond the workers and the queue is turned away immediately
+        if self.in_flight >= self.workers + self.queue_size:
+            self.rejected += 1
+            return 429, {'error': 'server busy, retry later'}, None
+
+        content_type = FORMATS[settings['format']]
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, run_filter, filter_name, body, params,
+                                                output_index, settings)
+        except ValueError as error:
+            return 400, {'error': str(error)}, None
+        except Exception as error:
+            return 500, {'error': f'{type(error).__name__}: {error}'}, None
+        finally:
+            self.in_flight -= 1
+        self.histogram.observe(filter_name, (time.perf_counter() - start) * 1000)
+        return 200, result, content_type
+
+    async def _respond(self, writer, status, payload, content_type=None, keep_alive=True):
+        if content_type is None:
+            payload = json.dumps(payload).encode()
+            content_type = 'application/json'
+        head = [f'HTTP/1.1 {status} {_REASONS[status]}', f'Content-Type: {content_type}',
+                f'Content-Length: {len(payload)}', f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+        if status == 429:
+            head.append('Retry-After: 1')
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1') + payload)
+        await writer.drain()
+
+
+async def serve(host, port, workers=None, queue_size=16, max_body=DEFAULT_MAX_BODY):
+    """
+    Run the filter service until interrupted.
+    :param host: Address to listen on
+    :param port: Port to listen on
+    :param workers: Number of worker processes (default is the number of CPU cores)
+    :param queue_size: Requests allowed to wait for a worker
+    :param max_body: Largest request body accepted, in bytes
+    """
+    service = FilterService(workers, queue_size, max_body)
+    try:
+        server = await service.start(host, port)
+        print(f"Serving {len(FILTERS)} filters on http://{host}:{port} with {service.workers} workers "
+              f"(queue of {queue_size})")
+        async with server:
+            await server.serve_forever()
+    finally:
+        service.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve the filters over HTTP.')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8080, help='Port to listen on (default: 8080)')
+    parser.add_argument('-w', '--workers', type=int, default=None, help='Worker processes (default: CPU count)')
+    parser.add_argument('--queue-size', type=int, default=16,
+                        help='Requests waiting for a worker before new ones get 429 (default: 16)')
+    parser.add_argument('--max-body', type=float, default=DEFAULT_MAX_BODY / 2**20, metavar='MB',
+                        help=f'Largest image accepted in MB (default: {DEFAULT_MAX_BODY // 2**20})')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(serve(args.host, args.port, args.workers, args.queue_size, int(args.max_body * 2**20)))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
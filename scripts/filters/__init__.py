@@ -0,0 +1,37 @@
+"""
+The showcase filters as an importable library.
+
+Importing this package only imports OpenCV and NumPy: it reads no configuration, creates no
+folders, loads no images and does not touch matplotlib. The matplotlib/TkAgg preview helpers
+in filters.preview are loaded on first use, and the configuration in filters.config is read
+only when a script asks for it.
+"""
+from .artistic import pencil_sketch_bw, pencil_sketch_bw_color, stylization_filter
+from .color import bright, bw_filter, sepia, sepia_fast
+from .edges import edge_detection, embossed_edges, outline
+from .masks import vignette
+from .pipeline import Pipeline
+from .pyramid import PreviewPyramid
+from .registry import FILTERS, apply_filter, output_suffixes, parse_param
+from .version import __version__
+
+__all__ = [
+    '__version__',
+    'FILTERS',
+    'Pipeline',
+    'PreviewPyramid',
+    'apply_filter',
+    'bright',
+    'bw_filter',
+    'edge_detection',
+    'embossed_edges',
+    'outline',
+    'output_suffixes',
+    'parse_param',
+    'pencil_sketch_bw',
+    'pencil_sketch_bw_color',
+    'sepia',
+    'sepia_fast',
+    'stylization_filter',
+    'vignette',
+]
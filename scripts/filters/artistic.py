@@ -0,0 +1,51 @@
+import cv2
+
+from .blur import gaussian_blur
+from .npr import pencil_sketch, stylization
+from .profiling import span
+
+
+def pencil_sketch_bw(img, blur_radius=2):
+    """
+    Apply a pencil sketch effect (black and white) to the input image.
+    :param img: Input image (BGR, or grayscale, e.g. from a grayscale decode)
+    :param blur_radius: Radius of the Gaussian pre-blur; larger radii give softer strokes (default is 2, a 5x5 kernel)
+    :return: Black-and-white pencil sketch image
+    """
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)  # cv2.pencilSketch only takes color images
+    with span('gaussian_blur', 'step', img.shape):
+        img_blur = gaussian_blur(img, blur_radius)
+    with span('cv2.pencilSketch', 'step', img.shape):
+        img_sketch_bw, _ = pencil_sketch(img_blur)
+    return img_sketch_bw
+
+
+def pencil_sketch_bw_color(img, blur_radius=2):
+    """
+    Apply a pencil sketch effect (both black and white and color) to the input image.
+    :param img: Input image
+    :param blur_radius: Radius of the Gaussian pre-blur; larger radii give softer strokes (default is 2, a 5x5 kernel)
+    :return: Tuple of black-and-white sketch and color sketch images
+    """
+    with span('gaussian_blur', 'step', img.shape):
+        img_blur = gaussian_blur(img, blur_radius)
+    with span('cv2.pencilSketch', 'step', img.shape):
+        img_sketch_bw, img_sketch_color = pencil_sketch(img_blur)
+    return img_sketch_bw, img_sketch_color
+
+
+def stylization_filter(img, sigma_s=40, sigma_r=0.1, blur_radius=2, quality=1.0):
+    """
+    Apply a stylization filter to the input image using OpenCV's stylization method.
+    :param img: Input image
+    :param sigma_s: Controls the size of the texture (default is 40)
+    :param sigma_r: Controls how much of the color is preserved (default is 0.1)
+    :param blur_radius: Radius of the Gaussian pre-blur; larger radii soften more (default is 2, a 5x5 kernel)
+    :param quality: Below 1, smooth faster at that fraction of the resolution (see npr.stylization())
+    :return: Stylized image
+    """
+    with span('gaussian_blur', 'step', img.shape):
+        img_blur = gaussian_blur(img, blur_radius)
+    with span('cv2.stylization' if quality == 1 else 'fast stylization', 'step', img.shape):
+        return stylization(img_blur, sigma_s, sigma_r, quality)
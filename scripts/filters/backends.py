@@ -0,0 +1,237 @@
+import os
+
+import cv2
+import numpy as np
+
+from .blur import gaussian_blur
+from .color import SEPIA_MATRIX_BGR, sepia_transform
+from .edges import EMBOSS_KERNEL, outline_kernel
+from .masks import cached_vignette_mask
+
+# Execution backends of apply_filter():
+#   'opencv': the filters as they are, on NumPy arrays with OpenCV's SIMD kernels and thread pool
+#   'umat':   the same OpenCV calls on cv2.UMat (the transparent API), which runs them with OpenCL
+#             on a GPU or other device when one is available
+#   'numpy':  plain NumPy implementations written from the filters' definitions, as a reference
+#             to check the others against
+BACKENDS = ('opencv', 'umat', 'numpy')
+
+# cv2.COLOR_BGR2GRAY's weights; OpenCV applies them in fixed point, which can round one level apart
+GRAY_WEIGHTS_BGR = np.array([0.114, 0.587, 0.299])
+
+
+def resolve_backend(backend):
+    """
+    Resolve the backend that actually runs: 'umat' falls back to 'opencv' without an OpenCL device,
+    since the transparent API would then run the very same CPU code behind an extra upload and download.
+    :param backend: A name in BACKENDS, or None for 'opencv'
+    :return: Name in BACKENDS
+    """
+    backend = backend or 'opencv'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Available backends: {', '.join(BACKENDS)}")
+    if backend == 'umat' and not cv2.ocl.haveOpenCL():
+        return 'opencv'
+    return backend
+
+
+def worker_threads(workers, cpus=None):
+    """
+    OpenCV threads per worker so that workers running filters side by side use every core without
+    oversubscribing them: one per worker when there are as many workers as cores, and the spare
+    cores split between the workers when there are fewer.
+    :param workers: Worker processes or threads filtering at the same time (None for one per core)
+    :param cpus: CPU cores (default is the machine's)
+    :return: Number of threads to pass to cv2.setNumThreads()
+    """
+    cpus = cpus or os.cpu_count() or 1
+    return max(1, cpus // max(1, workers or cpus))
+
+
+def _saturate(img):
+    # Round and saturate to uint8 like OpenCV's saturate_cast
+    return np.clip(np.rint(img), 0, 255).astype(np.uint8)
+
+
+def bw_filter_numpy(img):
+    """
+    Reference bw_filter(): the weighted sum of the channels, rounded.
+    :param img: Input image (BGR, or grayscale already)
+    :return: Grayscale image
+    """
+    if img.ndim == 2:
+        return img.copy()
+    return _saturate(img @ GRAY_WEIGHTS_BGR)
+
+
+def sepia_numpy(img):
+    """
+    Reference sepia: the sepia matrix applied in float64, saturated and truncated as sepia() does.
+    :param img: Input image (BGR, or BGRA whose alpha is dropped)
+    :return: Sepia-toned image (BGR)
+    """
+    sepia_transform(img)  # Same channel check as the other backends
+    return np.clip(img[..., :3] @ SEPIA_MATRIX_BGR.T, 0, 255).astype(np.uint8)
+
+
+def vignette_numpy(img, level=2):
+    """
+    Reference vignette(): every channel multiplied by the mask in float32, rounded.
+    :param img: Input image
+    :param level: Intensity of the vignette effect (default is 2)
+    :return: Image with vignette effect applied
+    """
+    height, width = img.shape[:2]
+    mask = cached_vignette_mask(height, width, level)
+    return _saturate(img * (mask if img.ndim == 2 else mask[..., None]))
+
+
+def bright_numpy(img, level):
+    """
+    Reference bright(): the absolute value of every pixel plus the level, rounded and saturated.
+    :param img: Input image
+    :param level: Brightness adjustment level
+    :return: Image with improved brightness
+    """
+    return _saturate(np.abs(img.astype(np.float32) + level))
+
+
+def filter2d_numpy(img, kernel):
+    """
+    Reference cv2.filter2D(img, -1, kernel): a correlation (the kernel isn't flipped) centered on
+    every pixel, with the border mirrored without repeating the edge pixel (BORDER_REFLECT_101).
+    :param img: Input image
+    :param kernel: Kernel with odd sides
+    :return: Filtered uint8 image
+    """
+    kernel_height, kernel_width = kernel.shape
+    pad = ((kernel_height // 2,) * 2, (kernel_width // 2,) * 2) + ((0, 0),) * (img.ndim - 2)
+    padded = np.pad(img.astype(np.float32), pad, mode='reflect')
+    height, width = img.shape[:2]
+    result = np.zeros(img.shape, np.float32)
+    for y in range(kernel_height):
+        for x in range(kernel_width):
+            if kernel[y, x]:
+                result += kernel[y, x] * padded[y:y + height, x:x + width]
+    return _saturate(result)
+
+
+def outline_numpy(img, k=9):
+    """
+    Reference outline().
+    :param img: Input image
+    :param k: Kernel intensity for edge detection (default is 9)
+    :return: Image with outline effect
+    """
+    return filter2d_numpy(img, outline_kernel(k))
+
+
+def embossed_edges_numpy(img):
+    """
+    Reference embossed_edges().
+    :param img: Input image
+    :return: Image with embossed effect
+    """
+    return filter2d_numpy(img, EMBOSS_KERNEL)
+
+
+def bw_filter_umat(img):
+    """
+    bw_filter() on the transparent API.
+    :param img: Input image (BGR, or grayscale already)
+    :return: Grayscale image
+    """
+    if img.ndim == 2:
+        return img.copy()
+    return cv2.cvtColor(cv2.UMat(img), cv2.COLOR_BGR2GRAY).get()
+
+
+def sepia_umat(img):
+    """
+    sepia_fast() on the transparent API.
+    :param img: Input image (BGR or BGRA, uint8)
+    :return: Sepia-toned image (BGR)
+    """
+    return cv2.transform(cv2.UMat(img), sepia_transform(img)).get()
+
+
+def vignette_umat(img, level=2):
+    """
+    vignette() on the transparent API.
+    :param img: Input image
+    :param level: Intensity of the vignette effect (default is 2)
+    :return: Image with vignette effect applied
+    """
+    height, width = img.shape[:2]
+    mask = cached_vignette_mask(height, width, level, 1 if img.ndim == 2 else img.shape[2])
+    return cv2.multiply(cv2.UMat(img), cv2.UMat(mask), dtype=cv2.CV_8U).get()
+
+
+def bright_umat(img, level):
+    """
+    bright() on the transparent API.
+    :param img: Input image
+    :param level: Brightness adjustment level
+    :return: Image with improved brightness
+    """
+    return cv2.convertScaleAbs(cv2.UMat(img), beta=level).get()
+
+
+def edge_detection_umat(img, apply_blur=False, threshold1=100, threshold2=200, blur_radius=2):
+    """
+    edge_detection() on the transparent API.
+    :param img: Input image
+    :param apply_blur: Apply Gaussian blur before edge detection (default is False)
+    :param threshold1: Lower hysteresis threshold of the gradient (default is 100)
+    :param threshold2: Upper hysteresis threshold of the gradient (default is 200)
+    :param blur_radius: Radius of the Gaussian blur (default is 2, a 5x5 kernel)
+    :return: Image with detected edges
+    """
+    umat = cv2.UMat(img)
+    if apply_blur and blur_radius >= 1:
+        umat = gaussian_blur(umat, blur_radius)
+    return cv2.Canny(umat, threshold1, threshold2).get()
+
+
+def outline_umat(img, k=9):
+    """
+    outline() on the transparent API.
+    :param img: Input image
+    :param k: Kernel intensity for edge detection (default is 9)
+    :return: Image with outline effect
+    """
+    return cv2.filter2D(cv2.UMat(img), -1, outline_kernel(k)).get()
+
+
+def embossed_edges_umat(img):
+    """
+    embossed_edges() on the transparent API.
+    :param img: Input image
+    :return: Image with embossed effect
+    """
+    return cv2.filter2D(cv2.UMat(img), -1, EMBOSS_KERNEL).get()
+
+
+# Filters with an implementation per backend: backend -> name in FILTERS -> function(img, **params).
+# Filters missing from a backend run their OpenCV implementation: the non-photorealistic filters
+# have no UMat path of their own and are far too slow to reimplement in NumPy.
+BACKEND_FILTERS = {
+    'umat': {
+        'bw_filter': bw_filter_umat,
+        'sepia': sepia_umat,
+        'vignette': vignette_umat,
+        'edge_detection': edge_detection_umat,
+        'edge_detection_blur': edge_detection_umat,
+        'bright': bright_umat,
+        'outline': outline_umat,
+        'embossed_edges': embossed_edges_umat,
+    },
+    'numpy': {
+        'bw_filter': bw_filter_numpy,
+        'sepia': sepia_numpy,
+        'vignette': vignette_numpy,
+        'bright': bright_numpy,
+        'outline': outline_numpy,
+        'embossed_edges': embossed_edges_numpy,
+    },
+}
@@ -0,0 +1,191 @@
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+from .loader import atomic_write
+from .version import __version__
+
+# Where results are cached unless told otherwise
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'photoshop-filters')
+
+# Largest total size of the cached results before the least recently used ones are evicted
+DEFAULT_MAX_BYTES = 2 * 2**30
+
+_STATS_FILE = 'stats.json'
+
+
+def input_digest(data):
+    """
+    Hash the raw bytes of an input image file.
+    :param data: File contents
+    :return: Hex digest
+    """
+    return hashlib.sha256(data).hexdigest()
+
+
+def result_key(digest, filter_name, params, output_index=0, extension='.jpg'):
+    """
+    Build the cache key of one filter output: a hash of the input, the filter, its parameters,
+    which of the filter's outputs it is, the output format and the library version.
+    :param digest: input_digest() of the source image
+    :param filter_name: Filter name
+    :param params: Parameters the filter runs with (defaults included)
+    :param output_index: Index of the output for filters returning several images
+    :param extension: Output file extension
+    :return: Hex key
+    """
+    description = json.dumps([digest, filter_name, params, output_index, extension, __version__],
+                             sort_keys=True, default=str)
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class ResultCache:
+    """
+    A persistent, content-addressed cache of encoded filter results on disk.
+
+    Each result is stored as '<dir>/<key[:2]>/<key><extension>'. Reading an entry refreshes its
+    modification time, which evict() uses to drop the least recently used entries once the cache
+    grows past max_bytes. Writes are atomic, so several worker processes can share one cache.
+    """
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: Cache directory (created if needed)
+        :param max_bytes: Size the cache is evicted down to
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def path(self, key, extension='.jpg'):
+        """
+        Return the file path of a cache entry (whether or not it exists).
+        :param key: Entry key
+        :param extension: Output file extension
+        :return: File path
+        """
+        return os.path.join(self.directory, key[:2], key + extension)
+
+    def get(self, key, extension='.jpg'):
+        """
+        Look up an entry and mark it as recently used.
+        :param key: Entry key
+        :param extension: Output file extension
+        :return: Path of the cached file, or None on a miss
+        """
+        path = self.path(key, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return path
+
+    def put(self, key, data, extension='.jpg'):
+        """
+        Store an encoded result.
+        :param key: Entry key
+        :param data: Encoded file contents
+        :param extension: Output file extension
+        :return: Path of the cached file
+        """
+        path = self.path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        return atomic_write(path, data)
+
+    def entries(self):
+        """
+        List every cached entry.
+        :return: List of (path, size in bytes, modification time) tuples
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if file_name == _STATS_FILE or file_name.endswith('.tmp'):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process meanwhile
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """
+        Delete the least recently used entries until the cache fits in max_bytes.
+        :param max_bytes: Size to evict down to (default is the cache's max_bytes)
+        :return: Tuple of (entries removed, bytes freed)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def record(self, hits=0, misses=0):
+        """
+        Add this session's hits and misses (plus any given from other processes) to the lifetime
+        counters kept in the cache directory, and reset the session counters.
+        :param hits: Extra hits to record
+        :param misses: Extra misses to record
+        """
+        stats = self._load_stats()
+        stats['hits'] += self.hits + hits
+        stats['misses'] += self.misses + misses
+        stats['updated'] = time.time()
+        self.hits = self.misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+        self._save_stats(stats)
+
+    def _save_stats(self, stats):
+        path = os.path.join(self.directory, _STATS_FILE)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        with os.fdopen(fd, 'w') as temp_file:
+            json.dump(stats, temp_file)
+        os.replace(temp_path, path)
+
+    def _load_stats(self):
+        try:
+            with open(os.path.join(self.directory, _STATS_FILE)) as stats_file:
+                return json.load(stats_file)
+        except (FileNotFoundError, ValueError):
+            return {'hits': 0, 'misses': 0, 'updated': None}
+
+    def stats(self):
+        """
+        Summarize the cache.
+        :return: Dictionary with entries, bytes, max_bytes, lifetime hits and misses, and hit rate
+        """
+        entries = self.entries()
+        stats = self._load_stats()
+        lookups = stats['hits'] + stats['misses']
+        return {'directory': self.directory, 'entries': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes, 'hits': stats['hits'], 'misses': stats['misses'],
+                'hit_rate': stats['hits'] / lookups if lookups else 0.0}
+
+    def clear(self):
+        """
+        Delete every cached entry and the lifetime counters.
+        """
+        self.evict(0)
+        try:
+            os.remove(os.path.join(self.directory, _STATS_FILE))
+        except FileNotFoundError:
+            pass
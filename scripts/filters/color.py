@@ -0,0 +1,100 @@
+import cv2
+import numpy as np
+
+from .profiling import span
+
+# Sepia transformation matrix, rows and columns in RGB order
+SEPIA_MATRIX = np.array([[0.393, 0.769, 0.189],
+                         [0.349, 0.686, 0.168],
+                         [0.272, 0.534, 0.131]])
+
+# The sepia matrix with rows and columns permuted to BGR, so no channel swaps are needed around it
+SEPIA_MATRIX_BGR = SEPIA_MATRIX[::-1, ::-1].copy()
+
+# SEPIA_MATRIX_BGR with an offset column of just under -0.5: cv2.transform rounds its 8-bit output,
+# the shift turns that into the truncation sepia() gets from its float -> uint8 conversion
+_SEPIA_TRANSFORM = np.hstack([SEPIA_MATRIX_BGR, np.full((3, 1), -0.499)]).astype(np.float32)
+
+# The same for BGRA input: cv2.transform would read the offset column as the alpha channel's weight,
+# so alpha gets a zero column of its own and is dropped, as sepia()'s channel swap drops it
+_SEPIA_TRANSFORM_BGRA = np.hstack([SEPIA_MATRIX_BGR, np.zeros((3, 1)), np.full((3, 1), -0.499)]).astype(np.float32)
+
+
+def sepia_transform(img):
+    """
+    Pick the cv2.transform matrix of sepia_fast() for an image's channels.
+    :param img: Input image (BGR or BGRA)
+    :return: float32 matrix of shape (3, 4) or (3, 5)
+    """
+    channels = img.shape[-1] if img.ndim == 3 else 1
+    if channels == 3:
+        return _SEPIA_TRANSFORM
+    if channels == 4:
+        return _SEPIA_TRANSFORM_BGRA
+    raise ValueError(f"sepia needs a BGR or BGRA image, got {channels} channel(s)")
+
+
+def bw_filter(img):
+    """
+    Convert the input image to grayscale (black and white).
+    :param img: Input image (BGR, or grayscale already, e.g. from a grayscale decode)
+    :return: Grayscale image
+    """
+    if img.ndim == 2:
+        return img.copy()
+    return cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+
+
+def sepia(img):
+    """
+    Apply a sepia filter to the given image.
+    :param img: Input image (BGR format)
+    :return: Sepia-toned image (BGR format)
+    """
+    img_sepia = img.copy()  # Make a copy of the original image to avoid changing it directly
+
+    # Convert the image to RGB because the sepia matrix is designed for RGB
+    with span('sepia: BGR2RGB', 'step', img.shape):
+        img_sepia = cv2.cvtColor(img_sepia, cv2.COLOR_BGR2RGB)
+
+    with span('sepia: float64 transform', 'step', img.shape):
+        # Convert to float to handle matrix multiplication properly
+        img_sepia = np.array(img_sepia, dtype=np.float64)
+
+        # Apply the sepia transformation matrix to the image
+        img_sepia = cv2.transform(img_sepia, SEPIA_MATRIX)
+
+        # Clip the pixel values to ensure they remain in the range [0, 255]
+        img_sepia = np.clip(img_sepia, 0, 255)
+
+        # Convert back to uint8 (standard image format) after applying the filter
+        img_sepia = np.array(img_sepia, dtype=np.uint8)
+
+    # Convert the image back to BGR format because OpenCV uses BGR by default
+    with span('sepia: RGB2BGR', 'step', img.shape):
+        img_sepia = cv2.cvtColor(img_sepia, cv2.COLOR_RGB2BGR)
+
+    return img_sepia
+
+
+def sepia_fast(img, out=None):
+    """
+    Apply the sepia filter in a single pass over the uint8 image, without the copies, channel swaps
+    and float64 intermediate of sepia(). The matrix is permuted to work on BGR directly and OpenCV's
+    8-bit transform computes with saturating fixed-point arithmetic; the result differs from sepia()
+    by at most one level on a small fraction of pixels. Like sepia(), BGRA input gives a BGR result.
+    :param img: Input image (BGR or BGRA format, uint8)
+    :param out: Optional uint8 BGR array of the result's shape to write it into (may be a BGR img itself)
+    :return: Sepia-toned image (BGR format)
+    """
+    return cv2.transform(img, sepia_transform(img), dst=out)
+
+
+def bright(img, level):
+    """
+    Improve the brightness of an image using cv2.convertScaleAbs().
+    :param img: Input image
+    :param level: Brightness adjustment level
+    :return: Image with improved brightness
+    """
+    return cv2.convertScaleAbs(img, beta=level)
@@ -0,0 +1,40 @@
+import json
+import os
+
+# config.json lives at the repository root; PHOTOSHOP_FILTERS_CONFIG points at another one
+CONFIG_PATH = os.environ.get(
+    'PHOTOSHOP_FILTERS_CONFIG',
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), 'config.json'))
+
+
+def load_config(path=None):
+    """
+    Load the showcase configuration. Only called by the scripts, never on import.
+    :param path: Path of the configuration file (default is CONFIG_PATH)
+    :return: Configuration dictionary
+    """
+    with open(path or CONFIG_PATH) as config_file:
+        return json.load(config_file)
+
+
+def get_image_path(config=None):
+    """
+    Return the folder the showcase scripts load their sample images from.
+    :param config: Configuration dictionary (default loads it from CONFIG_PATH)
+    :return: Image folder path
+    """
+    image_path = (config if config is not None else load_config()).get('image_path')
+
+    if not image_path:
+        raise ValueError("Image path not found in configuration file.")
+
+    return image_path
+
+
+def ensure_folders(*folders):
+    """
+    Create the given output folders if they don't exist yet.
+    :param folders: Folder paths
+    """
+    for folder in folders:
+        os.makedirs(folder, exist_ok=True)
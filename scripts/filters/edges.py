@@ -0,0 +1,60 @@
+import cv2
+import numpy as np
+
+from .blur import gaussian_blur
+from .profiling import span
+
+# Custom kernel for embossing
+EMBOSS_KERNEL = np.array([[0, -3, -3],
+                          [3,  0, -3],
+                          [3,  3,  0]])
+
+
+def edge_detection(img, apply_blur=False, threshold1=100, threshold2=200, blur_radius=2):
+    """
+    Perform edge detection on an image using the Canny method.
+    :param img: Input image
+    :param apply_blur: Apply Gaussian blur before edge detection (default is False)
+    :param threshold1: Lower hysteresis threshold of the gradient (default is 100)
+    :param threshold2: Upper hysteresis threshold of the gradient (default is 200)
+    :param blur_radius: Radius of the Gaussian blur; larger radii keep only coarser edges (default is 2, a 5x5 kernel)
+    :return: Image with detected edges
+    """
+    if apply_blur:
+        # Apply Gaussian blur to reduce noise before edge detection
+        with span('gaussian_blur', 'step', img.shape):
+            img = gaussian_blur(img, blur_radius)
+
+    with span('cv2.Canny', 'step', img.shape):
+        return cv2.Canny(img, threshold1, threshold2)
+
+
+def outline_kernel(k=9):
+    """
+    Build the 3x3 outline kernel.
+    :param k: Kernel intensity for edge detection (at least 9)
+    :return: Outline kernel
+    """
+    k = max(k, 9)  # Ensure the kernel value is at least 9
+    return np.array([[-1, -1, -1],
+                     [-1,  k, -1],
+                     [-1, -1, -1]])
+
+
+def outline(img, k=9):
+    """
+    Apply an outline filter to the image using a custom kernel to detect edges.
+    :param img: Input image
+    :param k: Kernel intensity for edge detection (default is 9)
+    :return: Image with outline effect
+    """
+    return cv2.filter2D(img, ddepth=-1, kernel=outline_kernel(k))
+
+
+def embossed_edges(img):
+    """
+    Apply an emboss filter to the image using a custom kernel to highlight edges with an embossed effect.
+    :param img: Input image
+    :return: Image with embossed effect
+    """
+    return cv2.filter2D(img, -1, kernel=EMBOSS_KERNEL)
@@ -0,0 +1,127 @@
+import cv2
+import numpy as np
+
+from .profiling import span
+
+# Output formats: name -> file extension
+FORMATS = {'jpg': '.jpg', 'png': '.png', 'webp': '.webp'}
+
+# JPEG chroma subsampling: '444' keeps full color resolution, '420' (libjpeg's default) halves it both ways
+SUBSAMPLING = {
+    '444': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_444,
+    '422': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_422,
+    '420': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_420,
+    '411': cv2.IMWRITE_JPEG_SAMPLING_FACTOR_411,
+}
+
+# Settings each format accepts besides 'format'. 'quality' is 0-100 for JPEG and 1-100 for WebP
+# (above 100 is lossless); 'compression' is the PNG zlib level 0-9; 'bilevel' stores a PNG with
+# one bit per pixel, which is lossless for black-and-white results such as edge maps.
+OPTIONS = {
+    'jpg': {'quality', 'progressive', 'optimize', 'subsampling'},
+    'png': {'compression', 'bilevel'},
+    'webp': {'quality'},
+}
+
+# Edge maps only hold 0 and 255: a one-bit PNG stores them exactly, at a tenth of a JPEG's size
+_BILEVEL_PNG = {'format': 'png', 'bilevel': True, 'compression': 9}
+
+# Named output settings. 'filters' overrides the settings for single filters. On a 14 MP photo
+# 'default' (OpenCV's quality 95) writes a 4.1 MB sepia result in 90 ms, 'fast' 2.4 MB in 75 ms,
+# 'small' 1.7 MB in 420 ms, and 'archive' stores it losslessly in 19 MB.
+PRESETS = {
+    'default': {'format': 'jpg'},
+    'fast': {'format': 'jpg', 'quality': 85},
+    'small': {'format': 'jpg', 'quality': 75, 'progressive': True, 'optimize': True, 'subsampling': '420',
+              'filters': {'edge_detection': _BILEVEL_PNG, 'edge_detection_blur': _BILEVEL_PNG}},
+    # zlib levels above 1 barely shrink photos further but take up to ten times longer
+    'archive': {'format': 'png', 'compression': 1,
+                'filters': {'edge_detection': _BILEVEL_PNG, 'edge_detection_blur': _BILEVEL_PNG}},
+}
+
+
+def encoding_settings(preset='default', filter_name=None, overrides=None):
+    """
+    Resolve the output settings of a filter under a preset.
+    :param preset: Preset name (a key of PRESETS) or settings dictionary of the same form
+    :param filter_name: Filter whose results are encoded, picking up the preset's override for it
+    :param overrides: Settings replacing those of the preset (e.g. {'quality': 90})
+    :return: Settings dictionary with a 'format' and that format's options
+    """
+    if isinstance(preset, str):
+        if preset not in PRESETS:
+            raise ValueError(f"Unknown preset '{preset}'. Available presets: {', '.join(PRESETS)}")
+        preset = PRESETS[preset]
+    settings = {name: value for name, value in preset.items() if name != 'filters'}
+    settings.update(preset.get('filters', {}).get(filter_name, {}))
+    settings.update(overrides or {})
+    return settings
+
+
+def imencode_flags(settings):
+    """
+    Translate output settings into cv2.imencode()'s extension and flags.
+    :param settings: Settings dictionary (see encoding_settings()). Options of other formats are
+                     ignored, so a preset's JPEG quality carries over when only the format is changed
+    :return: Tuple of (file extension, list of flags)
+    """
+    image_format = settings.get('format', 'jpg')
+    if image_format not in FORMATS:
+        raise ValueError(f"Unknown format '{image_format}'. Available formats: {', '.join(FORMATS)}")
+    unknown = set(settings) - {'format'} - set().union(*OPTIONS.values())
+    if unknown:
+        raise ValueError(f"Unknown encoding settings: {', '.join(sorted(unknown))}")
+
+    options = {name: value for name, value in settings.items() if name in OPTIONS[image_format]}
+    flags = []
+    if image_format == 'jpg':
+        if 'quality' in options:
+            flags += [cv2.IMWRITE_JPEG_QUALITY, int(options['quality'])]
+        if options.get('progressive'):
+            flags += [cv2.IMWRITE_JPEG_PROGRESSIVE, 1]
+        if options.get('optimize'):
+            flags += [cv2.IMWRITE_JPEG_OPTIMIZE, 1]
+        if 'subsampling' in options:
+            if str(options['subsampling']) not in SUBSAMPLING:
+                raise ValueError(f"Unknown chroma subsampling '{options['subsampling']}'. "
+                                 f"Available: {', '.join(SUBSAMPLING)}")
+            flags += [cv2.IMWRITE_JPEG_SAMPLING_FACTOR, SUBSAMPLING[str(options['subsampling'])]]
+    elif image_format == 'png':
+        if 'compression' in options:
+            flags += [cv2.IMWRITE_PNG_COMPRESSION, int(options['compression'])]
+        if options.get('bilevel'):
+            flags += [cv2.IMWRITE_PNG_BILEVEL, 1]
+    elif 'quality' in options:
+        flags += [cv2.IMWRITE_WEBP_QUALITY, int(options['quality'])]
+    return FORMATS[image_format], flags
+
+
+def single_channel(img):
+    """
+    Reduce a 3-channel image whose channels are all equal (a grayscale result stored as BGR) to
+    one channel, which encodes in about a third of the time and space.
+    :param img: Image
+    :return: Single-channel image, or the input itself if it has color
+    """
+    if img.ndim != 3 or img.shape[2] != 3:
+        return img
+    # Almost every color image already differs within its first row, which makes the common case cheap
+    for rows in (img[:1], img):
+        if not (np.array_equal(rows[..., 0], rows[..., 1]) and np.array_equal(rows[..., 0], rows[..., 2])):
+            return img
+    return np.ascontiguousarray(img[..., 0])
+
+
+def encode(img, settings=None):
+    """
+    Encode a result with output settings. Grayscale results are stored single-channel.
+    :param img: Image
+    :param settings: Settings dictionary (see encoding_settings()), default is OpenCV's JPEG defaults
+    :return: Tuple of (file extension, encoded uint8 array)
+    """
+    extension, flags = imencode_flags(settings or PRESETS['default'])
+    with span(f'encode {extension[1:]}', 'encode', img.shape):
+        ok, encoded = cv2.imencode(extension, single_channel(img), flags)
+    if not ok:
+        raise IOError(f'could not encode the image as {extension}')
+    return extension, encoded
@@ -0,0 +1,287 @@
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+from .loader import atomic_write, load_image
+
+# Where decoded frames are stored unless told otherwise; apart from the result cache, whose
+# eviction would otherwise count and remove frames as well
+DEFAULT_FRAME_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'photoshop-filters-frames')
+
+# Largest total size of the stored frames before the least recently used ones are evicted. Raw
+# frames are large: a 4608x3072 photo takes 42 MB against 3 MB as a JPEG.
+DEFAULT_MAX_BYTES = 4 * 2**30
+
+
+def frame_key(path, grayscale=False, max_size=None):
+    """
+    Build the key of a source image's decoded frame from its path, size and modification time,
+    so a frame can be found without reading the source, and an edited source gets a new one.
+    Frames decoded in grayscale or at a reduced size are stored apart from full-size color ones.
+    :param path: Source image path
+    :param grayscale: Whether the frame is decoded in grayscale
+    :param max_size: Longest side the frame is decoded at (default is full size)
+    :return: Hex key
+    """
+    stat = os.stat(path)
+    description = json.dumps([os.path.abspath(path), stat.st_size, stat.st_mtime_ns, bool(grayscale), max_size])
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+def source_key(path, grayscale=False, max_size=None):
+    """
+    Build the key of a source image's index entry: like frame_key() but without the size and
+    modification time, so every version of a source decoded the same way shares one entry.
+    :param path: Source image path
+    :param grayscale: Whether the frame is decoded in grayscale
+    :param max_size: Longest side the frame is decoded at (default is full size)
+    :return: Hex key
+    """
+    description = json.dumps([os.path.abspath(path), bool(grayscale), max_size])
+    return hashlib.sha256(description.encode()).hexdigest()
+
+
+class FrameStore:
+    """
+    A persistent store of decoded source images, so reruns skip the decode.
+
+    Each frame is stored once as raw uint8 pixels in '<dir>/<key[:2]>/<key>.npy', whose few-byte
+    header records the shape, and is handed out as a read-only np.memmap of that file: nothing
+    is decoded or copied, pages are read from disk as the filter touches them, and every process
+    mapping the same frame shares the same pages in the OS page cache. Storing a frame registers
+    it in the index, which has one JSON entry per source and decode mode in
+    '<dir>/<source key[:2]>/<source key>.json' (the source's path, size and modification time,
+    the decode mode, the shape and the frame's key), and removes the frame of the source's
+    previous version. Like the result cache, reading a frame refreshes its modification time,
+    which evict() uses to drop the least recently used frames once the store grows past
+    max_bytes. Writes are atomic and each entry has its own file, so several worker processes
+    can fill one store without a lock.
+    """
+
+    def __init__(self, directory=DEFAULT_FRAME_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        """
+        :param directory: Store directory (created if needed)
+        :param max_bytes: Size the store is evicted down to
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.replaced = 0
+
+    def path(self, key):
+        """
+        Return the file path of a frame (whether or not it exists).
+        :param key: Frame key
+        :return: File path
+        """
+        return os.path.join(self.directory, key[:2], key + '.npy')
+
+    def _entry_path(self, key):
+        # Index entries are keyed by source_key()
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def get(self, path, grayscale=False, max_size=None):
+        """
+        Look up the frame of a source image and mark it as recently used.
+        :param path: Source image path
+        :param grayscale: Whether to look up the grayscale frame
+        :param max_size: Longest side of the frame to look up (default is full size)
+        :return: Read-only np.memmap of the frame, or None on a miss
+        """
+        frame_path = self.path(frame_key(path, grayscale, max_size))
+        try:
+            os.utime(frame_path)
+            frame = np.load(frame_path, mmap_mode='r')
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return frame
+
+    def put(self, path, img, grayscale=False, max_size=None):
+        """
+        Store the decoded frame of a source image and register it in the index, dropping the
+        outdated frames of earlier versions of the source decoded the same way.
+        :param path: Source image path
+        :param img: Decoded uint8 image
+        :param grayscale: Whether the frame was decoded in grayscale
+        :param max_size: Longest side the frame was decoded at (default is full size)
+        :return: Read-only np.memmap of the stored frame
+        """
+        key = frame_key(path, grayscale, max_size)
+        frame_path = self.path(key)
+        os.makedirs(os.path.dirname(frame_path), exist_ok=True)
+        # Pixels are written straight into the mapped file; the rename publishes it complete
+        temp_path = f'{frame_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        try:
+            frame = np.lib.format.open_memmap(temp_path, mode='w+', dtype=np.uint8, shape=img.shape)
+            frame[...] = img
+            frame.flush()
+            del frame
+            os.replace(temp_path, frame_path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._register(key, path, img.shape, grayscale, max_size)
+        return np.load(frame_path, mmap_mode='r')
+
+    def load(self, path, grayscale=False, max_size=None):
+        """
+        Get the frame of a source image, decoding and storing it first on a miss. The frame is
+        decoded as load_image() would, so filtering it gives the same results as decoding anew.
+        :param path: Source image path
+        :param grayscale: Decode in grayscale
+        :param max_size: Longest side to decode at, JPEGs directly at a reduced size (default is full size)
+        :return: Tuple of (read-only np.memmap, or None if the image could not be loaded, info
+                 dictionary with 'hit' and 'seconds')
+        """
+        start = time.perf_counter()
+        frame = self.get(path, grayscale, max_size)
+        hit = frame is not None
+        if not hit:
+            img, _ = load_image(path, max_size=max_size, grayscale=grayscale)
+            frame = None if img is None else self.put(path, img, grayscale, max_size)
+        return frame, {'hit': hit, 'seconds': time.perf_counter() - start}
+
+    def build(self, paths, grayscale=False, max_size=None):
+        """
+        Store the frames of a set of source images, skipping those already stored, and drop the
+        outdated frames of sources that changed since they were stored.
+        :param paths: Source image paths
+        :param grayscale: Decode in grayscale
+        :param max_size: Longest side to decode at (default is full size)
+        :return: Dictionary with the number of frames 'added', already 'stored', 'replaced' as outdated,
+                 and of sources that 'failed' to load
+        """
+        counts = {'added': 0, 'stored': 0, 'replaced': 0, 'failed': 0}
+        replaced = self.replaced
+        for path in paths:
+            try:
+                key = frame_key(path, grayscale, max_size)
+                frame, info = self.load(path, grayscale, max_size)
+                # Frames stored before they had index entries are registered as they are found
+                if info['hit'] and self._read_entry(source_key(path, grayscale, max_size)).get('frame') != key:
+                    self._register(key, path, frame.shape, grayscale, max_size)
+            except OSError:
+                frame = None
+            if frame is None:
+                counts['failed'] += 1
+                continue
+            counts['stored' if info['hit'] else 'added'] += 1
+        counts['replaced'] = self.replaced - replaced
+        return counts
+
+    def _register(self, key, path, shape, grayscale, max_size):
+        """
+        Point the index entry of a source at its newly stored frame, and remove the frame the
+        entry pointed at before, stored from an earlier version of the source.
+        """
+        entry_key = source_key(path, grayscale, max_size)
+        old_key = self._read_entry(entry_key).get('frame')
+        if old_key is not None and old_key != key:
+            self._remove(old_key)
+            self.replaced += 1
+        stat = os.stat(path)
+        entry = {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns,
+                 'decode': {'grayscale': bool(grayscale), 'max_size': max_size}, 'shape': list(shape), 'frame': key}
+        entry_path = self._entry_path(entry_key)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        atomic_write(entry_path, json.dumps(entry).encode())
+
+    def _read_entry(self, entry_key):
+        try:
+            with open(self._entry_path(entry_key)) as entry_file:
+                return json.load(entry_file)
+        except (FileNotFoundError, ValueError):
+            return {}
+
+    def _remove(self, key):
+        try:
+            os.remove(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _index_paths(self):
+        paths = []
+        for root, _, files in os.walk(self.directory):
+            paths.extend(os.path.join(root, file_name) for file_name in files if file_name.endswith('.json'))
+        return paths
+
+    def _load_index(self):
+        """
+        Read the index. Entries whose frame was evicted are left out.
+        :return: Dictionary of frame key -> entry
+        """
+        index = {}
+        for entry_path in self._index_paths():
+            entry = self._read_entry(os.path.basename(entry_path)[:-len('.json')])
+            if 'frame' in entry and os.path.exists(self.path(entry['frame'])):
+                index[entry['frame']] = entry
+        return index
+
+    def entries(self):
+        """
+        List every stored frame.
+        :return: List of (path, size in bytes, modification time) tuples
+        """
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for file_name in files:
+                if not file_name.endswith('.npy'):
+                    continue
+                path = os.path.join(root, file_name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue  # Evicted by another process meanwhile
+                entries.append((path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def evict(self, max_bytes=None):
+        """
+        Delete the least recently used frames until the store fits in max_bytes. Processes that
+        still map an evicted frame keep reading it; its disk space is freed once they let go.
+        :param max_bytes: Size to evict down to (default is the store's max_bytes)
+        :return: Tuple of (frames removed, bytes freed)
+        """
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        removed = freed = 0
+        for path, size, _ in entries:
+            if total <= max_bytes:
+                break
+            self._remove(os.path.basename(path)[:-len('.npy')])  # Its index entry is skipped from now on
+            total -= size
+            removed += 1
+            freed += size
+        return removed, freed
+
+    def stats(self):
+        """
+        Summarize the store.
+        :return: Dictionary with directory, frames, bytes, max_bytes and the sources in the index
+        """
+        entries = self.entries()
+        return {'directory': self.directory, 'frames': len(entries), 'bytes': sum(size for _, size, _ in entries),
+                'max_bytes': self.max_bytes,
+                'sources': len({entry['source'] for entry in self._load_index().values()})}
+
+    def clear(self):
+        """
+        Delete every stored frame and the index.
+        """
+        self.evict(0)
+        for entry_path in self._index_paths():
+            try:
+                os.remove(entry_path)
+            except FileNotFoundError:
+                pass
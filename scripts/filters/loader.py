@@ -0,0 +1,183 @@
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+from .profiling import span
+
+# Filters whose result is grayscale and that can start from a grayscale decode. bw_filter gets
+# the same image (the JPEG's own luma, within rounding); edge detection and the black-and-white
+# sketch then work on the luma instead of all three color channels, which is slightly different.
+GRAYSCALE_FILTERS = frozenset({'bw_filter', 'edge_detection', 'edge_detection_blur', 'pencil_sketch_bw'})
+
+# Scale factors libjpeg can decode at directly, by skipping DCT coefficients, with their imread flags
+_REDUCED_FLAGS = {
+    (8, False): cv2.IMREAD_REDUCED_COLOR_8, (4, False): cv2.IMREAD_REDUCED_COLOR_4,
+    (2, False): cv2.IMREAD_REDUCED_COLOR_2, (1, False): cv2.IMREAD_COLOR,
+    (8, True): cv2.IMREAD_REDUCED_GRAYSCALE_8, (4, True): cv2.IMREAD_REDUCED_GRAYSCALE_4,
+    (2, True): cv2.IMREAD_REDUCED_GRAYSCALE_2, (1, True): cv2.IMREAD_GRAYSCALE,
+}
+
+# JPEG start-of-frame markers, which carry the image size (0xC4, 0xC8 and 0xCC are other segments)
+_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data):
+    """
+    Read the size of a JPEG image from its header without decoding it.
+    :param data: Encoded file contents (bytes or uint8 array)
+    :return: (width, height), or None if the data isn't a JPEG
+    """
+    data = bytes(data[:2**16]) if isinstance(data, np.ndarray) else data
+    if data[:2] != b'\xff\xd8':
+        return None
+    position = 2
+    while position + 9 <= len(data):
+        if data[position] != 0xFF:
+            return None
+        marker = data[position + 1]
+        if marker == 0xFF:  # Fill byte
+            position += 1
+            continue
+        length = int.from_bytes(data[position + 2:position + 4], 'big')
+        if marker in _SOF_MARKERS:
+            height = int.from_bytes(data[position + 5:position + 7], 'big')
+            width = int.from_bytes(data[position + 7:position + 9], 'big')
+            return width, height
+        position += 2 + length
+    return None
+
+
+def png_size(data):
+    """
+    Read the size of a PNG image from its header without decoding it.
+    :param data: Encoded file contents (bytes or uint8 array)
+    :return: (width, height), or None if the data isn't a PNG
+    """
+    data = bytes(data[:24]) if isinstance(data, np.ndarray) else data
+    if data[:8] != b'\x89PNG\r\n\x1a\n' or data[12:16] != b'IHDR':
+        return None
+    return int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+
+
+def header_size(path):
+    """
+    Read the size of an image file from its header, without reading or decoding the rest.
+    :param path: Image file path
+    :return: (width, height), or None for formats other than JPEG and PNG and for unreadable files
+    """
+    try:
+        with open(path, 'rb') as image_file:
+            data = image_file.read(2**16)
+    except OSError:
+        return None
+    return jpeg_size(data) or png_size(data)
+
+
+def reduction_factor(image_size, max_size):
+    """
+    Pick the largest factor (8, 4 or 2) the image can be decoded at while still covering max_size.
+    :param image_size: (width, height) of the full image
+    :param max_size: Longest side the result is needed at
+    :return: Factor, 1 meaning full resolution
+    """
+    if image_size is None or max_size is None:
+        return 1
+    longest = max(image_size)
+    for factor in (8, 4, 2):
+        # libjpeg rounds the reduced size up
+        if -(-longest // factor) >= max_size:
+            return factor
+    return 1
+
+
+def wants_grayscale(filter_names):
+    """
+    Check whether every filter of a run can start from a grayscale decode.
+    :param filter_names: Filters that will run on the image
+    :return: True if a grayscale decode is enough
+    """
+    return bool(filter_names) and all(name in GRAYSCALE_FILTERS for name in filter_names)
+
+
+def decode_image(data, filter_names=(), max_size=None, grayscale=None):
+    """
+    Decode an image with the cheapest mode the filters and output size allow: JPEGs are decoded at
+    1/2, 1/4 or 1/8 of their size directly when the output is small enough, and in grayscale when
+    every filter only needs the luma. The result is then shrunk to fit max_size exactly.
+    :param data: Encoded file contents (bytes or uint8 array)
+    :param filter_names: Filters that will run on the image (decides on grayscale)
+    :param max_size: Longest side the image is needed at (default is full size)
+    :param grayscale: Force (True) or forbid (False) a grayscale decode; None decides from the filters
+    :return: Tuple of (image or None if it can't be decoded, info dictionary with 'mode', 'factor'
+             and 'seconds' spent decoding and resizing)
+    """
+    start = time.perf_counter()
+    buffer = np.frombuffer(data, dtype=np.uint8) if not isinstance(data, np.ndarray) else data
+    gray = wants_grayscale(filter_names) if grayscale is None else grayscale
+    size = jpeg_size(buffer)
+    # Other formats have no cheap reduced decode; OpenCV would decode them fully and resize anyway
+    factor = reduction_factor(size, max_size) if size is not None else 1
+
+    mode = ('gray' if gray else 'color') + (f'/{factor}' if factor > 1 else '')
+    with span(f'decode {mode}', 'decode', (size[1], size[0]) if size else None):
+        img = cv2.imdecode(buffer, _REDUCED_FLAGS[factor, gray])
+    if img is not None and max_size is not None and max(img.shape[:2]) > max_size:
+        with span('resize', 'decode', img.shape):
+            img = fit_max_size(img, max_size)
+
+    return img, {'mode': mode, 'factor': factor, 'seconds': time.perf_counter() - start}
+
+
+def load_image(path, filter_names=(), max_size=None, grayscale=None):
+    """
+    Read and decode an image file with the cheapest mode (see decode_image()).
+    :param path: Image file path
+    :param filter_names: Filters that will run on the image
+    :param max_size: Longest side the image is needed at (default is full size)
+    :param grayscale: Force (True) or forbid (False) a grayscale decode; None decides from the filters
+    :return: Tuple of (image or None, info dictionary)
+    """
+    with span('read', 'io'), open(path, 'rb') as image_file:
+        data = image_file.read()
+    return decode_image(data, filter_names, max_size, grayscale)
+
+
+def fit_max_size(img, max_size):
+    """
+    Shrink an image so its longest side is max_size, keeping the aspect ratio.
+    :param img: Input image
+    :param max_size: Longest side in pixels
+    :return: Resized image (the input itself if it already fits)
+    """
+    height, width = img.shape[:2]
+    scale = max_size / max(height, width)
+    if scale >= 1:
+        return img
+    size = (max(1, round(width * scale)), max(1, round(height * scale)))
+    return cv2.resize(img, size, interpolation=cv2.INTER_AREA)
+
+
+def atomic_write(path, data):
+    """
+    Write a file so that it appears complete or not at all: the data goes to a temporary file in
+    the same folder, which is then renamed over the target. Readers never see half a file, and an
+    interrupted run leaves no truncated output behind.
+    :param path: Target file path (its folder must exist)
+    :param data: File contents (bytes or a uint8 array such as cv2.imencode's output)
+    :return: The path
+    """
+    # Unique per process and thread; unlike mkstemp, open() gives the file the usual umask permissions
+    temp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+    with span('write', 'io'):
+        try:
+            with open(temp_path, 'xb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    return path
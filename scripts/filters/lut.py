@@ -0,0 +1,152 @@
+import cv2
+import numpy as np
+
+# Every 8-bit input value, the domain of a lookup table
+_VALUES = np.arange(256, dtype=np.float64)
+
+
+def point_lut(func):
+    """
+    Compile a point-wise operation into a 256-entry lookup table.
+    :param func: Function mapping a float array of input values (0..255) to output values
+    :return: uint8 table of shape (256,), rounded and saturated like OpenCV's 8-bit arithmetic
+    """
+    return np.clip(np.rint(func(_VALUES)), 0, 255).astype(np.uint8)
+
+
+def brightness_lut(level):
+    """
+    Table of bright(): cv2.convertScaleAbs(img, beta=level), i.e. |value + level| saturated.
+    :param level: Brightness adjustment level
+    :return: uint8 table
+    """
+    return point_lut(lambda x: np.abs(x + level))
+
+
+def contrast_lut(alpha, pivot=128):
+    """
+    Table scaling the distance of every value from a pivot.
+    :param alpha: Contrast factor (above 1 increases contrast, below 1 flattens)
+    :param pivot: Value left unchanged (default is 128)
+    :return: uint8 table
+    """
+    return point_lut(lambda x: (x - pivot) * alpha + pivot)
+
+
+def gamma_lut(gamma):
+    """
+    Table of a gamma correction: 255 * (value / 255) ** (1 / gamma).
+    :param gamma: Gamma (above 1 brightens the mid-tones, below 1 darkens them)
+    :return: uint8 table
+    """
+    return point_lut(lambda x: 255 * (x / 255) ** (1 / gamma))
+
+
+def posterize_lut(levels):
+    """
+    Table reducing every channel to a number of evenly spaced levels.
+    :param levels: Number of output levels (2 to 256)
+    :return: uint8 table
+    """
+    if not 2 <= levels <= 256:
+        raise ValueError(f"posterize needs 2 to 256 levels, got {levels}")
+    return point_lut(lambda x: np.floor(x * levels / 256) * 255 / (levels - 1))
+
+
+def curve_lut(points):
+    """
+    Table of a tone curve through control points, linear in between and flat beyond the first
+    and last point.
+    :param points: (input, output) pairs, e.g. [(0, 0), (64, 40), (192, 220), (255, 255)]
+    :return: uint8 table
+    """
+    inputs, outputs = zip(*sorted(points))
+    return point_lut(lambda x: np.interp(x, inputs, outputs))
+
+
+def channel_lut(blue, green, red):
+    """
+    Combine one table per channel into a per-channel table for BGR images.
+    :param blue: Table for the blue channel
+    :param green: Table for the green channel
+    :param red: Table for the red channel
+    :return: uint8 table of shape (256, 3)
+    """
+    return np.stack([blue, green, red], axis=1)
+
+
+def compose(*luts):
+    """
+    Compose tables into one that applies them all in order. Since every table works on the 8-bit
+    values the previous one produces, the result is exactly that of applying them one by one.
+    :param luts: Tables of shape (256,) or per-channel tables of shape (256, 3)
+    :return: uint8 table, per-channel if any of the tables is
+    """
+    result = np.arange(256, dtype=np.uint8)
+    for lut in luts:
+        if lut.ndim == 1 and result.ndim == 1:
+            result = lut[result]
+            continue
+        # Per-channel: look up every channel's values in that channel's table
+        channels = max(table.shape[1] for table in (lut, result) if table.ndim == 2)
+        lut, result = (table if table.ndim == 2 else np.repeat(table[:, None], channels, axis=1)
+                       for table in (lut, result))
+        result = np.take_along_axis(lut, result.astype(np.intp), axis=0)
+    return result
+
+
+def apply_lut(img, lut, out=None):
+    """
+    Apply a table to an image in one pass with cv2.LUT.
+    :param img: uint8 image
+    :param lut: Table of shape (256,), or (256, channels) to map every channel with its own table
+    :param out: Optional uint8 array of the same shape to write the result into (may be img itself)
+    :return: Mapped image
+    """
+    if lut.ndim == 2:
+        channels = 1 if img.ndim == 2 else img.shape[2]
+        if lut.shape[1] != channels:
+            raise ValueError(f"a table for {lut.shape[1]} channels can't be applied to a {channels}-channel image")
+        # A 256x1 table with one plane per channel makes cv2.LUT map each channel separately
+        lut = lut.reshape(256, 1, channels)
+    return cv2.LUT(img, lut, dst=out)
+
+
+# Point-wise operations that can be compiled into tables: name -> table builder
+POINT_OPS = {
+    'brightness': brightness_lut,
+    'contrast': contrast_lut,
+    'gamma': gamma_lut,
+    'posterize': posterize_lut,
+    'curve': curve_lut,
+}
+
+
+def compile_chain(steps):
+    """
+    Compile a chain of point-wise operations into one table.
+    :param steps: List of (op name, parameter dictionary), the op names being keys of POINT_OPS,
+                  or of per-channel dictionaries {'blue': [...], 'green': [...], 'red': [...]} of such chains
+    :return: uint8 table, to be applied with apply_lut()
+    """
+    luts = []
+    for step in steps:
+        if isinstance(step, dict):
+            luts.append(channel_lut(*(compile_chain(step.get(channel, [])) for channel in ('blue', 'green', 'red'))))
+            continue
+        name, params = step
+        if name not in POINT_OPS:
+            raise ValueError(f"Unknown point operation '{name}'. Available operations: {', '.join(POINT_OPS)}")
+        luts.append(POINT_OPS[name](**params))
+    return compose(*luts)
+
+
+def tone_adjust(img, steps, out=None):
+    """
+    Apply a chain of point-wise operations to an image in a single pass.
+    :param img: uint8 image
+    :param steps: Chain of operations (see compile_chain())
+    :param out: Optional uint8 array of the same shape to write the result into (may be img itself)
+    :return: Adjusted image
+    """
+    return apply_lut(img, compile_chain(steps), out=out)
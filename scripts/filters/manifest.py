@@ -0,0 +1,130 @@
+import json
+import os
+import sqlite3
+import time
+
+from .cache import input_digest
+from .version import __version__
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS artifacts (
+    output_path   TEXT PRIMARY KEY,
+    source_path   TEXT NOT NULL,
+    source_mtime  REAL NOT NULL,
+    source_size   INTEGER NOT NULL,
+    source_hash   TEXT NOT NULL,
+    filter        TEXT NOT NULL,
+    params        TEXT NOT NULL,
+    version       TEXT NOT NULL,
+    built_at      REAL NOT NULL
+)
+"""
+
+
+def file_digest(path):
+    """
+    Hash the contents of a file the same way the result cache hashes inputs.
+    :param path: File path
+    :return: Hex digest
+    """
+    with open(path, 'rb') as source_file:
+        return input_digest(source_file.read())
+
+
+class Manifest:
+    """
+    A SQLite record of every artifact in a filtered catalog: which source file (by mtime, size
+    and content hash), filter, parameters and library version produced each output file.
+    """
+
+    def __init__(self, path):
+        """
+        :param path: SQLite file path (created if needed)
+        """
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._db = sqlite3.connect(path)
+        self._db.execute(_SCHEMA)
+
+    def artifacts(self):
+        """
+        Return every recorded artifact.
+        :return: Dictionary mapping output path to a row dictionary
+        """
+        cursor = self._db.execute('SELECT * FROM artifacts')
+        columns = [column[0] for column in cursor.description]
+        return {row[0]: dict(zip(columns, row)) for row in cursor}
+
+    def record(self, output_path, source_path, source_stat, source_hash, filter_name, params):
+        """
+        Record (or replace) the artifact an output file holds.
+        :param output_path: Output file path
+        :param source_path: Source image path
+        :param source_stat: os.stat() result of the source image
+        :param source_hash: Content hash of the source image
+        :param filter_name: Filter that produced the output
+        :param params: Parameters the filter ran with
+        """
+        self._db.execute('INSERT OR REPLACE INTO artifacts VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                         (output_path, source_path, source_stat.st_mtime, source_stat.st_size, source_hash,
+                          filter_name, encode_params(params), __version__, time.time()))
+
+    def touch_source(self, source_path, source_stat):
+        """
+        Update the recorded mtime and size of a source whose contents turned out to be unchanged.
+        :param source_path: Source image path
+        :param source_stat: os.stat() result of the source image
+        """
+        self._db.execute('UPDATE artifacts SET source_mtime = ?, source_size = ? WHERE source_path = ?',
+                         (source_stat.st_mtime, source_stat.st_size, source_path))
+
+    def remove(self, output_path):
+        """
+        Forget an artifact.
+        :param output_path: Output file path
+        """
+        self._db.execute('DELETE FROM artifacts WHERE output_path = ?', (output_path,))
+
+    def commit(self):
+        """
+        Write the recorded changes to disk.
+        """
+        self._db.commit()
+
+    def close(self):
+        """
+        Commit and close the manifest.
+        """
+        self._db.commit()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def encode_params(params):
+    """
+    Encode filter parameters canonically, so equal parameters always compare equal.
+    :param params: Parameter dictionary
+    :return: JSON string
+    """
+    return json.dumps(params, sort_keys=True, default=str)
+
+
+def is_current(row, source_stat, params):
+    """
+    Check, without reading the source, whether a recorded artifact still matches its source
+    and recipe. A source whose mtime or size changed needs its hash checked (see file_digest).
+    :param row: Manifest row of the artifact
+    :param source_stat: os.stat() result of the source image
+    :param params: Parameters the filter should run with
+    :return: True if up to date, False if the recipe changed, None if the source may have changed
+    """
+    if row['params'] != encode_params(params) or row['version'] != __version__:
+        return False
+    if row['source_mtime'] == source_stat.st_mtime and row['source_size'] == source_stat.st_size:
+        return True
+    return None
@@ -0,0 +1,123 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+
+class MaskCache:
+    """
+    A size-bounded LRU cache for masks, so images that share a resolution share one mask.
+    Entries are evicted least recently used first once the cached masks exceed max_bytes.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, max_bytes=256 * 2**20):
+        """
+        :param max_bytes: Largest total size of the cached masks in bytes (default is 256 MB)
+        """
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._masks = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        """
+        Return the cached mask for a key, building and caching it on a miss.
+        :param key: Hashable cache key
+        :param build: Function without arguments returning the mask
+        :return: The mask (read-only)
+        """
+        with self._lock:
+            mask = self._masks.get(key)
+            if mask is not None:
+                self._masks.move_to_end(key)
+                self.hits += 1
+                return mask
+            self.misses += 1
+
+        mask = build()
+        mask.setflags(write=False)  # Shared between callers, so nobody may modify it in place
+
+        with self._lock:
+            if key not in self._masks and mask.nbytes <= self.max_bytes:
+                self._masks[key] = mask
+                self._bytes += mask.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._masks.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self.evictions += 1
+        return mask
+
+    def info(self):
+        """
+        Return the cache counters.
+        :return: Dictionary with hits, misses, evictions, entries, bytes and max_bytes
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._masks), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+    def clear(self):
+        """
+        Drop every cached mask and reset the counters.
+        """
+        with self._lock:
+            self._masks.clear()
+            self._bytes = 0
+            self.hits = self.misses = self.evictions = 0
+
+
+# Vignette masks shared by vignette(), the pipeline and the batch workers
+MASK_CACHE = MaskCache()
+
+
+def vignette_mask(height, width, level=2):
+    """
+    Build the vignette mask for an image size: 1.0 in the center falling off towards the borders.
+    :param height: Image height in pixels
+    :param width: Image width in pixels
+    :param level: Intensity of the vignette effect (default is 2)
+    :return: Float mask of shape (height, width) with values in (0, 1]
+    """
+    # Generate Gaussian kernels for both X and Y axes, which will be used to create the vignette mask
+    X_resultant_kernel = cv2.getGaussianKernel(width, width/level)
+    Y_resultant_kernel = cv2.getGaussianKernel(height, height/level)
+
+    # Normalizing both kernels before multiplying them normalizes the mask to a maximum of 1
+    return (Y_resultant_kernel / Y_resultant_kernel.max()) * (X_resultant_kernel / X_resultant_kernel.max()).T
+
+
+def cached_vignette_mask(height, width, level=2, channels=1):
+    """
+    Return the vignette mask for an image size from MASK_CACHE, as float32 with one plane per
+    channel so it can be multiplied with the image in one cv2.multiply call.
+    :param height: Image height in pixels
+    :param width: Image width in pixels
+    :param level: Intensity of the vignette effect (default is 2)
+    :param channels: Number of image channels (default is 1)
+    :return: Read-only float32 mask of shape (height, width) or (height, width, channels)
+    """
+    def build():
+        mask = vignette_mask(height, width, level).astype(np.float32)
+        return mask if channels == 1 else cv2.merge([mask] * channels)
+
+    return MASK_CACHE.get(('vignette', height, width, level, channels), build)
+
+
+def vignette(img, level=2, out=None):
+    """
+    Apply a vignette filter to an image by darkening the borders while keeping the center bright.
+    :param img: Input image
+    :param level: Intensity of the vignette effect (default is 2)
+    :param out: Optional uint8 array of the same shape to write the result into (may be img itself)
+    :return: Image with vignette effect applied
+    """
+    height, width = img.shape[:2]
+    mask = cached_vignette_mask(height, width, level, 1 if img.ndim == 2 else img.shape[2])
+
+    # One saturating multiply of every channel with the mask
+    return cv2.multiply(img, mask, dst=out, dtype=cv2.CV_8U)
@@ -0,0 +1,442 @@
+import cv2
+import numpy as np
+
+from .blur import BOX_RADIUS_THRESHOLD, gaussian_blur
+from .color import SEPIA_MATRIX, bright
+from .edges import EMBOSS_KERNEL, outline_kernel
+from .masks import cached_vignette_mask, vignette_mask
+from .npr import pencil_sketch, stylization
+
+# Grayscale weights in BGR order, the same ones cv2.COLOR_BGR2GRAY uses
+GRAY_WEIGHTS = np.array([[0.114, 0.587, 0.299]])
+
+_GRAY_AFFINE = np.hstack([GRAY_WEIGHTS, np.zeros((1, 1))])
+
+# Color spaces the planner tracks intermediate images in, with their channel counts
+SPACES = {'BGR': 3, 'RGB': 3, 'GRAY': 1}
+
+# cv2.cvtColor codes of the conversions a pipeline may have to run as a pass of their own
+_CONVERSION_CODES = {
+    ('BGR', 'RGB'): cv2.COLOR_BGR2RGB,
+    ('RGB', 'BGR'): cv2.COLOR_RGB2BGR,
+    ('BGR', 'GRAY'): cv2.COLOR_BGR2GRAY,
+    ('RGB', 'GRAY'): cv2.COLOR_RGB2GRAY,
+    ('GRAY', 'BGR'): cv2.COLOR_GRAY2BGR,
+    ('GRAY', 'RGB'): cv2.COLOR_GRAY2RGB,
+}
+
+
+# Rough cost of one extra full-image pass, in kernel taps. Two convolutions are only combined
+# into one when the combined kernel costs less than running both plus the extra pass.
+PASS_COST = 3
+
+
+def gaussian_kernel(ksize=5, sigma=0):
+    """
+    Build the separable Gaussian kernel cv2.GaussianBlur uses for a square kernel size.
+    :param ksize: Kernel size (odd)
+    :param sigma: Gaussian standard deviation (0 derives it from ksize like OpenCV does)
+    :return: Tuple of (column kernel, row kernel)
+    """
+    kernel = cv2.getGaussianKernel(ksize, sigma)
+    return kernel, kernel
+
+
+def combine_kernels(first, second):
+    """
+    Combine two kernels into one, so that filtering with the result equals filtering with
+    'first' and then with 'second' (away from the image borders and before saturation).
+    Two separable kernels combine into a separable kernel.
+    :param first: Kernel applied first, a 2D array or a (column, row) tuple of a separable kernel
+    :param second: Kernel applied second, same forms as 'first'
+    :return: Combined kernel
+    """
+    if isinstance(first, tuple) and isinstance(second, tuple):
+        return tuple(np.convolve(np.ravel(a), np.ravel(b)).reshape(-1, 1) for a, b in zip(first, second))
+
+    first = _full_kernel(first)
+    second = _full_kernel(second)
+    height, width = first.shape
+    combined = np.zeros((height + second.shape[0] - 1, width + second.shape[1] - 1))
+    for (y, x), weight in np.ndenumerate(second):
+        combined[y:y + height, x:x + width] += weight * first
+    return combined
+
+
+def conversion_matrix(source, target):
+    """
+    Express a color space conversion as a matrix, so it can be folded into a color transform.
+    :param source: Color space converted from (a key of SPACES)
+    :param target: Color space converted to
+    :return: Matrix (rows: target channels, columns: source channels)
+    """
+    if source == target:
+        return np.eye(SPACES[source])
+    if source == 'GRAY':
+        return np.ones((3, 1))  # Every color channel carries the gray value
+    if target == 'GRAY':
+        return GRAY_WEIGHTS if source == 'BGR' else GRAY_WEIGHTS[:, ::-1]
+    return np.eye(3)[::-1]  # BGR <-> RGB swaps the first and last channel
+
+
+def _full_kernel(kernel):
+    # Expand a separable (column, row) kernel into its 2D form
+    if isinstance(kernel, tuple):
+        column, row = kernel
+        return np.ravel(column).reshape(-1, 1) * np.ravel(row).reshape(1, -1)
+    return np.asarray(kernel, dtype=np.float64)
+
+
+def kernel_cost(kernel):
+    """
+    Estimate the cost of a convolution in kernel taps per pixel.
+    :param kernel: 2D array or (column, row) tuple of a separable kernel
+    :return: Number of taps
+    """
+    if isinstance(kernel, tuple):
+        return sum(np.size(part) for part in kernel)
+    return np.size(kernel)
+
+
+def _canny(img, threshold1=100, threshold2=200):
+    return cv2.Canny(img, threshold1, threshold2)
+
+
+def _pencil_sketch(img, output=0):
+    return pencil_sketch(img)[output]
+
+
+def _stylization(img, sigma_s=40, sigma_r=0.1, quality=1.0):
+    return stylization(img, sigma_s, sigma_r, quality)
+
+
+# cv2.Canny takes gray images as they are; on color ones it follows the strongest channel,
+# preferring earlier channels on ties, so the channel order matters
+_CANNY_SPACES = ('BGR', 'GRAY')
+
+
+def _pre_blur(radius):
+    # Small radii stay a kernel the planner can fuse; large ones run gaussian_blur()'s box cascade
+    if radius < 1:
+        return []
+    if radius <= BOX_RADIUS_THRESHOLD:
+        return [('blur', 2 * radius + 1)]
+    return [('op', gaussian_blur, {'radius': radius}, None, None)]
+
+
+# How each step a pipeline accepts breaks down into primitives the planner knows how to fuse:
+#   ('matrix', M, space)                   per-pixel linear color transform (rows: output channels, columns:
+#                                          input channels in 'space'; one row outputs GRAY, three stay in 'space')
+#   ('offset', value)                      per-pixel constant added to every channel
+#   ('mask', level)                        vignette mask multiply
+#   ('kernel', K)                          linear convolution, K is 2D or a (column, row) separable pair
+#   ('blur', ksize)                        cv2.GaussianBlur, a separable kernel that fuses like any other
+#   ('op', func, params, channels, spaces) anything else, run as it is (channels it outputs, None keeps them;
+#                                          the color spaces it takes, converting to the first if needed; None takes any)
+# Offsets, masks and kernels treat every channel alike, so they run in whatever color space the
+# image is in. Matrices and ops say which one they need, and the planner converts to it.
+STEPS = {
+    'bw_filter': lambda: [('matrix', GRAY_WEIGHTS, 'BGR')],
+    # Defined in RGB like sepia(); the planner folds the channel swaps into the matrix
+    'sepia': lambda: [('matrix', SEPIA_MATRIX, 'RGB')],
+    'bright': lambda level: [('offset', level)] if level >= 0 else [('op', bright, {'level': level}, None, None)],
+    'vignette': lambda level=2: [('mask', level)],
+    'outline': lambda k=9: [('kernel', outline_kernel(k))],
+    'embossed_edges': lambda: [('kernel', EMBOSS_KERNEL)],
+    'gaussian_blur': lambda ksize=5: [('blur', ksize)],
+    'canny': lambda threshold1=100, threshold2=200: [
+        ('op', _canny, {'threshold1': threshold1, 'threshold2': threshold2}, 1, _CANNY_SPACES)],
+    'edge_detection': lambda apply_blur=False, threshold1=100, threshold2=200, blur_radius=2: (
+        (_pre_blur(blur_radius) if apply_blur else []) +
+        [('op', _canny, {'threshold1': threshold1, 'threshold2': threshold2}, 1, _CANNY_SPACES)]),
+    'pencil_sketch_bw': lambda blur_radius=2: _pre_blur(blur_radius) + [
+        ('op', _pencil_sketch, {'output': 0}, 1, ('BGR',))],
+    'pencil_sketch_color': lambda blur_radius=2: _pre_blur(blur_radius) + [
+        ('op', _pencil_sketch, {'output': 1}, 3, ('BGR',))],
+    'stylization_filter': lambda sigma_s=40, sigma_r=0.1, blur_radius=2, quality=1.0: _pre_blur(blur_radius) + [
+        ('op', _stylization, {'sigma_s': sigma_s, 'sigma_r': sigma_r, 'quality': quality}, 3, ('BGR',))],
+}
+
+
+def _parse_step(step):
+    # Steps are given as a name or as a (name, params) tuple
+    name, params = (step, {}) if isinstance(step, str) else step
+    if name not in STEPS:
+        raise ValueError(f"Unknown pipeline step '{name}'. Available steps: {', '.join(STEPS)}")
+    return name, STEPS[name](**params)
+
+
+def plan(steps, channels=3, output='BGR'):
+    """
+    Fuse a list of steps into as few full-image passes (stages) as possible.
+
+    Consecutive color transforms and brightness offsets compose into one affine transform,
+    and vignette masks that follow them are multiplied in within the same stage.
+    Consecutive convolutions are combined into one kernel when that is cheaper (see PASS_COST).
+
+    The color space of every intermediate image is tracked, and conversions are put off until a
+    step needs another space: one a color transform needs is folded into its matrix, one an op
+    needs is folded into the color stage before it if there is one, and only otherwise runs as a
+    pass of its own ('convert'). A gray image stays single-channel through offsets, masks and
+    kernels, and is only expanded where three channels are needed.
+    :param steps: List of step names or (name, params) tuples, see STEPS
+    :param channels: Channel count of the input image (1 or 3)
+    :param output: Color space of a color result, 'BGR' or 'RGB' (e.g. for matplotlib); gray results stay gray
+    :return: List of stage dictionaries, each with a 'kind' ('color', 'convolve', 'op' or 'convert'),
+             the color 'space' and 'channels' of its output and the step names it covers
+    """
+    if output not in ('BGR', 'RGB'):
+        raise ValueError(f"Unknown output color space '{output}'. Available: BGR, RGB")
+    space = 'GRAY' if channels == 1 else 'BGR'
+    stages = []
+    for name, primitives in (_parse_step(step) for step in steps):
+        for primitive in primitives:
+            kind = primitive[0]
+            last = stages[-1] if stages else None
+
+            if kind in ('matrix', 'offset', 'mask'):
+                # Masks are applied after the stage's affine transform saturates, so a transform
+                # following a mask has to start a new stage to keep the saturation order
+                if last is None or last['kind'] != 'color' or (kind != 'mask' and last['masks']):
+                    last = {'kind': 'color', 'matrix': np.hstack([np.eye(channels), np.zeros((channels, 1))]),
+                            'masks': [], 'channels': channels, 'space': space, 'steps': []}
+                    stages.append(last)
+                if kind == 'matrix':
+                    _, matrix, matrix_space = primitive
+                    _add_color(last, ('matrix', matrix @ conversion_matrix(space, matrix_space)))
+                    last['space'] = 'GRAY' if matrix.shape[0] == 1 else matrix_space
+                else:
+                    _add_color(last, primitive)
+            elif kind in ('kernel', 'blur'):
+                kernel = gaussian_kernel(primitive[1]) if kind == 'blur' else primitive[1]
+                if last is not None and last['kind'] == 'convolve':
+                    combined = combine_kernels(last['kernel'], kernel)
+                    if kernel_cost(combined) < kernel_cost(last['kernel']) + kernel_cost(kernel) + PASS_COST:
+                        last['kernel'] = combined
+                        last['blur'] = None
+                    else:
+                        last = None
+                else:
+                    last = None
+                if last is None:
+                    # A lone Gaussian blur keeps running through cv2.GaussianBlur, which is bit-exact
+                    # with the filters' own pre-blur (filters like cv2.stylization amplify any difference)
+                    last = {'kind': 'convolve', 'kernel': kernel, 'blur': primitive[1] if kind == 'blur' else None,
+                            'channels': channels, 'space': space, 'steps': []}
+                    stages.append(last)
+            else:
+                _, func, params, op_channels, op_spaces = primitive
+                if op_spaces is not None and space not in op_spaces:
+                    _convert(stages, space, op_spaces[0], name)
+                    space = op_spaces[0]
+                last = {'kind': 'op', 'func': func, 'params': params, 'channels': op_channels or SPACES[space],
+                        'space': {None: space, 1: 'GRAY', 3: space}[op_channels], 'needs': op_spaces, 'steps': []}
+                stages.append(last)
+
+            channels, space = last['channels'], last['space']
+            if name not in last['steps']:
+                last['steps'].append(name)
+
+    if space != 'GRAY' and space != output:
+        _convert(stages, space, output, 'output')
+    return stages
+
+
+def _convert(stages, source, target, name):
+    # Convert the image the last stage outputs, folded into that stage when it is a color stage.
+    # Swaps and gray expansion commute with its masks; a reduction to gray only folds in without.
+    # A BGR <-> RGB swap also commutes with stages that treat every channel alike (kernels, and
+    # ops that keep the space), so it can be moved back to the color stage before them.
+    index = len(stages) - 1
+    if SPACES[source] == SPACES[target] == 3:
+        while index >= 0 and (stages[index]['kind'] == 'convolve' or
+                              stages[index]['kind'] == 'op' and stages[index]['needs'] is None and
+                              stages[index]['channels'] == 3):
+            index -= 1
+    stage = stages[index] if index >= 0 else None
+    if stage is not None and stage['kind'] == 'color' and (target != 'GRAY' or not stage['masks']) and \
+            (index == len(stages) - 1 or SPACES[source] == SPACES[target]):
+        _add_color(stage, ('matrix', conversion_matrix(source, target)))
+        for later in stages[index:]:
+            later['space'] = target
+    else:
+        stage = {'kind': 'convert', 'code': _CONVERSION_CODES[source, target], 'channels': SPACES[target],
+                 'space': target, 'steps': []}
+        stages.append(stage)
+    if name not in stage['steps']:
+        stage['steps'].append(name)
+
+
+def conversion_report(steps, channels=3, output='BGR'):
+    """
+    Count the color conversions a recipe needs when run as separate filters, each taking and
+    returning BGR (sepia() converting to RGB and back, a gray result expanded again for a step
+    that needs color, BGR to RGB for display), and those left once the pipeline is planned.
+    :param steps: List of step names or (name, params) tuples, see STEPS
+    :param channels: Channel count of the input image (1 or 3)
+    :param output: Color space of a color result, 'BGR' or 'RGB'
+    :return: Dictionary with the number of conversions 'separate', 'planned' and 'removed'
+    """
+    separate = 0
+    space = 'GRAY' if channels == 1 else 'BGR'
+    for _, primitives in (_parse_step(step) for step in steps):
+        for primitive in primitives:
+            kind = primitive[0]
+            if kind not in ('matrix', 'op'):
+                continue
+            needed = (primitive[2],) if kind == 'matrix' else primitive[4]
+            rows = primitive[1].shape[0] if kind == 'matrix' else primitive[3]
+            if needed is not None and space not in needed and not (space == 'GRAY' and kind == 'matrix' and rows == 1):
+                # Expand gray to BGR first, then go to the space needed and back to BGR after
+                separate += (space == 'GRAY') + 2 * (needed[0] == 'RGB')
+            space = {None: space, 1: 'GRAY', 3: 'BGR'}[rows]
+    separate += space == 'BGR' and output == 'RGB'
+    planned = sum(stage['kind'] == 'convert' for stage in plan(steps, channels, output))
+    return {'separate': separate, 'planned': planned, 'removed': separate - planned}
+
+
+def _add_color(stage, primitive):
+    # Fold one color primitive into a stage computing y = masks * saturate(A x + c)
+    kind, value = primitive
+
+    if kind == 'mask':
+        stage['masks'].append(value)
+        return
+
+    if kind == 'offset':
+        matrix = np.eye(stage['channels'])
+        offset = float(value)
+    else:
+        matrix = np.asarray(value, dtype=np.float64)
+        offset = 0.0
+
+    stage['matrix'] = matrix @ stage['matrix']
+    stage['matrix'][:, -1] += offset
+    stage['channels'] = matrix.shape[0]
+
+
+class Pipeline:
+    """
+    A filter recipe that runs in as few passes over the image as possible.
+
+    Steps are planned into fused stages once per input channel count (see plan()), and the
+    intermediate images live in buffers that are reused from one call to the next, so a
+    pipeline applied to many same-sized images allocates nothing but its outputs.
+
+    The fused result matches running the steps one by one up to rounding, except where an
+    intermediate result would have saturated: fused color transforms and combined kernels
+    saturate once at the end of their stage.
+
+    Example:
+        pipeline = Pipeline(['bw_filter', ('outline', {'k': 10})])
+        img_outline = pipeline(img)
+    """
+
+    def __init__(self, steps, output='BGR'):
+        """
+        :param steps: List of step names or (name, params) tuples, see STEPS
+        :param output: Color space of a color result, 'BGR' or 'RGB' for display with matplotlib
+        """
+        self.steps = list(steps)
+        self.output = output
+        for step in self.steps:
+            _parse_step(step)  # Fail early on unknown steps or parameters
+        self._plans = {}
+        self._buffers = {}
+        self._masks = {}
+
+    def plan(self, channels=3):
+        """
+        Return the fused stages for an input channel count, planning them on first use.
+        :param channels: Channel count of the input image (1 or 3)
+        :return: List of stage dictionaries
+        """
+        if channels not in self._plans:
+            self._plans[channels] = plan(self.steps, channels, self.output)
+        return self._plans[channels]
+
+    def describe(self, channels=3):
+        """
+        Describe the fused stages, one line per full-image pass.
+        :param channels: Channel count of the input image (1 or 3)
+        :return: List of strings
+        """
+        return [f"{stage['kind']}: {' + '.join(stage['steps'])}" for stage in self.plan(channels)]
+
+    def conversions(self, channels=3):
+        """
+        Count the color conversions planning removed, see conversion_report().
+        :param channels: Channel count of the input image (1 or 3)
+        :return: Dictionary with the number of conversions 'separate', 'planned' and 'removed'
+        """
+        return conversion_report(self.steps, channels, self.output)
+
+    def __call__(self, img, out=None):
+        """
+        Run the pipeline on an image.
+        :param img: Input image (BGR or grayscale, uint8)
+        :param out: Optional preallocated array for the result
+        :return: Filtered image
+        """
+        stages = self.plan(1 if img.ndim == 2 else img.shape[2])
+
+        src = img
+        for index, stage in enumerate(stages):
+            if index == len(stages) - 1:
+                dst = out
+            else:
+                dst = self._buffer(index % 2, src.shape[:2], stage['channels'])
+            src = self._run_stage(stage, src, dst)
+
+        if out is not None and src is not out:
+            np.copyto(out, src)
+            return out
+        return src.copy() if src is img else src
+
+    def _buffer(self, slot, size, channels):
+        # Two buffers per image size and channel count, used alternately so a stage never reads its own output
+        shape = size if channels == 1 else size + (channels,)
+        key = (slot, shape)
+        if key not in self._buffers:
+            self._buffers[key] = np.empty(shape, dtype=np.uint8)
+        return self._buffers[key]
+
+    def _mask(self, levels, size, channels):
+        # A single vignette comes from the shared mask cache, a product of several is kept per pipeline
+        if len(levels) == 1:
+            return cached_vignette_mask(size[0], size[1], levels[0], channels)
+
+        key = (tuple(levels), size, channels)
+        if key not in self._masks:
+            mask = np.ones(size, dtype=np.float64)
+            for level in levels:
+                mask *= vignette_mask(size[0], size[1], level)
+            mask = mask.astype(np.float32)
+            self._masks[key] = mask if channels == 1 else cv2.merge([mask] * channels)
+        return self._masks[key]
+
+    def _run_stage(self, stage, src, dst):
+        if stage['kind'] == 'color':
+            if not stage['masks'] and np.array_equal(stage['matrix'], _GRAY_AFFINE):
+                return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst)  # Plain grayscale has a faster dedicated path
+
+            # One saturating transform, then the mask multiply in place on the same buffer
+            dst = cv2.transform(src, stage['matrix'].astype(np.float32), dst=dst)
+            if stage['masks']:
+                dst = cv2.multiply(dst, self._mask(stage['masks'], src.shape[:2], stage['channels']),
+                                   dst=dst, dtype=cv2.CV_8U)
+            return dst
+
+        if stage['kind'] == 'convolve':
+            kernel = stage['kernel']
+            if stage['blur']:
+                ksize = stage['blur']
+                return cv2.GaussianBlur(src, (ksize, ksize), 0, dst=dst)
+            if isinstance(kernel, tuple):
+                return cv2.sepFilter2D(src, -1, kernel[1].astype(np.float32), kernel[0].astype(np.float32), dst=dst)
+            return cv2.filter2D(src, -1, kernel.astype(np.float32), dst=dst)
+
+        if stage['kind'] == 'convert':
+            return cv2.cvtColor(src, stage['code'], dst=dst)
+
+        return stage['func'](src, **stage['params'])
@@ -0,0 +1,64 @@
+import sys
+
+import cv2
+
+
+def _pyplot():
+    """
+    Import matplotlib.pyplot on first use only, switching to the interactive TkAgg backend
+    unless pyplot was already set up by the caller. Importing the filters never pays for this.
+    :return: The matplotlib.pyplot module
+    """
+    import matplotlib
+
+    if 'matplotlib.pyplot' not in sys.modules:
+        matplotlib.use('TkAgg')
+
+    import matplotlib.pyplot as plt
+    return plt
+
+
+def _imshow(plt, img):
+    # Grayscale results (bw, edges, sketch) are shown with a gray colormap, color ones converted from BGR
+    if img.ndim == 2:
+        plt.imshow(img, cmap='gray')
+    else:
+        plt.imshow(cv2.cvtColor(img, cv2.COLOR_BGR2RGB))
+
+
+def plot(img1, img2, title1="Original Image", title2="Filtered Image"):
+    """
+    Display two images side by side using Matplotlib for easy comparison.
+    :param img1: First image (original)
+    :param img2: Second image (filtered)
+    :param title1: Title for the first image
+    :param title2: Title for the second image
+    """
+    plt = _pyplot()
+    plt.figure(figsize=(20, 10))
+
+    plt.subplot(1, 2, 1)
+    _imshow(plt, img1)
+    plt.axis('off')
+    plt.title(title1)
+
+    plt.subplot(1, 2, 2)
+    _imshow(plt, img2)
+    plt.axis('off')
+    plt.title(title2)
+
+    plt.show()
+    plt.close()
+
+
+def show(img, title):
+    """
+    Display a single image using Matplotlib.
+    :param img: Image to display
+    :param title: Title for the image
+    """
+    plt = _pyplot()
+    _imshow(plt, img)
+    plt.title(title)
+    plt.show()
+    plt.close()
@@ -0,0 +1,255 @@
+# json and tracemalloc are imported on first use: every filter module imports span() from here,
+# and importing the filters package must stay cheap
+import os
+import threading
+import time
+
+# Image sizes results are aggregated by: (upper bound in megapixels, label)
+RESOLUTION_BUCKETS = ((1, '<1MP'), (4, '1-4MP'), (12, '4-12MP'), (24, '12-24MP'), (float('inf'), '>24MP'))
+
+# The active tracer, set by enable()
+_tracer = None
+
+
+def resolution_bucket(shape):
+    """
+    Name the resolution bucket of an image.
+    :param shape: Image shape (height, width[, channels]), or None
+    :return: Bucket label, or None without a shape
+    """
+    if shape is None:
+        return None
+    megapixels = shape[0] * shape[1] / 1e6
+    return next(label for bound, label in RESOLUTION_BUCKETS if megapixels < bound)
+
+
+class _NoSpan:
+    # What span() returns while tracing is off: entering and leaving it does nothing
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NO_SPAN = _NoSpan()
+
+
+class _Span:
+    def __init__(self, tracer, name, category, shape):
+        self.tracer = tracer
+        self.event = {'name': name, 'cat': category, 'bucket': resolution_bucket(shape)}
+
+    def __enter__(self):
+        if self.tracer.memory:
+            self.tracer._push(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        end = time.perf_counter()
+        self.event.update(ts=self.start * 1e6, dur=(end - self.start) * 1e6, pid=os.getpid(),
+                          tid=threading.get_ident())
+        if self.tracer.memory:
+            self.tracer._pop(self)
+        self.tracer._record(self.event)
+
+
+class Tracer:
+    """
+    Records a timed event for every span: the filters, the steps inside them (pre-blur,
+    stylization, color transforms), decoding, encoding and writing. With 'memory', each event
+    also gets the peak memory allocated during the span on top of what was held when it started
+    ('peak_bytes') and what it still held at its end ('net_bytes', e.g. the result). Memory is
+    traced with tracemalloc, which sees NumPy arrays, including those OpenCV returns, but not
+    OpenCV's internal scratch buffers. It is counted per process, so with several threads
+    filtering at once the figures include the other threads' arrays; tracing also slows
+    allocation-heavy code down noticeably.
+    """
+
+    def __init__(self, memory=False):
+        """
+        :param memory: Also record allocations
+        """
+        self.memory = memory
+        self.events = []
+        self._lock = threading.Lock()
+        self._stacks = threading.local()
+        if memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def span(self, name, category='filter', shape=None):
+        """
+        Time a block of code.
+        :param name: Event name (e.g. the filter)
+        :param category: Event category ('filter', 'step', 'decode', 'encode', 'io')
+        :param shape: Shape of the image processed, which picks the resolution bucket
+        :return: Context manager
+        """
+        return _Span(self, name, category, shape)
+
+    def _push(self, span):
+        import tracemalloc
+        stack = self._stack()
+        current, peak = tracemalloc.get_traced_memory()
+        # Resetting the peak for the new span would lose the enclosing spans' peak so far
+        for outer in stack:
+            outer.peak = max(outer.peak, peak)
+        tracemalloc.reset_peak()
+        span.base = span.peak = current
+        stack.append(span)
+
+    def _pop(self, span):
+        import tracemalloc
+        stack = self._stack()
+        current, peak = tracemalloc.get_traced_memory()
+        span.peak = max(span.peak, peak)
+        stack.pop()
+        if stack:
+            stack[-1].peak = max(stack[-1].peak, span.peak)
+        span.event.update(peak_bytes=span.peak - span.base, net_bytes=current - span.base)
+
+    def _stack(self):
+        if not hasattr(self._stacks, 'spans'):
+            self._stacks.spans = []
+        return self._stacks.spans
+
+    def _record(self, event):
+        with self._lock:
+            self.events.append(event)
+
+    def drain(self):
+        """
+        Take the events recorded so far, e.g. to send them from a worker process to the parent.
+        :return: List of event dictionaries
+        """
+        with self._lock:
+            events, self.events = self.events, []
+        return events
+
+    def extend(self, events):
+        """
+        Add events recorded elsewhere, e.g. by worker processes.
+        :param events: List of event dictionaries
+        """
+        with self._lock:
+            self.events.extend(events)
+
+
+def enable(memory=False):
+    """
+    Start tracing in this process. Spans cost a few microseconds each while tracing is on, and
+    close to nothing while it is off.
+    :param memory: Also record allocations (see Tracer)
+    :return: The Tracer
+    """
+    global _tracer
+    _tracer = Tracer(memory)
+    return _tracer
+
+
+def disable():
+    """
+    Stop tracing in this process.
+    :return: The Tracer that was active, with its events, or None
+    """
+    global _tracer
+    tracer, _tracer = _tracer, None
+    if tracer is not None and tracer.memory:
+        import tracemalloc
+        tracemalloc.stop()
+    return tracer
+
+
+def active():
+    """
+    :return: The active Tracer, or None if tracing is off
+    """
+    return _tracer
+
+
+def span(name, category='filter', shape=None):
+    """
+    Time a block of code if tracing is on:
+
+        with span('stylization', 'step', img.shape):
+            img = cv2.stylization(img)
+
+    :param name: Event name
+    :param category: Event category ('filter', 'step', 'decode', 'encode', 'io')
+    :param shape: Shape of the image processed, which picks the resolution bucket
+    :return: Context manager
+    """
+    if _tracer is None:
+        return _NO_SPAN
+    return _tracer.span(name, category, shape)
+
+
+def summarize(events):
+    """
+    Aggregate events per name, category and resolution bucket.
+    :param events: Event dictionaries
+    :return: List of dictionaries with name, category, bucket, count, total_ms, mean_ms, max_ms and,
+             for events with memory, the largest peak_bytes and the mean net_bytes; slowest in total first
+    """
+    groups = {}
+    for event in events:
+        key = (event['name'], event['cat'], event['bucket'])
+        groups.setdefault(key, []).append(event)
+
+    rows = []
+    for (name, category, bucket), group in groups.items():
+        durations = [event['dur'] / 1000 for event in group]
+        row = {'name': name, 'category': category, 'bucket': bucket, 'count': len(group),
+               'total_ms': sum(durations), 'mean_ms': sum(durations) / len(group), 'max_ms': max(durations)}
+        if 'peak_bytes' in group[0]:
+            row['peak_bytes'] = max(event['peak_bytes'] for event in group)
+            row['net_bytes'] = sum(event['net_bytes'] for event in group) / len(group)
+        rows.append(row)
+    return sorted(rows, key=lambda row: row['total_ms'], reverse=True)
+
+
+def format_summary(rows, limit=20):
+    """
+    Format a summary as a table.
+    :param rows: Rows returned by summarize()
+    :param limit: Rows shown at most
+    :return: String
+    """
+    lines = [f"{'span':<28} {'kind':<7} {'size':<8} {'count':>6} {'total':>10} {'mean':>9} {'max':>9}"
+             + ('  peak mem' if rows and 'peak_bytes' in rows[0] else '')]
+    for row in rows[:limit]:
+        line = (f"{row['name']:<28} {row['category']:<7} {row['bucket'] or '-':<8} {row['count']:6d} "
+                f"{row['total_ms']:8.0f}ms {row['mean_ms']:7.1f}ms {row['max_ms']:7.1f}ms")
+        if 'peak_bytes' in row:
+            line += f"  {row['peak_bytes'] / 2**20:6.1f} MB"
+        lines.append(line)
+    return '\n'.join(lines)
+
+
+def chrome_trace(events):
+    """
+    Convert events to the Chrome trace format, viewable in chrome://tracing or Perfetto.
+    :param events: Event dictionaries
+    :return: Trace dictionary, to be saved as JSON
+    """
+    trace = []
+    for event in events:
+        args = {name: event[name] for name in ('bucket', 'peak_bytes', 'net_bytes') if event.get(name) is not None}
+        trace.append({'name': event['name'], 'cat': event['cat'], 'ph': 'X', 'ts': event['ts'], 'dur': event['dur'],
+                      'pid': event['pid'], 'tid': event['tid'], 'args': args})
+    return {'traceEvents': trace, 'displayTimeUnit': 'ms'}
+
+
+def write_json(path, data):
+    """
+    Save a trace or summary as JSON.
+    :param path: Output path; its folder is created if needed
+    :param data: Data to save
+    """
+    import json
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as output_file:
+        json.dump(data, output_file, indent=1)
@@ -0,0 +1,251 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+
+from .blur import radius_sigma, sigma_blur
+from .npr import PENCIL_SKETCH_SIGMA_S
+from .registry import FILTERS, apply_filter
+
+# Levels stop before either side gets shorter than this many pixels
+MIN_LEVEL_SIZE = 32
+
+# Preview latency the level choice aims for, in milliseconds
+DEFAULT_BUDGET_MS = 50
+
+
+def build_pyramid(img, min_size=MIN_LEVEL_SIZE):
+    """
+    Build a Gaussian image pyramid, halving the resolution at every level.
+    :param img: Input image
+    :param min_size: Smallest side length a level may have
+    :return: List of images, the input itself first
+    """
+    levels = [img]
+    while min(levels[-1].shape[:2]) // 2 >= min_size:
+        levels.append(cv2.pyrDown(levels[-1]))
+    return levels
+
+
+def _pre_blur(img, scale, radius):
+    # The pre-blur with its sigma scaled to the level; below half a pixel it would change nothing
+    sigma = radius_sigma(radius) * scale if radius >= 1 else 0
+    return sigma_blur(img, sigma) if sigma >= 0.5 else img
+
+
+def preview_edge_detection(img, scale, apply_blur=False, threshold1=100, threshold2=200, blur_radius=2):
+    """
+    edge_detection() at a reduced resolution.
+    :param img: Pyramid level
+    :param scale: Resolution of the level relative to the full image
+    :param apply_blur: Apply the pre-blur, scaled to the level (default is False)
+    :param threshold1: Lower hysteresis threshold of the gradient (default is 100)
+    :param threshold2: Upper hysteresis threshold of the gradient (default is 200)
+    :param blur_radius: Radius of the pre-blur at full resolution (default is 2)
+    :return: Image with detected edges
+    """
+    if apply_blur:
+        img = _pre_blur(img, scale, blur_radius)
+    return cv2.Canny(img, threshold1, threshold2)
+
+
+def preview_pencil_sketch_bw(img, scale, blur_radius=2):
+    """
+    pencil_sketch_bw() at a reduced resolution, with the blur and sketch sigma scaled to the level.
+    :param img: Pyramid level
+    :param scale: Resolution of the level relative to the full image
+    :param blur_radius: Radius of the pre-blur at full resolution (default is 2)
+    :return: Black-and-white pencil sketch image
+    """
+    return cv2.pencilSketch(_pre_blur(img, scale, blur_radius), sigma_s=PENCIL_SKETCH_SIGMA_S * scale)[0]
+
+
+def preview_pencil_sketch_bw_color(img, scale, blur_radius=2):
+    """
+    pencil_sketch_bw_color() at a reduced resolution, with the blur and sketch sigma scaled to the level.
+    :param img: Pyramid level
+    :param scale: Resolution of the level relative to the full image
+    :param blur_radius: Radius of the pre-blur at full resolution (default is 2)
+    :return: Tuple of black-and-white sketch and color sketch images
+    """
+    return cv2.pencilSketch(_pre_blur(img, scale, blur_radius), sigma_s=PENCIL_SKETCH_SIGMA_S * scale)
+
+
+def preview_stylization_filter(img, scale, sigma_s=40, sigma_r=0.1, blur_radius=2, quality=1.0):
+    """
+    stylization_filter() at a reduced resolution, with the blur and sigma_s scaled to the level.
+    sigma_r works on colors, not distances, so it stays as it is.
+    :param img: Pyramid level
+    :param scale: Resolution of the level relative to the full image
+    :param sigma_s: Controls the size of the texture at full resolution (default is 40)
+    :param sigma_r: Controls how much of the color is preserved (default is 0.1)
+    :param blur_radius: Radius of the pre-blur at full resolution (default is 2)
+    :param quality: Ignored; the preview already runs at a reduced resolution
+    :return: Stylized image
+    """
+    return cv2.stylization(_pre_blur(img, scale, blur_radius), sigma_s=sigma_s * scale, sigma_r=sigma_r)
+
+
+# Reduced-resolution versions of the filters whose result depends on distances in pixels. The
+# others either work pixel by pixel (bw, sepia, bright), size their effect to the image already
+# (vignette), or use 3x3 kernels with nothing to scale (outline, emboss), so they run as they are.
+PREVIEW_FILTERS = {
+    'edge_detection': preview_edge_detection,
+    'edge_detection_blur': preview_edge_detection,
+    'pencil_sketch_bw': preview_pencil_sketch_bw,
+    'pencil_sketch_bw_color': preview_pencil_sketch_bw_color,
+    'stylization_filter': preview_stylization_filter,
+}
+
+
+def fit_size(width, height, display_size):
+    """
+    Compute the size an image is shown at in a display area, keeping its aspect ratio and never
+    enlarging it.
+    :param width: Image width
+    :param height: Image height
+    :param display_size: (width, height) of the display area
+    :return: (width, height) tuple
+    """
+    scale = min(display_size[0] / width, display_size[1] / height, 1.0)
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+class PreviewPyramid:
+    """
+    Interactive previews of the filters on one source image.
+
+    The pyramid is built once. Each preview runs the filter on the smallest level that still
+    covers the display size, with resolution-dependent parameters scaled to that level (see
+    PREVIEW_FILTERS). To keep previews within the latency budget, the throughput of every
+    filter is measured as it runs, and slow filters drop to smaller levels and are scaled
+    up for display. commit() renders the full image with the normal filters.
+    """
+
+    def __init__(self, img, min_size=MIN_LEVEL_SIZE):
+        """
+        :param img: Source image
+        :param min_size: Smallest side length of the pyramid levels
+        """
+        self.levels = build_pyramid(img, min_size)
+        self.last_level = None  # Level the latest preview was rendered at
+        self._throughput = {}  # Filter name -> pixels per second seen so far
+
+    def scale(self, index):
+        """
+        Return the resolution of a level relative to the full image.
+        :param index: Level index
+        :return: Scale factor
+        """
+        return self.levels[index].shape[1] / self.levels[0].shape[1]
+
+    def level_for(self, display_size, filter_name=None, budget_ms=DEFAULT_BUDGET_MS):
+        """
+        Choose the level a preview renders at: the smallest level covering the display size, or a
+        smaller one if the filter is expected to take longer than the budget there.
+        :param display_size: (width, height) of the display area
+        :param filter_name: Filter to be rendered (default is none, only the display size counts)
+        :param budget_ms: Latency budget in milliseconds (None disables it)
+        :return: Level index
+        """
+        height, width = self.levels[0].shape[:2]
+        target_width = fit_size(width, height, display_size)[0]
+        index = 0
+        while index + 1 < len(self.levels) and self.levels[index + 1].shape[1] >= target_width:
+            index += 1
+
+        throughput = self._throughput.get(filter_name)
+        if budget_ms is not None and throughput:
+            while index + 1 < len(self.levels) and self._pixels(index) / throughput * 1000 > budget_ms:
+                index += 1
+        return index
+
+    def _pixels(self, index):
+        return self.levels[index].shape[0] * self.levels[index].shape[1]
+
+    def render_level(self, filter_name, index, **params):
+        """
+        Apply a filter to one level, with its parameters scaled to the level's resolution.
+        :param filter_name: Filter name (a key of FILTERS)
+        :param index: Level index
+        :param params: Parameters overriding the filter's defaults, as they would be at full resolution
+        :return: Filtered level, or a tuple of images for filters with several outputs
+        """
+        if filter_name not in FILTERS:
+            raise ValueError(f"Unknown filter '{filter_name}'. Available filters: {', '.join(FILTERS)}")
+        level = self.levels[index]
+        start = time.perf_counter()
+        if filter_name in PREVIEW_FILTERS:
+            result = PREVIEW_FILTERS[filter_name](level, self.scale(index), **{**FILTERS[filter_name]['params'],
+                                                                                **params})
+        else:
+            result = apply_filter(filter_name, level, **params)
+        seconds = max(time.perf_counter() - start, 1e-6)
+
+        # Running average of the throughput, which the level choice of the next preview relies on
+        throughput = self._pixels(index) / seconds
+        previous = self._throughput.get(filter_name)
+        self._throughput[filter_name] = throughput if previous is None else (previous + throughput) / 2
+        return result
+
+    def preview(self, filter_name, display_size, budget_ms=DEFAULT_BUDGET_MS, **params):
+        """
+        Render a preview sized for a display area.
+        :param filter_name: Filter name (a key of FILTERS)
+        :param display_size: (width, height) of the display area
+        :param budget_ms: Latency budget in milliseconds (None always renders the level covering the display)
+        :param params: Parameters overriding the filter's defaults, as they would be at full resolution
+        :return: Preview image fitted to the display, or a tuple of them for filters with several outputs
+        """
+        if budget_ms is not None and filter_name not in self._throughput:
+            # Measure the filter once on the smallest level so the first preview can already pick a level
+            self.render_level(filter_name, len(self.levels) - 1, **params)
+        index = self.last_level = self.level_for(display_size, filter_name, budget_ms)
+        result = self.render_level(filter_name, index, **params)
+
+        # The level is less than twice the display size, so bilinear scaling is enough and much faster than INTER_AREA
+        size = fit_size(self.levels[0].shape[1], self.levels[0].shape[0], display_size)
+        if isinstance(result, tuple):
+            return tuple(cv2.resize(image, size, interpolation=cv2.INTER_LINEAR) for image in result)
+        return cv2.resize(result, size, interpolation=cv2.INTER_LINEAR)
+
+    def commit(self, filter_name, **params):
+        """
+        Render the full-resolution result with the normal filter.
+        :param filter_name: Filter name (a key of FILTERS)
+        :param params: Parameters overriding the filter's defaults
+        :return: Filtered image, or a tuple of images for filters with several outputs
+        """
+        return apply_filter(filter_name, self.levels[0], **params)
+
+
+_pyramids = OrderedDict()
+_pyramids_lock = threading.Lock()
+
+
+def open_preview(path, max_sources=4):
+    """
+    Return the PreviewPyramid of an image file, reusing the one built earlier unless the file changed.
+    :param path: Image file path
+    :param max_sources: Pyramids kept at most, the least recently used being dropped first
+    :return: PreviewPyramid
+    """
+    stat = os.stat(path)
+    key = (os.path.abspath(path), stat.st_mtime, stat.st_size)
+    with _pyramids_lock:
+        pyramid = _pyramids.get(key)
+        if pyramid is not None:
+            _pyramids.move_to_end(key)
+            return pyramid
+
+    img = cv2.imread(path)
+    if img is None:
+        raise IOError(f"Image could not be loaded: {path}")
+    pyramid = PreviewPyramid(img)
+    with _pyramids_lock:
+        _pyramids[key] = pyramid
+        while len(_pyramids) > max_sources:
+            _pyramids.popitem(last=False)
+    return pyramid
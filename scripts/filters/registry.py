@@ -0,0 +1,115 @@
+from .artistic import pencil_sketch_bw, pencil_sketch_bw_color, stylization_filter
+from .backends import BACKEND_FILTERS, resolve_backend
+from .color import bright, bw_filter, sepia_fast
+from .edges import edge_detection, embossed_edges, outline
+from .masks import vignette
+from .profiling import span
+from .tiling import TILED_FILTERS
+
+# Parameter types and accepted ranges, as (type, minimum, maximum), shared by several filters
+BOOL = (bool, None, None)
+BLUR_RADIUS = (int, 0, 256)
+# The largest L1 gradient Canny's 3x3 Sobel finds in a uint8 image is 2 * 4 * 255
+CANNY_THRESHOLD = (float, 0, 2040)
+
+# Every filter by name, together with the folder under 'filtered/' and the file name
+# suffix the showcase scripts save its output with. Filters that return a tuple of
+# images list one suffix per returned image. Sepia runs through the single-pass sepia_fast().
+# 'params' holds the default parameters and 'ranges' their types and accepted ranges, which
+# parse_param() checks values from users against.
+FILTERS = {
+    'bw_filter': {'func': bw_filter, 'folder': 'black_and_white', 'suffix': 'bw', 'params': {}, 'ranges': {}},
+    'sepia': {'func': sepia_fast, 'folder': 'sepia', 'suffix': 'sepia', 'params': {}, 'ranges': {}},
+    'vignette': {'func': vignette, 'folder': 'vignette', 'suffix': 'vignette', 'params': {'level': 2},
+                 'ranges': {'level': (float, 0.1, 100)}},
+    'edge_detection': {'func': edge_detection, 'folder': 'edges', 'suffix': 'edges',
+                       'params': {'apply_blur': False, 'threshold1': 100, 'threshold2': 200},
+                       'ranges': {'apply_blur': BOOL, 'threshold1': CANNY_THRESHOLD, 'threshold2': CANNY_THRESHOLD}},
+    'edge_detection_blur': {'func': edge_detection, 'folder': 'edges', 'suffix': 'edges_blur',
+                            'params': {'apply_blur': True, 'threshold1': 100, 'threshold2': 200, 'blur_radius': 2},
+                            'ranges': {'apply_blur': BOOL, 'threshold1': CANNY_THRESHOLD,
+                                       'threshold2': CANNY_THRESHOLD, 'blur_radius': BLUR_RADIUS}},
+    'bright': {'func': bright, 'folder': 'brightness', 'suffix': 'bright', 'params': {'level': 25},
+               'ranges': {'level': (float, -255, 255)}},
+    'outline': {'func': outline, 'folder': 'outline', 'suffix': 'outline', 'params': {'k': 10},
+                'ranges': {'k': (float, 9, 100)}},
+    'embossed_edges': {'func': embossed_edges, 'folder': 'emboss', 'suffix': 'emboss', 'params': {}, 'ranges': {}},
+    'pencil_sketch_bw': {'func': pencil_sketch_bw, 'folder': 'sketch', 'suffix': 'sketch_bw',
+                         'params': {'blur_radius': 2}, 'ranges': {'blur_radius': BLUR_RADIUS}},
+    'pencil_sketch_bw_color': {'func': pencil_sketch_bw_color, 'folder': 'sketch',
+                               'suffix': ('sketch_bw', 'sketch_color'), 'params': {'blur_radius': 2},
+                               'ranges': {'blur_radius': BLUR_RADIUS}},
+    'stylization_filter': {'func': stylization_filter, 'folder': 'stylization', 'suffix': 'stylized',
+                           'params': {'sigma_s': 40, 'sigma_r': 0.1, 'blur_radius': 2, 'quality': 1.0},
+                           'ranges': {'sigma_s': (float, 0, 200), 'sigma_r': (float, 0, 1),
+                                      'blur_radius': BLUR_RADIUS, 'quality': (float, 0.05, 1)}},
+}
+
+
+def apply_filter(name, img, tile_options=None, backend=None, **params):
+    """
+    Apply a filter from FILTERS by name, using its default parameters unless overridden.
+    :param name: Filter name (a key of FILTERS)
+    :param img: Input image (BGR format)
+    :param tile_options: map_tiles() options (memory_budget, threads) to run the filter strip by strip
+                         with bounded memory, if it has a tiled version in TILED_FILTERS
+    :param backend: Execution backend, a name in filters.backends.BACKENDS (default is 'opencv').
+                    Only the OpenCV backend runs strip by strip; the others ignore tile_options.
+    :param params: Parameters overriding the filter's defaults
+    :return: Filtered image, or a tuple of images for filters with several outputs
+    """
+    if name not in FILTERS:
+        raise ValueError(f"Unknown filter '{name}'. Available filters: {', '.join(FILTERS)}")
+
+    spec = FILTERS[name]
+    params = {**spec['params'], **params}
+    func = BACKEND_FILTERS.get(resolve_backend(backend), {}).get(name)
+    with span(name, 'filter', img.shape):
+        if func is not None:
+            return func(img, **params)
+        if tile_options is not None and name in TILED_FILTERS:
+            return TILED_FILTERS[name](img, **params, **tile_options)
+        return spec['func'](img, **params)
+
+
+def parse_param(name, param, value):
+    """
+    Convert a parameter value given by a user, e.g. as text in a query string, to the type
+    declared in the filter's 'ranges' and check it is in range. Integer parameters take whole
+    numbers only ('3' or '3.0' but not '2.5'); booleans take true, false, 1 or 0.
+    :param name: Filter name (a key of FILTERS)
+    :param param: Parameter name
+    :param value: Value as text, or as a number or bool
+    :return: Converted value
+    :raises ValueError: If the filter doesn't take the parameter, or the value isn't of its type or out of range
+    """
+    ranges = FILTERS[name]['ranges']
+    if param not in ranges:
+        raise ValueError(f"unknown parameter '{param}' for {name}; accepted: {', '.join(ranges) or 'none'}")
+    kind, minimum, maximum = ranges[param]
+    if kind is bool:
+        if str(value).lower() not in ('1', '0', 'true', 'false'):
+            raise ValueError(f"parameter '{param}' must be true or false")
+        return str(value).lower() in ('1', 'true')
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"parameter '{param}' must be a number") from None
+    if kind is int:
+        if not number.is_integer():
+            raise ValueError(f"parameter '{param}' must be a whole number")
+        number = int(number)
+    # NaN fails both comparisons and is rejected too
+    if not minimum <= number <= maximum:
+        raise ValueError(f"parameter '{param}' must be between {minimum} and {maximum}")
+    return number
+
+
+def output_suffixes(name):
+    """
+    Return the file name suffixes a filter's outputs are saved with, always as a tuple.
+    :param name: Filter name (a key of FILTERS)
+    :return: Tuple of suffixes, one per output image
+    """
+    suffix = FILTERS[name]['suffix']
+    return suffix if isinstance(suffix, tuple) else (suffix,)
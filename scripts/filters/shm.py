@@ -0,0 +1,275 @@
+import os
+import queue
+from multiprocessing import Pool, shared_memory
+
+import cv2
+import numpy as np
+
+from .backends import worker_threads
+from .loader import decode_image
+from .registry import apply_filter
+
+# Bytes reserved per input slot, which holds an encoded file: a 4608x3072 JPEG takes 4 MB
+DEFAULT_SLOT_BYTES = 16 * 2**20
+
+# Bytes reserved per decoded frame in the output slots: a 4608x3072 BGR photo takes 42 MB
+DEFAULT_FRAME_BYTES = 64 * 2**20
+
+# Where POSIX shared memory lives on Linux. Blocks are created sparse, and writing past the free
+# space there kills the writing process with SIGBUS, so the rings are checked against it up front.
+_SHM_DIR = '/dev/shm'
+
+# Offsets of the outputs within a slot are rounded up to this, keeping rows cache-line aligned
+_ALIGNMENT = 64
+
+
+class FrameRing:
+    """
+    Fixed-size frame slots in one block of shared memory. The process that creates the ring hands
+    out free slots; other processes attach to it by name and read and write the same pixels as
+    NumPy views, so a frame never has to be pickled or copied between processes. Only small
+    descriptors (slot, shape, dtype) travel through queues.
+    """
+
+    def __init__(self, slots, slot_bytes=DEFAULT_SLOT_BYTES, name=None):
+        """
+        :param slots: Number of slots
+        :param slot_bytes: Size of one slot in bytes
+        :param name: Name of an existing ring to attach to (default creates a new one)
+        """
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self.owner = name is None
+        if self.owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+            self._free = queue.Queue()
+            for slot in range(slots):
+                self._free.put(slot)
+        else:
+            self._memory = _attach(name)
+
+    @property
+    def name(self):
+        """
+        Name other processes attach to the ring with.
+        """
+        return self._memory.name
+
+    def acquire(self, timeout=None):
+        """
+        Take a free slot, waiting for one to be released if they are all in use. Only the process
+        that created the ring hands out slots.
+        :param timeout: Seconds to wait at most (default is forever)
+        :return: Slot index
+        """
+        return self._free.get(timeout=timeout)
+
+    def release(self, slot):
+        """
+        Give a slot back once no view of it is used anymore.
+        :param slot: Slot index
+        """
+        self._free.put(slot)
+
+    def view(self, slot, shape, dtype=np.uint8, offset=0):
+        """
+        Map an array onto a slot. Writes to it are seen by every process attached to the ring.
+        :param slot: Slot index
+        :param shape: Array shape
+        :param dtype: Array type
+        :param offset: Byte offset within the slot
+        :return: NumPy array backed by the shared memory
+        """
+        dtype = np.dtype(dtype)
+        size = int(np.prod(shape)) * dtype.itemsize
+        if offset + size > self.slot_bytes:
+            raise ValueError(f"a {'x'.join(map(str, shape))} {dtype} frame at offset {offset} doesn't fit in a "
+                             f"{self.slot_bytes}-byte slot")
+        return np.ndarray(shape, dtype, buffer=self._memory.buf, offset=slot * self.slot_bytes + offset)
+
+    def close(self):
+        """
+        Detach from the ring, and free the shared memory if this process created it. Every view
+        must have been dropped before.
+        """
+        self._memory.close()
+        if self.owner:
+            self._memory.unlink()
+
+
+def shared_memory_free():
+    """
+    Free space for shared memory blocks.
+    :return: Bytes, or None where it can't be told (no /dev/shm)
+    """
+    try:
+        stat = os.statvfs(_SHM_DIR)
+    except (AttributeError, OSError):  # statvfs is missing on Windows
+        return None
+    return stat.f_bavail * stat.f_frsize
+
+
+def _attach(name):
+    # Pool workers share the resource tracker of the process that created the block, so it is
+    # registered once and freed once, by the creator's close()
+    return shared_memory.SharedMemory(name=name)
+
+
+# The rings of a worker process, attached once by _init_worker()
+_rings = None
+
+
+def _init_worker(inputs_name, outputs_name, slots, slot_bytes, output_bytes, threads):
+    global _rings
+    cv2.setNumThreads(threads)
+    _rings = FrameRing(slots, slot_bytes, inputs_name), FrameRing(slots, output_bytes, outputs_name)
+
+
+def _run_filters(slot, size, frame_path, filter_names, tile_above, max_size, grayscale):
+    # Decode the file in a slot's input area, or map a stored frame, and lay the filters' results
+    # out one after the other in the slot's output area. Returns per filter a list of
+    # (offset, shape, dtype) or an error.
+    inputs, outputs = _rings
+    if frame_path is not None:
+        frame = np.load(frame_path, mmap_mode='r')
+    else:
+        frame, _ = decode_image(inputs.view(slot, (size,)), filter_names, max_size, grayscale)
+        if frame is None:
+            raise IOError('image could not be loaded')
+    # The workers already run side by side, so large frames are tiled on one thread each
+    tile_options = {'threads': 1} if tile_above is not None and frame.shape[0] * frame.shape[1] > tile_above else None
+    results = []
+    offset = 0
+    for filter_name in filter_names:
+        try:
+            images = apply_filter(filter_name, frame, tile_options=tile_options)
+            descriptors = []
+            for image in images if isinstance(images, tuple) else (images,):
+                np.copyto(outputs.view(slot, image.shape, image.dtype, offset), image)
+                descriptors.append((offset, image.shape, image.dtype.str))
+                offset += -(-image.nbytes // _ALIGNMENT) * _ALIGNMENT
+            results.append((filter_name, descriptors, None))
+        except Exception as error:
+            results.append((filter_name, None, f'{type(error).__name__}: {error}'))
+    return results
+
+
+class SharedFramePool:
+    """
+    Worker processes decoding and filtering images in shared memory.
+
+    The encoded file is read straight into a slot of a shared ring, a worker decodes it there
+    into its own memory and writes the filters' results into the same slot of a second ring, and
+    the caller encodes them from there. The decoded frame is never copied: not into shared
+    memory, nor pickled to the worker. Frames already decoded into .npy files (see
+    filters.frames.FrameStore) are mapped by the worker instead. Per image only the slot number,
+    sizes and error messages cross the process boundary, instead of pickling the frame to the
+    worker and every result back: for a 12 MP photo that is 36 MB each way, about 50 ms of
+    pickling alone.
+
+        with SharedFramePool(workers=4) as pool:
+            slot = pool.acquire()
+            outputs = pool.run(slot, ['sepia', 'vignette'], size=pool.read(slot, path))
+            ...  # encode outputs['sepia'][0], then
+            pool.release(slot)
+
+    run() blocks until a worker is done and may be called from several threads at once.
+    """
+
+    def __init__(self, workers=None, slots=None, slot_bytes=DEFAULT_SLOT_BYTES, frame_bytes=DEFAULT_FRAME_BYTES,
+                 outputs_per_frame=2):
+        """
+        :param workers: Number of worker processes (default is the number of CPU cores)
+        :param slots: Frames in flight at most (default is twice the number of workers)
+        :param slot_bytes: Largest encoded file in bytes
+        :param frame_bytes: Largest decoded frame in bytes, as BGR
+        :param outputs_per_frame: Results of one frame the output area holds, in frames of the input's size
+        :raises ValueError: If the rings need more shared memory than is free
+        """
+        self.workers = workers or os.cpu_count() or 1
+        slots = slots or 2 * self.workers
+        # Offsets of the outputs are aligned, which can take a little more than the outputs themselves
+        output_bytes = frame_bytes * outputs_per_frame + _ALIGNMENT * outputs_per_frame
+        needed, free = slots * (slot_bytes + output_bytes), shared_memory_free()
+        if free is not None and needed > free:
+            raise ValueError(f"{slots} frames in flight need {needed / 2**20:.0f} MB of shared memory "
+                             f"({slot_bytes / 2**20:.1f} MB per file and {output_bytes / 2**20:.1f} MB of results), "
+                             f"but only {free / 2**20:.0f} MB is free in {_SHM_DIR}; use fewer processes, "
+                             f"a shorter queue or a smaller --max-size, or enlarge {_SHM_DIR}")
+        self.inputs = FrameRing(slots, slot_bytes)
+        self.outputs = FrameRing(slots, output_bytes)
+        self._pool = Pool(self.workers, initializer=_init_worker,
+                          initargs=(self.inputs.name, self.outputs.name, slots, slot_bytes, output_bytes,
+                                    worker_threads(self.workers)))
+
+    def acquire(self, timeout=None):
+        """
+        Take a free slot for a frame, waiting for one if all are in flight.
+        :param timeout: Seconds to wait at most (default is forever)
+        :return: Slot index
+        """
+        return self.inputs.acquire(timeout)
+
+    def release(self, slot):
+        """
+        Give a slot back once its frame and results are no longer used.
+        :param slot: Slot index
+        """
+        self.inputs.release(slot)
+
+    def fits(self, size):
+        """
+        Check whether an encoded file fits in a slot.
+        :param size: File size in bytes
+        :return: True if it fits
+        """
+        return size <= self.inputs.slot_bytes
+
+    def read(self, slot, path):
+        """
+        Read an encoded file straight into a slot.
+        :param slot: Slot index
+        :param path: Image file path
+        :return: Number of bytes read, or None if the file doesn't fit in a slot
+        """
+        with open(path, 'rb') as image_file:
+            size = os.fstat(image_file.fileno()).st_size
+            if not self.fits(size):
+                return None
+            return image_file.readinto(self.inputs.view(slot, (size,)))
+
+    def run(self, slot, filter_names, size=None, frame_path=None, max_size=None, grayscale=None, tile_above=None):
+        """
+        Decode the file in a slot, or map a stored frame, and apply filters to it in a worker process.
+        :param slot: Slot index
+        :param filter_names: Filters to apply (keys of FILTERS)
+        :param size: Bytes of the encoded file read into the slot (see read())
+        :param frame_path: Instead of a file in the slot, an .npy file of a decoded uint8 frame
+        :param max_size: Longest side to decode at, as for filters.loader.decode_image()
+        :param grayscale: Force or forbid a grayscale decode, as for filters.loader.decode_image()
+        :param tile_above: Pixels above which the filters run strip by strip, see apply_filter() (default is never)
+        :return: Dictionary mapping filter name to a tuple of result views in shared memory, valid
+                 until the slot is released, or to the error message if the filter failed
+        :raises IOError: If the file can't be decoded
+        """
+        results = {}
+        for filter_name, descriptors, error in self._pool.apply(
+                _run_filters, (slot, size, frame_path, filter_names, tile_above, max_size, grayscale)):
+            results[filter_name] = error if error else tuple(
+                self.outputs.view(slot, image_shape, dtype, offset) for offset, image_shape, dtype in descriptors)
+        return results
+
+    def close(self):
+        """
+        Stop the workers and free the shared memory. Every view must have been dropped before.
+        """
+        self._pool.close()
+        self._pool.join()
+        self.inputs.close()
+        self.outputs.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
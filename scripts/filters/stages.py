@@ -0,0 +1,178 @@
+import os
+import queue
+import threading
+import time
+
+# Marks the end of a queue's items
+_DONE = object()
+
+
+class StageStats:
+    """
+    Busy time, items and queue depth of one pipeline stage.
+    """
+
+    def __init__(self, name, threads):
+        """
+        :param name: Stage name
+        :param threads: Number of threads running the stage
+        """
+        self.name = name
+        self.threads = threads
+        self.items = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._depth_sum = 0
+        self._depth_max = 0
+        self._lock = threading.Lock()
+
+    def record(self, seconds, depth, failed=False):
+        """
+        Count one item.
+        :param seconds: Time spent on the item
+        :param depth: Items waiting in the stage's input queue when the item was taken
+        :param failed: Whether the item failed
+        """
+        with self._lock:
+            self.items += 1
+            self.errors += failed
+            self.busy += seconds
+            self._depth_sum += depth
+            self._depth_max = max(self._depth_max, depth)
+
+    def summary(self, elapsed):
+        """
+        Summarize the stage.
+        :param elapsed: Wall time of the whole run
+        :return: Dictionary with threads, items, errors, busy seconds, utilization (busy time over
+                 thread time) and the mean and largest depth of the stage's input queue
+        """
+        return {'threads': self.threads, 'items': self.items, 'errors': self.errors, 'busy': self.busy,
+                'utilization': self.busy / (self.threads * elapsed) if elapsed else 0.0,
+                'queue_mean': self._depth_sum / self.items if self.items else 0.0, 'queue_max': self._depth_max}
+
+
+def run_stages(items, read, compute, write, readers=2, computers=None, writers=2, queue_size=8):
+    """
+    Run items through three overlapping stages, each with its own thread pool, connected by
+    bounded queues: read (e.g. load and decode), compute (filter) and write (encode and save).
+    The queues hold at most queue_size items, so a fast reader can't run ahead and fill memory.
+    An item failing in any stage is reported and skipped by the later stages.
+
+    OpenCV releases the GIL while decoding, filtering and encoding, so the pools really run in
+    parallel. Per-stage utilization shows where the time goes: a busy compute stage with starved
+    queues means the run is CPU-bound, busy readers or writers with full queues that it is I/O-bound.
+    :param items: Items to process (e.g. file paths)
+    :param read: Function item -> value
+    :param compute: Function (item, value) -> result
+    :param write: Function (item, result) -> anything, returned in the outcomes
+    :param readers: Reader threads
+    :param computers: Compute threads (default is the number of CPU cores)
+    :param writers: Writer threads
+    :param queue_size: Capacity of the queues between the stages
+    :return: Tuple of (list of (item, write() return value or None, error message or None) in completion
+             order, dictionary with the 'seconds' of the run and a summary per stage)
+    """
+    computers = computers or os.cpu_count() or 1
+    stats = {name: StageStats(name, threads) for name, threads in
+             (('read', readers), ('compute', computers), ('write', writers))}
+    pending = queue.Queue()
+    for item in items:
+        pending.put(item)
+    decoded = queue.Queue(maxsize=queue_size)
+    computed = queue.Queue(maxsize=queue_size)
+    outcomes = []
+    outcomes_lock = threading.Lock()
+
+    def fail(item, stage, error):
+        with outcomes_lock:
+            outcomes.append((item, None, f'{stage}: {type(error).__name__}: {error}'))
+
+    def reader():
+        while True:
+            try:
+                depth = pending.qsize()
+                item = pending.get_nowait()
+            except queue.Empty:
+                break
+            start = time.perf_counter()
+            try:
+                value = read(item)
+            except Exception as error:
+                stats['read'].record(time.perf_counter() - start, depth, failed=True)
+                fail(item, 'read', error)
+                continue
+            stats['read'].record(time.perf_counter() - start, depth)
+            decoded.put((item, value))
+
+    def computer():
+        while True:
+            depth = decoded.qsize()
+            entry = decoded.get()
+            if entry is _DONE:
+                break
+            item, value = entry
+            start = time.perf_counter()
+            try:
+                result = compute(item, value)
+            except Exception as error:
+                stats['compute'].record(time.perf_counter() - start, depth, failed=True)
+                fail(item, 'compute', error)
+                continue
+            stats['compute'].record(time.perf_counter() - start, depth)
+            computed.put((item, result))
+
+    def writer():
+        while True:
+            depth = computed.qsize()
+            entry = computed.get()
+            if entry is _DONE:
+                break
+            item, result = entry
+            start = time.perf_counter()
+            try:
+                written = write(item, result)
+            except Exception as error:
+                stats['write'].record(time.perf_counter() - start, depth, failed=True)
+                fail(item, 'write', error)
+                continue
+            stats['write'].record(time.perf_counter() - start, depth)
+            with outcomes_lock:
+                outcomes.append((item, written, None))
+
+    def start_pool(target, count):
+        threads = [threading.Thread(target=target, daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+
+    start = time.perf_counter()
+    reader_threads = start_pool(reader, readers)
+    computer_threads = start_pool(computer, computers)
+    writer_threads = start_pool(writer, writers)
+
+    # Close each stage once the one before it has finished
+    for thread in reader_threads:
+        thread.join()
+    for _ in computer_threads:
+        decoded.put(_DONE)
+    for thread in computer_threads:
+        thread.join()
+    for _ in writer_threads:
+        computed.put(_DONE)
+    for thread in writer_threads:
+        thread.join()
+
+    elapsed = time.perf_counter() - start
+    report = {'seconds': elapsed}
+    report.update({name: stage.summary(elapsed) for name, stage in stats.items()})
+    return outcomes, report
+
+
+def bottleneck(report):
+    """
+    Name the stage limiting a run: the one with the highest utilization.
+    :param report: Report returned by run_stages()
+    :return: Stage name ('read', 'compute' or 'write')
+    """
+    return max(('read', 'compute', 'write'), key=lambda name: report[name]['utilization'])
@@ -0,0 +1,202 @@
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+from .pipeline import Pipeline
+
+# Frame rate used for outputs when the source doesn't report one (image sequences)
+DEFAULT_FPS = 25.0
+
+# Image file extensions read from a frame directory
+FRAME_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+
+def open_frames(source):
+    """
+    Open a video file, a printf-style image sequence (e.g. 'frames/%04d.jpg') or a directory of frames.
+    :param source: Video path, sequence pattern or directory
+    :return: Tuple of (frame generator, frames per second)
+    """
+    if os.path.isdir(source):
+        names = sorted(name for name in os.listdir(source) if name.lower().endswith(FRAME_EXTENSIONS))
+
+        def directory_frames():
+            for name in names:
+                frame = cv2.imread(os.path.join(source, name))
+                if frame is not None:
+                    yield frame
+
+        return directory_frames(), DEFAULT_FPS
+
+    capture = cv2.VideoCapture(source)
+    if not capture.isOpened():
+        raise IOError(f"Could not open video source: {source}")
+    fps = capture.get(cv2.CAP_PROP_FPS) or DEFAULT_FPS
+
+    def video_frames():
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            capture.release()
+
+    return video_frames(), fps
+
+
+class FrameWriter:
+    """
+    Write frames to a video file, or to an image sequence when the output is a directory or a
+    printf-style pattern. Video writers are opened on the first frame, once its size is known.
+    """
+
+    def __init__(self, output, fps=DEFAULT_FPS, fourcc='mp4v'):
+        """
+        :param output: Video path, sequence pattern (e.g. 'out/%04d.jpg') or directory
+        :param fps: Frames per second of a video output
+        :param fourcc: Four-character codec code of a video output (default is 'mp4v')
+        """
+        self.output = output
+        self.fps = fps
+        self.fourcc = fourcc
+        self.frames = 0
+        self._writer = None
+
+        if os.path.isdir(output) or output.endswith(os.sep):
+            os.makedirs(output, exist_ok=True)
+            self._pattern = os.path.join(output, '%06d.jpg')
+        elif '%' in output:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            self._pattern = output
+        else:
+            os.makedirs(os.path.dirname(output) or '.', exist_ok=True)
+            self._pattern = None
+
+    def write(self, frame):
+        """
+        Write one frame.
+        :param frame: BGR or grayscale frame
+        """
+        if self._pattern is not None:
+            cv2.imwrite(self._pattern % self.frames, frame)
+        else:
+            if self._writer is None:
+                height, width = frame.shape[:2]
+                self._writer = cv2.VideoWriter(self.output, cv2.VideoWriter_fourcc(*self.fourcc), self.fps,
+                                               (width, height), frame.ndim == 3)
+                if not self._writer.isOpened():
+                    raise IOError(f"Could not open video writer: {self.output}")
+            self._writer.write(frame)
+        self.frames += 1
+
+    def close(self):
+        """
+        Finish the video file.
+        """
+        if self._writer is not None:
+            self._writer.release()
+
+
+def process_stream(source, steps, output, workers=2, queue_size=8, drop_frames=False, fourcc='mp4v'):
+    """
+    Filter a video or frame sequence with decode, filtering and encode overlapping in separate threads.
+
+    The reader thread decodes frames into a bounded queue, 'workers' filter threads each run their
+    own Pipeline (so masks, matrices and buffers are set up once per stream, not per frame), and the
+    calling thread writes the results back in order. With drop_frames the reader skips frames when
+    the filters fall behind instead of waiting, like a live feed would.
+    :param source: Video path, sequence pattern or directory of frames
+    :param steps: Pipeline steps to apply to every frame (see filters.pipeline.STEPS)
+    :param output: Video path, sequence pattern or directory to write to
+    :param workers: Number of filter threads (default is 2)
+    :param queue_size: Frames each queue holds at most (default is 8)
+    :param drop_frames: Drop frames instead of blocking the reader when the filters fall behind
+    :param fourcc: Four-character codec code of a video output (default is 'mp4v')
+    :return: Dictionary with frames read, written and dropped, elapsed seconds and achieved fps
+    """
+    Pipeline(steps)  # Fail on unknown steps before starting any thread
+    frames, fps = open_frames(source)
+    writer = FrameWriter(output, fps, fourcc)
+    decoded = queue.Queue(maxsize=queue_size)
+    filtered = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    errors = []
+    counts = {'read': 0, 'dropped': 0}
+
+    def read():
+        try:
+            for frame in frames:
+                if stop.is_set():
+                    break
+                counts['read'] += 1
+                item = (counts['read'] - counts['dropped'] - 1, frame)
+                if drop_frames:
+                    try:
+                        decoded.put_nowait(item)
+                    except queue.Full:
+                        counts['dropped'] += 1
+                else:
+                    decoded.put(item)
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+        finally:
+            for _ in range(workers):
+                decoded.put(None)
+
+    def apply():
+        pipeline = Pipeline(steps)
+        while True:
+            item = decoded.get()
+            if item is None:
+                break
+            if stop.is_set():
+                continue  # Keep draining so the reader never blocks on a full queue
+            index, frame = item
+            try:
+                filtered.put((index, pipeline(frame)))
+            except Exception as error:
+                errors.append(error)
+                stop.set()
+        filtered.put(None)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=read, daemon=True)]
+    threads += [threading.Thread(target=apply, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    # Filter threads finish frames out of order; hold them back until their turn comes
+    pending = {}
+    next_index = 0
+    finished = 0
+    while finished < workers:
+        item = filtered.get()
+        if item is None:
+            finished += 1
+            continue
+        if stop.is_set():
+            continue
+        pending[item[0]] = item[1]
+        try:
+            while next_index in pending:
+                writer.write(pending.pop(next_index))
+                next_index += 1
+        except Exception as error:
+            errors.append(error)
+            stop.set()
+    writer.close()
+
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    elapsed = time.perf_counter() - start
+    return {'read': counts['read'], 'written': writer.frames, 'dropped': counts['dropped'],
+            'seconds': elapsed, 'fps': writer.frames / elapsed if elapsed else 0.0}
@@ -0,0 +1,182 @@
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .blur import gaussian_blur
+from .color import bright, bw_filter, sepia_fast
+from .edges import embossed_edges, outline
+from .masks import vignette
+from .npr import pencil_sketch, stylization
+from .registry import FILTERS
+
+
+def _gradients(img):
+    # Canny's own 3x3 Sobel derivatives; Canny(dx, dy) on them is bit-exact with Canny(img)
+    return (cv2.Sobel(img, cv2.CV_16S, 1, 0, ksize=3, borderType=cv2.BORDER_REPLICATE),
+            cv2.Sobel(img, cv2.CV_16S, 0, 1, ksize=3, borderType=cv2.BORDER_REPLICATE))
+
+
+# Operations a sweep is built from: name -> function(input, **params)
+OPS = {
+    'gaussian_blur': lambda img, radius=2: gaussian_blur(img, radius),
+    'gray': bw_filter,
+    'gradients': _gradients,
+    'canny': lambda gradients, threshold1=100, threshold2=200: cv2.Canny(*gradients, threshold1, threshold2),
+    'sepia': sepia_fast,
+    'bright': bright,
+    'vignette': vignette,
+    'outline': outline,
+    'emboss': embossed_edges,
+    'pencil_sketch': pencil_sketch,
+    'select': lambda results, index: results[index],
+    'stylization': stylization,
+}
+
+
+def filter_chain(filter_name, params):
+    """
+    Express one filter variant as a chain of OPS, so variants of the same or related filters can
+    share their common prefix (the pre-blur, the gradients, the pencil sketch of both outputs).
+    :param filter_name: Filter name (a key of FILTERS)
+    :param params: Parameters, merged with the filter's defaults
+    :return: List of (op name, parameter dictionary) applied in order to the decoded image
+    """
+    params = {**FILTERS[filter_name]['params'], **params}
+    blur = ('gaussian_blur', {'radius': params.pop('blur_radius', 2)})
+    if filter_name in ('edge_detection', 'edge_detection_blur'):
+        chain = [blur] if params.pop('apply_blur') else []
+        return chain + [('gradients', {}), ('canny', params)]
+    if filter_name in ('pencil_sketch_bw', 'pencil_sketch_bw_color'):
+        chain = [blur, ('pencil_sketch', {})]
+        return chain + ([('select', {'index': 0})] if filter_name == 'pencil_sketch_bw' else [])
+    if filter_name == 'stylization_filter':
+        return [blur, ('stylization', params)]
+    ops = {'bw_filter': 'gray', 'sepia': 'sepia', 'bright': 'bright', 'vignette': 'vignette', 'outline': 'outline',
+           'embossed_edges': 'emboss'}
+    if filter_name in ops:
+        return [(ops[filter_name], params)]
+    raise ValueError(f"Unknown filter '{filter_name}'. Available filters: {', '.join(FILTERS)}")
+
+
+def _depth(key):
+    # Number of steps from the decoded image to a node
+    depth = 0
+    while key is not None:
+        depth += 1
+        key = key[0]
+    return depth
+
+
+def expand_grid(grid):
+    """
+    Expand a parameter grid into every combination.
+    :param grid: Dictionary mapping parameter name to a value or a list of values
+    :return: List of parameter dictionaries
+    """
+    names = list(grid)
+    values = [grid[name] if isinstance(grid[name], (list, tuple, range)) else [grid[name]] for name in names]
+    return [dict(zip(names, combination)) for combination in itertools.product(*values)]
+
+
+class Sweep:
+    """
+    Evaluate many variants of the filters on one image as a DAG of shared steps.
+
+    Every variant is a chain of OPS starting at the decoded image. Chains are merged on their
+    common prefixes, so e.g. a grid of Canny thresholds with and without blur decodes the image
+    once, blurs it once and computes the gradients twice (blurred and not), and only the
+    hysteresis runs per variant. The DAG is evaluated level by level, the steps of a level
+    running in parallel threads, and intermediates are released as soon as no step needs them.
+
+        sweep = Sweep()
+        sweep.add('edge_detection', threshold1=[50, 100], threshold2=[150, 200])
+        sweep.add('edge_detection_blur', threshold1=[50, 100], threshold2=[150, 200])
+        results = sweep.run('photo.jpg')
+    """
+
+    def __init__(self):
+        self.variants = []  # (filter name, parameters, key of the variant's last node)
+        self._nodes = {}  # key -> (parent key, op name, parameters); the root key is None
+
+    def add(self, filter_name, **grid):
+        """
+        Add every combination of a parameter grid for a filter.
+        :param filter_name: Filter name (a key of FILTERS)
+        :param grid: Parameter name -> value or list of values; parameters left out keep their defaults
+        :return: The sweep, for chaining
+        """
+        for params in expand_grid(grid):
+            key = None
+            for op, op_params in filter_chain(filter_name, params):
+                # A node is identified by its whole chain, so equal prefixes map to the same node
+                key = (key, op, tuple(sorted(op_params.items())))
+                self._nodes.setdefault(key, (key[0], op, op_params))
+            self.variants.append((filter_name, params, key))
+        return self
+
+    def stats(self):
+        """
+        Count the steps the sweep saves by sharing prefixes.
+        :return: Dictionary with variants, steps run by the DAG and steps of running every variant on its own
+        """
+        separate = sum(_depth(key) for _, _, key in self.variants)
+        return {'variants': len(self.variants), 'steps': len(self._nodes), 'separate_steps': separate}
+
+    def run(self, source, threads=None):
+        """
+        Evaluate every variant.
+        :param source: Image path or already decoded image
+        :param threads: Number of threads (default is the number of CPU cores)
+        :return: List of (filter name, parameters, result) in the order the variants were added
+        """
+        if isinstance(source, np.ndarray):
+            img = source
+        else:
+            img = cv2.imread(source)
+            if img is None:
+                raise IOError(f"Image could not be loaded: {source}")
+
+        # Group the nodes by depth, and count how many steps still need each node's result
+        levels = {}
+        for key in self._nodes:
+            levels.setdefault(_depth(key), []).append(key)
+        users = {}
+        for parent, _, _ in self._nodes.values():
+            users[parent] = users.get(parent, 0) + 1
+        outputs = {key for _, _, key in self.variants}
+
+        values = {None: img}
+
+        def compute(key):
+            parent, op, params = self._nodes[key]
+            return OPS[op](values[parent], **params)
+
+        threads = threads or os.cpu_count() or 1
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for level in sorted(levels):
+                keys = levels[level]
+                # OpenCV releases the GIL, so the steps of a level really run in parallel
+                for key, value in zip(keys, executor.map(compute, keys)):
+                    values[key] = value
+                for key in keys:
+                    parent = self._nodes[key][0]
+                    users[parent] -= 1
+                    if users[parent] == 0 and parent not in outputs and parent is not None:
+                        del values[parent]
+
+        return [(filter_name, params, values[key]) for filter_name, params, key in self.variants]
+
+
+def sweep(source, filter_name, threads=None, **grid):
+    """
+    Run a filter over every combination of a parameter grid, sharing the common steps.
+    :param source: Image path or already decoded image
+    :param filter_name: Filter name (a key of FILTERS)
+    :param threads: Number of threads (default is the number of CPU cores)
+    :param grid: Parameter name -> value or list of values
+    :return: List of (parameters, result)
+    """
+    return [(params, result) for _, params, result in Sweep().add(filter_name, **grid).run(source, threads)]
@@ -0,0 +1,206 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+from .blur import blur_halo, gaussian_blur
+from .edges import embossed_edges, outline
+from .npr import pencil_sketch, stylization
+
+# Working memory the tiles of one call may use at once, on top of the input and output images
+DEFAULT_MEMORY_BUDGET = 64 * 2**20
+
+
+def tile_rows(img, halo=0, out_channels=None, memory_budget=DEFAULT_MEMORY_BUDGET, threads=None):
+    """
+    Pick the height of the row strips an image is processed in, so that the strips running in
+    parallel (each with its halo and its filtered copy) stay within the memory budget.
+    :param img: Input image
+    :param halo: Rows of context needed above and below each strip
+    :param out_channels: Channels of the filtered strips (default is the input's)
+    :param memory_budget: Working memory in bytes for all strips in flight
+    :param threads: Number of strips processed in parallel
+    :return: Strip height in rows
+    """
+    threads = threads or os.cpu_count() or 1
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    out_channels = out_channels or channels
+    row_bytes = img.shape[1] * (channels + out_channels) * img.itemsize
+    rows = memory_budget // (threads * row_bytes) - 2 * halo
+    return int(max(rows, halo + 1, 16))
+
+
+def map_tiles(img, func, halo=0, out=None, out_channels=None, memory_budget=DEFAULT_MEMORY_BUDGET, threads=None):
+    """
+    Run a filter over horizontal strips of an image in parallel threads and assemble the result.
+
+    Each strip is handed to 'func' with 'halo' extra rows above and below (fewer at the image edges),
+    and only its own rows are kept, so any filter that looks at most 'halo' rows away gives exactly
+    the same result as on the whole image. Strips span the full width, so the left and right
+    borders are handled by the filter itself just like on the whole image.
+    :param img: Input image (any array, e.g. a np.memmap of a huge scan)
+    :param func: Function (strip, top) -> filtered strip, where 'top' is the image row the strip starts at
+    :param halo: Rows of context the filter needs on each side
+    :param out: Optional output array (e.g. a np.memmap); allocated if not given
+    :param out_channels: Channels of the filter's output (default is the input's)
+    :param memory_budget: Working memory in bytes for all strips in flight
+    :param threads: Number of threads (default is the number of CPU cores)
+    :return: Filtered image
+    """
+    height, width = img.shape[:2]
+    threads = threads or os.cpu_count() or 1
+    channels = 1 if img.ndim == 2 else img.shape[2]
+    out_channels = out_channels or channels
+    rows = tile_rows(img, halo, out_channels, memory_budget, threads)
+
+    if out is None:
+        out = np.empty((height, width) if out_channels == 1 else (height, width, out_channels), dtype=np.uint8)
+
+    def run(start):
+        stop = min(start + rows, height)
+        top = max(start - halo, 0)
+        bottom = min(stop + halo, height)
+        result = func(img[top:bottom], top)
+        out[start:stop] = result[start - top:stop - top]
+
+    starts = range(0, height, rows)
+    if threads == 1 or len(starts) == 1:
+        for start in starts:
+            run(start)
+    else:
+        # OpenCV releases the GIL, so the strips really run in parallel
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            list(executor.map(run, starts))
+    return out
+
+
+def _vignette_kernels(height, width, level):
+    # The two normalized 1D Gaussians whose outer product is the vignette mask
+    X_resultant_kernel = cv2.getGaussianKernel(width, width/level)
+    Y_resultant_kernel = cv2.getGaussianKernel(height, height/level)
+    return Y_resultant_kernel / Y_resultant_kernel.max(), (X_resultant_kernel / X_resultant_kernel.max()).T
+
+
+def tiled_vignette(img, level=2, **options):
+    """
+    Apply the vignette filter strip by strip. The mask is computed per strip from the strip's
+    position in the whole image, so no full-size mask is ever built.
+    :param img: Input image
+    :param level: Intensity of the vignette effect (default is 2)
+    :param options: map_tiles() options (out, memory_budget, threads)
+    :return: Image with vignette effect applied
+    """
+    height, width = img.shape[:2]
+    y_kernel, x_kernel = _vignette_kernels(height, width, level)
+
+    def vignette_strip(strip, top):
+        mask = (y_kernel[top:top + strip.shape[0]] * x_kernel).astype(np.float32)
+        if strip.ndim == 3:
+            mask = cv2.merge([mask] * strip.shape[2])
+        return cv2.multiply(strip, mask, dtype=cv2.CV_8U)
+
+    return map_tiles(img, vignette_strip, **options)
+
+
+def tiled_gaussian_blur(img, radius=2, **options):
+    """
+    Apply the filters' Gaussian pre-blur (see filters.blur.gaussian_blur()) strip by strip.
+    :param img: Input image
+    :param radius: Blur radius (default is 2, a 5x5 kernel)
+    :param options: map_tiles() options (out, memory_budget, threads)
+    :return: Blurred image
+    """
+    return map_tiles(img, lambda strip, top: gaussian_blur(strip, radius), halo=blur_halo(radius), **options)
+
+
+def tiled_edge_detection(img, apply_blur=False, threshold1=100, threshold2=200, blur_radius=2, **options):
+    """
+    Edge detection with the optional pre-blur done strip by strip. Canny's hysteresis follows
+    edges across the whole image, so the detection itself runs on the full blurred image.
+    :param img: Input image
+    :param apply_blur: Apply Gaussian blur before edge detection (default is False)
+    :param threshold1: Lower hysteresis threshold of the gradient (default is 100)
+    :param threshold2: Upper hysteresis threshold of the gradient (default is 200)
+    :param blur_radius: Radius of the Gaussian blur (default is 2)
+    :param options: map_tiles() options for the blur (memory_budget, threads)
+    :return: Image with detected edges
+    """
+    if apply_blur:
+        img = tiled_gaussian_blur(img, blur_radius, **options)
+    return cv2.Canny(img, threshold1, threshold2)
+
+
+def tiled_outline(img, k=9, **options):
+    """
+    Apply the outline filter strip by strip.
+    :param img: Input image
+    :param k: Kernel intensity for edge detection (default is 9)
+    :param options: map_tiles() options (out, memory_budget, threads)
+    :return: Image with outline effect
+    """
+    return map_tiles(img, lambda strip, top: outline(strip, k), halo=1, **options)
+
+
+def tiled_embossed_edges(img, **options):
+    """
+    Apply the emboss filter strip by strip.
+    :param img: Input image
+    :param options: map_tiles() options (out, memory_budget, threads)
+    :return: Image with embossed effect
+    """
+    return map_tiles(img, lambda strip, top: embossed_edges(strip), halo=1, **options)
+
+
+def tiled_pencil_sketch_bw(img, blur_radius=2, **options):
+    """
+    Pencil sketch (black and white) with the pre-blur done strip by strip; cv2.pencilSketch
+    itself filters across the whole image and runs once on the blurred result.
+    :param img: Input image (BGR or grayscale)
+    :param blur_radius: Radius of the Gaussian pre-blur (default is 2)
+    :param options: map_tiles() options for the blur (memory_budget, threads)
+    :return: Black-and-white pencil sketch image
+    """
+    if img.ndim == 2:
+        img = cv2.cvtColor(img, cv2.COLOR_GRAY2BGR)  # cv2.pencilSketch only takes color images
+    img_sketch_bw, _ = pencil_sketch(tiled_gaussian_blur(img, blur_radius, **options))
+    return img_sketch_bw
+
+
+def tiled_pencil_sketch_bw_color(img, blur_radius=2, **options):
+    """
+    Pencil sketch (black and white and color) with the pre-blur done strip by strip.
+    :param img: Input image
+    :param blur_radius: Radius of the Gaussian pre-blur (default is 2)
+    :param options: map_tiles() options for the blur (memory_budget, threads)
+    :return: Tuple of black-and-white sketch and color sketch images
+    """
+    return pencil_sketch(tiled_gaussian_blur(img, blur_radius, **options))
+
+
+def tiled_stylization_filter(img, sigma_s=40, sigma_r=0.1, blur_radius=2, quality=1.0, **options):
+    """
+    Stylization with the pre-blur done strip by strip; cv2.stylization itself filters across
+    the whole image and runs once on the blurred result.
+    :param img: Input image
+    :param sigma_s: Controls the size of the texture (default is 40)
+    :param sigma_r: Controls how much of the color is preserved (default is 0.1)
+    :param blur_radius: Radius of the Gaussian pre-blur (default is 2)
+    :param quality: Below 1, smooth faster at that fraction of the resolution (see npr.stylization())
+    :param options: map_tiles() options for the blur (memory_budget, threads)
+    :return: Stylized image
+    """
+    return stylization(tiled_gaussian_blur(img, blur_radius, **options), sigma_s, sigma_r, quality)
+
+
+# Tiled versions of the filters in FILTERS, taking the same parameters plus the map_tiles() options
+TILED_FILTERS = {
+    'vignette': tiled_vignette,
+    'edge_detection': tiled_edge_detection,
+    'edge_detection_blur': tiled_edge_detection,
+    'outline': tiled_outline,
+    'embossed_edges': tiled_embossed_edges,
+    'pencil_sketch_bw': tiled_pencil_sketch_bw,
+    'pencil_sketch_bw_color': tiled_pencil_sketch_bw_color,
+    'stylization_filter': tiled_stylization_filter,
+}
@@ -0,0 +1,3 @@
+# Version of the filter library. Part of every result cache key, so bump it whenever a filter's
+# output changes and cached results from the previous version stop being used.
+__version__ = '1.1.1'
@@ -0,0 +1,50 @@
+import argparse
+import sys
+
+from batch_process import find_images
+from filters.frames import DEFAULT_FRAME_DIR, DEFAULT_MAX_BYTES, FrameStore
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build and maintain the store of decoded source frames.')
+    parser.add_argument('command', choices=['build', 'stats', 'evict', 'clear'],
+                        help='build: decode the sources not stored yet and drop outdated frames, stats: show usage, '
+                             'evict: shrink to the size limit, clear: delete everything')
+    parser.add_argument('source', nargs='?', default=None,
+                        help="With build: input directory (walked recursively) or glob pattern")
+    parser.add_argument('--frames', default=DEFAULT_FRAME_DIR, metavar='DIR',
+                        help=f'Frame store directory (default: {DEFAULT_FRAME_DIR})')
+    parser.add_argument('--frames-size', type=float, default=DEFAULT_MAX_BYTES / 2**20, metavar='MB',
+                        help=f'Size limit in MB used by build and evict (default: {DEFAULT_MAX_BYTES // 2**20})')
+    parser.add_argument('--max-size', type=int, default=None, metavar='PIXELS',
+                        help='With build: store frames shrunk to this longest side, as batch_process --max-size uses')
+    parser.add_argument('--grayscale', action='store_true',
+                        help='With build: store grayscale frames, as batch_process --fast-decode uses for luma-only filters')
+    args = parser.parse_args(argv)
+
+    store = FrameStore(args.frames, int(args.frames_size * 2**20))
+
+    if args.command == 'build':
+        if args.source is None:
+            parser.error('build needs a source directory or glob')
+        image_paths, _ = find_images(args.source)
+        counts = store.build(image_paths, args.grayscale, args.max_size)
+        print(f"Built {len(image_paths)} sources: {counts['added']} added, {counts['stored']} already stored, "
+              f"{counts['replaced']} outdated replaced, {counts['failed']} failed")
+    if args.command in ('build', 'evict'):
+        removed, freed = store.evict()
+        print(f"Evicted {removed} frames ({freed / 2**20:.1f} MB)")
+    elif args.command == 'clear':
+        store.clear()
+        print(f"Cleared {args.frames}")
+
+    stats = store.stats()
+    print(f"Frame store: {stats['directory']}")
+    print(f"  frames    {stats['frames']}")
+    print(f"  sources   {stats['sources']}")
+    print(f"  size      {stats['bytes'] / 2**20:.1f} MB of {stats['max_bytes'] / 2**20:.0f} MB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,97 @@
+import argparse
+import os
+import sys
+import time
+
+import cv2
+
+from filters import FILTERS
+from filters.pyramid import DEFAULT_BUDGET_MS, open_preview
+
+
+def parse_values(text):
+    """
+    Parse a parameter sweep such as 'sigma_s=20,40,60'.
+    :param text: 'name=value,value,...'
+    :return: Tuple of (parameter name, list of values converted to int or float where possible)
+    """
+    name, _, values = text.partition('=')
+    if not name or not values:
+        raise argparse.ArgumentTypeError(f"expected name=value[,value...], got '{text}'")
+    parsed = []
+    for value in values.split(','):
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        parsed.append(value)
+    return name, parsed
+
+
+def parse_size(text):
+    """
+    Parse a display size such as '1024x768'.
+    :param text: 'WIDTHxHEIGHT'
+    :return: (width, height) tuple
+    """
+    try:
+        width, height = (int(value) for value in text.lower().split('x'))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"expected WIDTHxHEIGHT, got '{text}'") from None
+    return width, height
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Preview a filter at display resolution while sweeping a parameter, '
+                                                 'then render the chosen value at full resolution.')
+    parser.add_argument('image', help='Source image')
+    parser.add_argument('filter', choices=list(FILTERS), help='Filter to preview')
+    parser.add_argument('--sweep', type=parse_values, default=None, metavar='NAME=V1,V2,...',
+                        help="Parameter values to preview in turn, like moving a slider (e.g. 'sigma_s=20,40,60')")
+    parser.add_argument('--display', type=parse_size, default=(1024, 768), metavar='WxH',
+                        help='Display area size (default: 1024x768)')
+    parser.add_argument('--budget', type=float, default=DEFAULT_BUDGET_MS,
+                        help=f'Preview latency budget in ms (default: {DEFAULT_BUDGET_MS})')
+    parser.add_argument('--commit', default=None, metavar='PATH',
+                        help='Render the last swept value at full resolution and save it here')
+    parser.add_argument('--show', action='store_true', help='Show the last preview')
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    pyramid = open_preview(args.image)
+    height, width = pyramid.levels[0].shape[:2]
+    print(f"{os.path.basename(args.image)}: {width}x{height}, pyramid of {len(pyramid.levels)} levels "
+          f"built in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    name, values = args.sweep if args.sweep else (None, [None])
+    params = {}
+    preview = None
+    for value in values:
+        params = {name: value} if name else {}
+        start = time.perf_counter()
+        preview = pyramid.preview(args.filter, args.display, args.budget, **params)
+        elapsed = (time.perf_counter() - start) * 1000
+        index = pyramid.last_level
+        level = pyramid.levels[index]
+        label = f"{name}={value}" if name else 'defaults'
+        print(f"  {label:<16} {elapsed:6.1f} ms at level {index} ({level.shape[1]}x{level.shape[0]})")
+
+    if args.commit:
+        start = time.perf_counter()
+        result = pyramid.commit(args.filter, **params)
+        if isinstance(result, tuple):
+            result = result[0]
+        os.makedirs(os.path.dirname(args.commit) or '.', exist_ok=True)
+        cv2.imwrite(args.commit, result)
+        print(f"Full resolution saved to {args.commit} in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    if args.show:
+        from filters.preview import show
+        show(preview[0] if isinstance(preview, tuple) else preview, f"{args.filter} preview")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,37 @@
+import argparse
+import sys
+
+from filters.cache import DEFAULT_CACHE_DIR, DEFAULT_MAX_BYTES, ResultCache
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect and maintain the filter result cache.')
+    parser.add_argument('command', choices=['stats', 'evict', 'clear'],
+                        help='stats: show usage and hit rate, evict: shrink to the size limit, clear: delete everything')
+    parser.add_argument('--cache', default=DEFAULT_CACHE_DIR, metavar='DIR',
+                        help=f'Result cache directory (default: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-size', type=float, default=DEFAULT_MAX_BYTES / 2**20, metavar='MB',
+                        help=f'Size limit in MB used by evict (default: {DEFAULT_MAX_BYTES // 2**20})')
+    args = parser.parse_args(argv)
+
+    cache = ResultCache(args.cache, int(args.cache_size * 2**20))
+
+    if args.command == 'evict':
+        removed, freed = cache.evict()
+        print(f"Evicted {removed} entries ({freed / 2**20:.1f} MB)")
+    elif args.command == 'clear':
+        cache.clear()
+        print(f"Cleared {args.cache}")
+
+    stats = cache.stats()
+    print(f"Cache: {stats['directory']}")
+    print(f"  entries   {stats['entries']}")
+    print(f"  size      {stats['bytes'] / 2**20:.1f} MB of {stats['max_bytes'] / 2**20:.0f} MB")
+    print(f"  hits      {stats['hits']}")
+    print(f"  misses    {stats['misses']}")
+    print(f"  hit rate  {stats['hit_rate']:.1%}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,56 @@
+import argparse
+import sys
+
+from filters.pipeline import STEPS, Pipeline
+from filters.stream import process_stream
+
+
+def parse_step(text):
+    """
+    Parse a step given on the command line as 'name' or 'name:param=value,param=value'.
+    :param text: Step text
+    :return: Step name or (name, params) tuple
+    """
+    name, _, params = text.partition(':')
+    if not params:
+        return name
+    values = {}
+    for pair in params.split(','):
+        key, _, value = pair.partition('=')
+        for convert in (int, float):
+            try:
+                value = convert(value)
+                break
+            except ValueError:
+                pass
+        values[key] = value
+    return name, values
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply the showcase filters to a video or frame sequence.')
+    parser.add_argument('source', help="Video file, frame pattern (e.g. 'frames/%%04d.jpg') or frame directory")
+    parser.add_argument('output', help="Output video file, frame pattern or directory")
+    parser.add_argument('-s', '--steps', nargs='+', required=True, type=parse_step, metavar='STEP',
+                        help=f"Steps to apply, e.g. sepia vignette:level=3. Choices: {', '.join(STEPS)}")
+    parser.add_argument('-w', '--workers', type=int, default=2, help='Filter threads (default: 2)')
+    parser.add_argument('--queue-size', type=int, default=8, help='Frames buffered between stages (default: 8)')
+    parser.add_argument('--drop-frames', action='store_true',
+                        help='Drop frames when filtering falls behind decoding instead of waiting')
+    parser.add_argument('--fourcc', default='mp4v', help="Codec of a video output (default: 'mp4v')")
+    args = parser.parse_args(argv)
+
+    try:
+        Pipeline(args.steps)
+    except (ValueError, TypeError) as error:
+        parser.error(f"invalid steps: {error}")
+
+    stats = process_stream(args.source, args.steps, args.output, args.workers, args.queue_size,
+                           args.drop_frames, args.fourcc)
+    print(f"Read {stats['read']} frames, wrote {stats['written']}, dropped {stats['dropped']} "
+          f"in {stats['seconds']:.1f}s ({stats['fps']:.1f} fps)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
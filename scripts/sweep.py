@@ -0,0 +1,102 @@
+import argparse
+import math
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from filters import FILTERS, output_suffixes
+from filters.sweep import Sweep
+from preview_filter import parse_values
+
+# Width of one thumbnail on a contact sheet
+THUMBNAIL_WIDTH = 320
+
+
+def variant_label(params):
+    """
+    Describe a variant by its swept parameters, e.g. 'threshold1=50_threshold2=150'.
+    :param params: Parameter dictionary
+    :return: Label usable in file names
+    """
+    return '_'.join(f'{name}={value}' for name, value in params.items()) or 'defaults'
+
+
+def contact_sheet(images, labels, columns=4, width=THUMBNAIL_WIDTH):
+    """
+    Lay out thumbnails of several results in a grid, each with its label.
+    :param images: Images (BGR or grayscale)
+    :param labels: One label per image
+    :param columns: Thumbnails per row
+    :param width: Thumbnail width
+    :return: BGR contact sheet image
+    """
+    thumbnails = []
+    for img, label in zip(images, labels):
+        height = round(img.shape[0] * width / img.shape[1])
+        thumbnail = cv2.resize(img, (width, height), interpolation=cv2.INTER_AREA)
+        if thumbnail.ndim == 2:
+            thumbnail = cv2.cvtColor(thumbnail, cv2.COLOR_GRAY2BGR)
+        cv2.putText(thumbnail, label, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (0, 0, 0), 3, cv2.LINE_AA)
+        cv2.putText(thumbnail, label, (6, 18), cv2.FONT_HERSHEY_SIMPLEX, 0.45, (255, 255, 255), 1, cv2.LINE_AA)
+        thumbnails.append(thumbnail)
+
+    height = max(thumbnail.shape[0] for thumbnail in thumbnails)
+    columns = min(columns, len(thumbnails))
+    rows = math.ceil(len(thumbnails) / columns)
+    sheet = np.full((rows * height, columns * width, 3), 255, dtype=np.uint8)
+    for index, thumbnail in enumerate(thumbnails):
+        top, left = (index // columns) * height, (index % columns) * width
+        sheet[top:top + thumbnail.shape[0], left:left + width] = thumbnail
+    return sheet
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Run filters over a grid of parameters, sharing the common steps.')
+    parser.add_argument('image', help='Source image')
+    parser.add_argument('filters', nargs='+', choices=list(FILTERS), metavar='FILTER',
+                        help=f"Filters to sweep. Choices: {', '.join(FILTERS)}")
+    parser.add_argument('-g', '--grid', type=parse_values, action='append', default=[], metavar='NAME=V1,V2,...',
+                        help="Parameter values to combine, applied to the filters taking that parameter "
+                             "(e.g. -g threshold1=50,100 -g threshold2=150,200)")
+    parser.add_argument('-o', '--output', default=os.path.join('filtered', 'sweeps'),
+                        help="Folder for the variants (default: 'filtered/sweeps')")
+    parser.add_argument('--contact-sheet', default=None, metavar='PATH', help='Also save all variants on one sheet')
+    parser.add_argument('--threads', type=int, default=None, help='Threads (default: CPU count)')
+    args = parser.parse_args(argv)
+
+    sweep = Sweep()
+    for filter_name in args.filters:
+        accepted = set(FILTERS[filter_name]['params'])
+        sweep.add(filter_name, **{name: values for name, values in args.grid if name in accepted})
+    stats = sweep.stats()
+
+    start = time.perf_counter()
+    results = sweep.run(args.image, args.threads)
+    elapsed = time.perf_counter() - start
+    print(f"{stats['variants']} variants in {elapsed:.2f}s: {stats['steps']} steps instead of "
+          f"{stats['separate_steps']} run separately")
+
+    stem = os.path.splitext(os.path.basename(args.image))[0]
+    os.makedirs(args.output, exist_ok=True)
+    images, labels = [], []
+    for filter_name, params, result in results:
+        outputs = result if isinstance(result, tuple) else (result,)
+        for suffix, output in zip(output_suffixes(filter_name), outputs):
+            path = os.path.join(args.output, f'{stem}_{suffix}_{variant_label(params)}.jpg')
+            cv2.imwrite(path, output)
+            images.append(output)
+            labels.append(f'{suffix} {variant_label(params)}'.replace('_', ' ').replace(' defaults', ''))
+    print(f"Saved {len(images)} images to {args.output}")
+
+    if args.contact_sheet:
+        os.makedirs(os.path.dirname(args.contact_sheet) or '.', exist_ok=True)
+        cv2.imwrite(args.contact_sheet, contact_sheet(images, labels))
+        print(f"Contact sheet saved to {args.contact_sheet}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The filters package and the scripts live in scripts/, which isn't installed
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'scripts'))
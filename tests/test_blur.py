@@ -0,0 +1,28 @@
+import cv2
+import numpy as np
+import pytest
+
+from benchmark_blur import MAX_MEAN_ERROR
+from benchmark_sepia import DEFAULT_IMAGE
+from filters.blur import blur_method, gaussian_blur
+
+# Radii gaussian_blur() runs the box cascade at by default
+RADII = [radius for radius in (4, 8, 9, 16, 32, 64) if blur_method(radius) == 'box']
+
+# Largest difference of a single pixel from the exact blur (7 at radius 32 on the default image)
+MAX_ERROR = 8
+
+
+@pytest.fixture(scope='module')
+def image():
+    img = cv2.imread(DEFAULT_IMAGE)
+    assert img is not None, f"sample image missing: {DEFAULT_IMAGE}"
+    return img
+
+
+@pytest.mark.parametrize('radius', RADII)
+def test_box_cascade_stays_close_to_gaussian(image, radius):
+    diff = np.abs(gaussian_blur(image, radius).astype(np.int16)
+                  - gaussian_blur(image, radius, 'gaussian').astype(np.int16))
+    assert diff.mean() <= MAX_MEAN_ERROR
+    assert diff.max() <= MAX_ERROR
@@ -0,0 +1,7 @@
+from check_import_time import DEFAULT_BUDGET_MS, measure_import_time
+
+
+def test_import_stays_within_budget():
+    elapsed_ms, eager = measure_import_time(runs=5)
+    assert not eager, f"importing filters also loaded {', '.join(eager)}"
+    assert elapsed_ms <= DEFAULT_BUDGET_MS, f"import filters took {elapsed_ms:.1f} ms (budget {DEFAULT_BUDGET_MS:g} ms)"
@@ -0,0 +1,28 @@
+import pytest
+
+from benchmark_npr import ENGINES, MIN_PSNR, MIN_SSIM, prepare_image, psnr, ssim
+from benchmark_sepia import DEFAULT_IMAGE
+
+QUALITIES = (0.75, 0.5, 0.25)
+
+
+@pytest.fixture(scope='module')
+def image():
+    img = prepare_image(DEFAULT_IMAGE)
+    assert img is not None, f"sample image missing: {DEFAULT_IMAGE}"
+    return img
+
+
+@pytest.fixture(scope='module')
+def exact(image):
+    # The exact filters take seconds at the benchmark size, so each runs once for all qualities
+    return {name: run(image, 1.0) for name, run in ENGINES.items()}
+
+
+@pytest.mark.parametrize('quality', QUALITIES)
+@pytest.mark.parametrize('name', list(ENGINES))
+def test_fast_result_stays_close_to_exact(image, exact, name, quality):
+    result = ENGINES[name](image, quality)
+    assert result.shape == exact[name].shape
+    assert psnr(result, exact[name]) >= MIN_PSNR
+    assert ssim(result, exact[name]) >= MIN_SSIM